@@ -0,0 +1 @@
+"""Synthetic data generator and timing harness; run with `python -m benchmarks --help`."""
@@ -0,0 +1,139 @@
+"""Benchmark MetricCalculator and the main views against a synthetic dataset.
+
+    python -m benchmarks --substations 5000 --inspections 50000 --output run.json
+    python -m benchmarks --database-url postgresql://localhost/fire_bench --baseline run.json
+
+The target database is wiped and refilled unless --reuse is given, so point
+--database-url at a scratch database. Without it a temporary SQLite file is used.
+"""
+import argparse
+import os
+import sys
+import tempfile
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m benchmarks", description=__doc__.splitlines()[0])
+    parser.add_argument("--database-url", help="Scratch database to fill (default: temporary SQLite file)")
+    parser.add_argument("--substations", type=int, default=2000)
+    parser.add_argument("--inspections", type=int, default=10000)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--repeat", type=int, default=5, help="Timed runs per operation")
+    parser.add_argument("--reuse", action="store_true", help="Keep existing data instead of regenerating it")
+    parser.add_argument("--cache", action="store_true", help="Leave the view cache enabled")
+    parser.add_argument("--only", choices=["calculator", "routes"], help="Run one group of operations")
+    parser.add_argument("--output", help="Write results as JSON to this path")
+    parser.add_argument("--baseline", help="Compare against a previous JSON result")
+    parser.add_argument("--threshold", type=float, default=0.25,
+                        help="Allowed median slowdown before flagging a regression (default 0.25 = 25%%)")
+    return parser.parse_args(argv)
+
+
+def configure_environment(args, workdir):
+    # create_app reads these at import time
+    os.environ["DATABASE_URL"] = args.database_url or f"sqlite:///{os.path.join(workdir, 'benchmark.db')}"
+    os.environ["METRIC_SCHEDULER_ENABLED"] = "0"
+    os.environ["CACHE_ENABLED"] = "1" if args.cache else "0"
+    os.environ["PROFILE_ENABLED"] = "0"  # Random sampling would add noise to the timings
+    os.environ["CACHE_PATH"] = os.path.join(workdir, "cache.sqlite3")
+
+
+def print_table(results, comparisons):
+    ratios = {c["name"]: c for c in comparisons}
+    print(f"{'operation':<58} {'median ms':>10} {'queries':>8} {'vs base':>8}")
+    for entry in results["results"]:
+        comparison = ratios.get(entry["name"])
+        ratio = f"{comparison['ratio']:.2f}x" if comparison and comparison["ratio"] else ""
+        failed = f"  HTTP {entry['status']}" if entry.get("status", 200) >= 400 else ""
+        print(f"{entry['name']:<58} {entry['median_ms']:>10.2f} {entry['queries']:>8} {ratio:>8}{failed}")
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    workdir = tempfile.mkdtemp(prefix="fire-bench-")
+    configure_environment(args, workdir)
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+    from src.main import app
+    from src.extensions import db
+    from src.models.substation import Substation, InspectionTest
+    from src.models.job import Job, JobStatus
+    from src.models.user import User
+    from benchmarks import generator, runner
+
+    # Errors come back as 500s and are recorded per route rather than aborting the run
+    app.config.update(WTF_CSRF_ENABLED=False, PROPAGATE_EXCEPTIONS=False)
+    results = {"results": [], "skipped": dict(runner.SKIPPED_ROUTES)}
+
+    with app.app_context():
+        if not (args.reuse and Substation.query.first()):
+            print(f"Generating {args.substations} substations and {args.inspections} inspections "
+                  f"on {db.engine.dialect.name}...")
+            generator.reset()
+            admin = User.query.filter_by(username="admin").first()
+            dataset = generator.generate(args.substations, args.inspections, seed=args.seed,
+                                         user_id=admin.id if admin else None)
+        else:
+            dataset = {"substations": Substation.query.count(), "inspections": InspectionTest.query.count(),
+                       "seed": None}
+        results["meta"] = runner.metadata(app, dataset, args.repeat)
+        counter = runner.QueryCounter(db.engine)
+
+        if args.only in (None, "calculator"):
+            for name, fn in runner.calculator_operations():
+                results["results"].append(runner.measure(name, "calculator", fn, counter, args.repeat))
+                db.session.remove()
+
+        sample_substation = db.session.query(Substation.id).order_by(Substation.id).first()[0]
+        sample_inspection = db.session.query(InspectionTest.id).order_by(InspectionTest.id).first()[0]
+        bulk_ids = [row[0] for row in db.session.query(Substation.id).order_by(Substation.id).limit(200)]
+        job = Job(kind="recalculate_metrics", status=JobStatus.SUCCEEDED, progress=1.0)
+        db.session.add(job)
+        db.session.commit()
+        job_id = job.id
+        db.session.remove()
+
+    if args.only in (None, "routes"):
+        client = app.test_client()
+        login = client.post("/login", data={"username": "admin", "password": "admin123"})
+        if login.status_code >= 400:
+            sys.exit(f"Could not log in as admin (HTTP {login.status_code})")
+        timed = []
+        for name, endpoint, method, url, data in runner.route_requests(sample_substation, sample_inspection, job_id, bulk_ids):
+            statuses = []
+
+            def request(method=method, url=url, data=data):
+                response = client.open(url, method=method, data=data)
+                response.get_data()  # Drain streamed bodies so their queries are counted
+                statuses.append(response.status_code)
+
+            entry = runner.measure(name, "route", request, counter, args.repeat)
+            entry["status"] = statuses[-1]
+            results["results"].append(entry)
+            timed.append(endpoint)
+        for endpoint in runner.uncovered_routes(app, timed):
+            results["skipped"][endpoint] = "not covered by the benchmark"
+
+    comparisons, regressions = [], []
+    if args.baseline:
+        import json
+        with open(args.baseline) as f:
+            comparisons, regressions = runner.compare(results, json.load(f), args.threshold)
+        results["comparison"] = {"baseline": args.baseline, "threshold": args.threshold,
+                                 "operations": comparisons, "regressions": regressions}
+
+    print_table(results, comparisons)
+    if args.output:
+        runner.write_json(results, args.output)
+        print(f"Results written to {args.output}")
+    if regressions:
+        print(f"{len(regressions)} regressions against {args.baseline}:")
+        for regression in regressions:
+            print(f"  {regression['name']}: {regression['baseline_median_ms']:.2f} -> {regression['median_ms']:.2f} ms, "
+                  f"{regression['baseline_queries']} -> {regression['queries']} queries")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,86 @@
+# benchmarks/generator.py
+from datetime import date, datetime, timedelta
+import numpy as np
+from sqlalchemy import delete, insert
+from src.extensions import db
+from src.models.substation import Substation, InspectionTest, ReliabilityMetric, SubstationStatus, MetricAggregate
+from src.models.job import Job
+from src.utils.substation_status import rebuild_substation_status
+
+# Rows per executemany batch
+BATCH_SIZE = 5000
+
+COVERAGE = (["Fully Covered", "Partially Covered", "Not Covered"], [0.45, 0.35, 0.20])
+INSPECTION_STATUS = (["Inspected", "Pending", "Failed"], [0.70, 0.20, 0.10])
+TESTING_STATUS = (["Tested", "Pending", "Failed", "N/A"], [0.55, 0.20, 0.10, 0.15])
+NOTES = ["Routine inspection", "Pump pressure low", "Hose reel replaced", "Valve leaking", "No issues found"]
+
+
+def _insert(session, model, rows):
+    for start in range(0, len(rows), BATCH_SIZE):
+        session.execute(insert(model), rows[start:start + BATCH_SIZE])
+
+
+def reset(session=None):
+    """Delete every benchmark-relevant row, children first"""
+    session = session or db.session
+    for model in (Job, MetricAggregate, SubstationStatus, InspectionTest, ReliabilityMetric, Substation):
+        session.execute(delete(model))
+    session.commit()
+
+
+def generate(substations, inspections, seed=42, start=date(2019, 1, 1), end=None, user_id=None, session=None):
+    """Insert a deterministic synthetic dataset of `substations` and `inspections` rows.
+
+    Substations are commissioned over the first two thirds of [start, end], with
+    more of them early on. Each substation's inspections fall between its
+    commissioning date and `end`, and busier substations get more of them.
+    Tested records get a testing date up to two weeks after the inspection.
+    The same seed always yields the same rows.
+    """
+    session = session or db.session
+    end = end or date.today()
+    rng = np.random.default_rng(seed)
+    span = (end - start).days
+
+    # Skewed towards the start: most of the network predates the inspection programme
+    created_offsets = np.sort((rng.beta(1.2, 2.5, substations) * span * 2 / 3).astype(int))
+    coverage = rng.choice(COVERAGE[0], size=substations, p=COVERAGE[1])
+    _insert(session, Substation, [{
+        "name": f"SS-{i + 1:06d}",
+        "coverage_status": coverage[i],
+        "created_at": datetime.combine(start + timedelta(days=int(created_offsets[i])), datetime.min.time())
+    } for i in range(substations)])
+    session.flush()
+    ids = np.array([row[0] for row in session.query(Substation.id).order_by(Substation.id).all()])
+
+    # Heavy-tailed activity: a few substations are inspected far more often than the rest
+    weights = rng.pareto(2.0, substations) + 1
+    owner = rng.choice(substations, size=inspections, p=weights / weights.sum())
+    remaining = span - created_offsets[owner]
+    inspection_offsets = created_offsets[owner] + (rng.random(inspections) * np.maximum(remaining, 1)).astype(int)
+    inspection_status = rng.choice(INSPECTION_STATUS[0], size=inspections, p=INSPECTION_STATUS[1])
+    testing_status = rng.choice(TESTING_STATUS[0], size=inspections, p=TESTING_STATUS[1])
+    testing_lag = rng.integers(0, 15, inspections)
+    notes = rng.choice(NOTES, size=inspections)
+
+    rows = []
+    for i in range(inspections):
+        inspection_date = start + timedelta(days=int(inspection_offsets[i]))
+        tested = testing_status[i] == "Tested"
+        rows.append({
+            "substation_id": int(ids[owner[i]]),
+            "inspection_date": inspection_date,
+            "testing_date": min(inspection_date + timedelta(days=int(testing_lag[i])), end) if tested else None,
+            "inspection_status": inspection_status[i],
+            "testing_status": testing_status[i],
+            "notes": notes[i],
+            "user_id": user_id,
+            "created_at": datetime.combine(inspection_date, datetime.min.time())
+        })
+    _insert(session, InspectionTest, rows)
+    session.commit()
+
+    # Derived tables are rebuilt in bulk rather than row by row
+    rebuild_substation_status(session)
+    return {"substations": substations, "inspections": inspections, "seed": seed}
@@ -0,0 +1,182 @@
+# benchmarks/runner.py
+import json
+import platform
+import statistics
+import time
+from contextlib import contextmanager
+from datetime import date, datetime
+from sqlalchemy import event
+
+# Routes that delete or reset data, or only queue background work, are not timed
+SKIPPED_ROUTES = {
+    "main.delete_substation": "deletes data",
+    "main.delete_inspection": "deletes data",
+    "main.reset_substation_ids": "deletes all data",
+    "main.calculate_metrics": "queues a background job",
+    "main.calculate_monthly_metrics": "queues a background job",
+    "main.calculate_yearly_metrics": "queues a background job",
+    "main.cancel_job": "needs a running job",
+    "main.retry_job": "needs a failed job",
+    "main.import_report": "needs an import report"
+}
+
+
+class QueryCounter:
+    """Counts statements sent to the database while active"""
+
+    def __init__(self, engine):
+        self.engine = engine
+        self.count = 0
+
+    def _before_execute(self, conn, cursor, statement, parameters, context, executemany):
+        self.count += 1
+
+    @contextmanager
+    def counting(self):
+        self.count = 0
+        event.listen(self.engine, "before_cursor_execute", self._before_execute)
+        try:
+            yield self
+        finally:
+            event.remove(self.engine, "before_cursor_execute", self._before_execute)
+
+
+def measure(name, kind, fn, counter, repeat=5, warmup=1):
+    """Time `fn` `repeat` times after `warmup` untimed calls; queries are counted on the last run"""
+    for _ in range(warmup):
+        fn()
+    durations = []
+    for i in range(repeat):
+        if i == repeat - 1:
+            with counter.counting():
+                began = time.perf_counter()
+                fn()
+                durations.append(time.perf_counter() - began)
+        else:
+            began = time.perf_counter()
+            fn()
+            durations.append(time.perf_counter() - began)
+    return {
+        "name": name,
+        "kind": kind,
+        "runs": repeat,
+        "min_ms": round(min(durations) * 1000, 3),
+        "median_ms": round(statistics.median(durations) * 1000, 3),
+        "mean_ms": round(statistics.mean(durations) * 1000, 3),
+        "queries": counter.count
+    }
+
+
+def calculator_operations():
+    """(name, callable) for each MetricCalculator method, with representative arguments"""
+    from src.utils.metric_calculator import MetricCalculator
+
+    today = date.today()
+    last_month = date(today.year - (today.month == 1), (today.month - 2) % 12 + 1, 1)
+    return [
+        ("MetricCalculator.snapshot", MetricCalculator.snapshot),
+        ("MetricCalculator.calculate_current_metrics", MetricCalculator.calculate_current_metrics),
+        ("MetricCalculator.store_daily_metric", MetricCalculator.store_daily_metric),
+        ("MetricCalculator.process_historical_metrics", lambda: MetricCalculator.process_historical_metrics(5)),
+        ("MetricCalculator.calculate_monthly_metrics",
+         lambda: MetricCalculator.calculate_monthly_metrics(last_month.year, last_month.month)),
+        ("MetricCalculator.store_monthly_metric",
+         lambda: MetricCalculator.store_monthly_metric(last_month.year, last_month.month)),
+        ("MetricCalculator.calculate_yearly_metrics", lambda: MetricCalculator.calculate_yearly_metrics(today.year - 1)),
+        ("MetricCalculator.store_yearly_metric", lambda: MetricCalculator.store_yearly_metric(today.year - 1)),
+        ("MetricCalculator.get_monthly_inspection_compliance",
+         lambda: MetricCalculator.get_monthly_inspection_compliance(last_month.year, last_month.month)),
+        ("MetricCalculator.get_monthly_testing_compliance",
+         lambda: MetricCalculator.get_monthly_testing_compliance(last_month.year, last_month.month)),
+        ("MetricCalculator.get_monthly_compliance_series",
+         lambda: MetricCalculator.get_monthly_compliance_series(today.year - 1, today.month, today.year, today.month))
+    ]
+
+
+def route_requests(sample_substation_id, sample_inspection_id, job_id, bulk_ids):
+    """(name, endpoint, method, url, data) for each timed route"""
+    ids = ",".join(str(i) for i in bulk_ids)
+    return [
+        ("GET /", "main.dashboard", "GET", "/", None),
+        ("GET /substations", "main.substations", "GET", "/substations", None),
+        ("GET /substations/add", "main.add_substation", "GET", "/substations/add", None),
+        ("GET /substations/edit/<id>", "main.edit_substation", "GET", f"/substations/edit/{sample_substation_id}", None),
+        ("GET /inspections", "main.inspections", "GET", "/inspections", None),
+        ("GET /inspections?tested=not_tested", "main.inspections", "GET", "/inspections?tested=not_tested", None),
+        ("GET /inspections?sort=latest_inspection_date", "main.inspections", "GET",
+         "/inspections?sort=latest_inspection_date&direction=desc", None),
+        ("GET /api/inspections", "main.inspections_api", "GET", "/api/inspections?limit=200", None),
+        ("GET /inspections/add", "main.add_inspection", "GET", "/inspections/add", None),
+        ("GET /api/substations/search", "main.search_substations_api", "GET", "/api/substations/search?q=ss-0001", None),
+        ("GET /api/substations/search (substring)", "main.search_substations_api", "GET",
+         "/api/substations/search?q=0042", None),
+        ("GET /inspections/edit/<id>", "main.edit_inspection", "GET", f"/inspections/edit/{sample_inspection_id}", None),
+        ("GET /metrics", "main.metrics", "GET", "/metrics", None),
+        ("GET /import_substations", "main.import_substations", "GET", "/import_substations", None),
+        ("GET /export/substations", "main.export_data", "GET", "/export/substations?format=csv", None),
+        ("GET /export/inspections", "main.export_data", "GET", "/export/inspections?format=csv", None),
+        ("GET /export/reliability_metrics", "main.export_data", "GET", "/export/reliability_metrics?format=csv", None),
+        ("GET /admin/cache_stats", "main.cache_stats", "GET", "/admin/cache_stats", None),
+        ("GET /admin/jobs", "main.list_jobs", "GET", "/admin/jobs", None),
+        ("GET /admin/jobs/<id>", "main.job_status", "GET", f"/admin/jobs/{job_id}", None),
+        # Writes last, so they do not change the data the reads above saw
+        ("POST /inspections/bulk_update", "main.bulk_update_inspections", "POST", "/inspections/bulk_update",
+         {"selected_substation_ids": ids, "new_inspection_status": "Inspected", "new_testing_status": "Tested"}),
+        ("POST /bulk_edit_substations", "main.bulk_edit_substations", "POST", "/bulk_edit_substations",
+         {"selected_substation_ids": ids, "new_coverage_status": "Fully Covered"})
+    ]
+
+
+def uncovered_routes(app, timed_endpoints):
+    """Main-blueprint endpoints neither timed nor deliberately skipped"""
+    endpoints = {rule.endpoint for rule in app.url_map.iter_rules() if rule.endpoint.startswith("main.")}
+    return sorted(endpoints - set(timed_endpoints) - set(SKIPPED_ROUTES))
+
+
+def compare(results, baseline, threshold=0.25, min_ms=1.0):
+    """Regressions of `results` against a baseline run.
+
+    An operation regresses when it now issues more queries, or when its median
+    time grew by more than `threshold` (and by at least `min_ms`, to ignore noise
+    on sub-millisecond operations).
+    """
+    previous = {entry["name"]: entry for entry in baseline["results"]}
+    regressions, comparisons = [], []
+    for entry in results["results"]:
+        before = previous.get(entry["name"])
+        if before is None:
+            continue
+        ratio = entry["median_ms"] / before["median_ms"] if before["median_ms"] else None
+        comparison = {
+            "name": entry["name"],
+            "median_ms": entry["median_ms"],
+            "baseline_median_ms": before["median_ms"],
+            "ratio": round(ratio, 3) if ratio is not None else None,
+            "queries": entry["queries"],
+            "baseline_queries": before["queries"]
+        }
+        comparisons.append(comparison)
+        slower = (ratio is not None and ratio > 1 + threshold
+                  and entry["median_ms"] - before["median_ms"] >= min_ms)
+        if entry["queries"] > before["queries"] or slower:
+            regressions.append(comparison)
+    return comparisons, regressions
+
+
+def metadata(app, dataset, repeat):
+    from src.extensions import db
+
+    return {
+        "created_at": datetime.utcnow().isoformat(),
+        "dialect": db.engine.dialect.name,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "repeat": repeat,
+        "cache_enabled": app.config.get("CACHE_ENABLED", False),
+        **dataset
+    }
+
+
+def write_json(data, path):
+    with open(path, "w") as f:
+        json.dump(data, f, indent=2, sort_keys=True)
@@ -0,0 +1,234 @@
+# src/commands.py
+import time
+from datetime import date
+import click
+from flask.cli import AppGroup
+
+substations_cli = AppGroup("substations", help="Substation maintenance commands.")
+metrics_cli = AppGroup("metrics", help="Reliability metric recomputation commands.")
+db_cli = AppGroup("db", help="Database connection and replica commands.")
+inspections_cli = AppGroup("inspections", help="Inspection history archival commands.")
+
+
+@substations_cli.command("rebuild-status")
+def rebuild_status():
+    """Rebuild the latest-inspection-per-substation table from scratch."""
+    from src.utils.substation_status import rebuild_substation_status
+
+    count = rebuild_substation_status()
+    click.echo(f"Rebuilt status for {count} substations.")
+
+
+@substations_cli.command("verify-counters")
+@click.option("--dry-run", is_flag=True, help="Report drift without correcting it.")
+def verify_counters_command(dry_run):
+    """Reconcile the running metric counters against a full recount."""
+    from src.utils.metric_counters import verify_counters
+
+    drift = verify_counters(fix=not dry_run)
+    if not drift:
+        click.echo("Metric counters match a full recount.")
+        return
+    for name, (stored, actual) in drift.items():
+        click.echo(f"{name}: stored {stored}, actual {actual}")
+    click.echo("Counters left unchanged." if dry_run else "Counters corrected.")
+
+
+def _date_range_options(fn):
+    """--start/--end/--workers options shared by the partitioned metric commands"""
+    fn = click.option("--workers", type=int, default=None,
+                      help="Worker processes (default: one per CPU).")(fn)
+    fn = click.option("--end", "end", type=click.DateTime(formats=["%Y-%m-%d"]), default=None,
+                      help="Last day to process (default: today).")(fn)
+    fn = click.option("--start", "start", type=click.DateTime(formats=["%Y-%m-%d"]), default=None,
+                      help="First day to process (default: January 1st four years ago).")(fn)
+    return fn
+
+
+def _partitions(start, end):
+    from src.utils.metric_partitions import year_partitions
+
+    end = end.date() if end else date.today()
+    start = start.date() if start else date(end.year - 4, 1, 1)
+    if start > end:
+        raise click.BadParameter("--start must not be after --end")
+    return year_partitions(start, end)
+
+
+def _database_url():
+    from src.extensions import db
+
+    # Resolved URL, so relative SQLite paths point at the same file in every worker
+    return db.engine.url.render_as_string(hide_password=False)
+
+
+def _timings(result):
+    return ", ".join(f"{name} {seconds:.2f}s" for name, seconds in result.timings.items())
+
+
+def _write_partitions(results, dry_run):
+    """Echo per-partition timing and upsert each partition's rows in its own transaction"""
+    from src.utils.metric_writer import upsert_metrics
+
+    totals = {}
+    for result in sorted(results, key=lambda r: r.start):
+        counts = ", ".join(f"{count} {period}" for period, count in result.written.items())
+        line = f"{result.label}: {counts} ({_timings(result)}"
+        if not dry_run:
+            began = time.perf_counter()
+            upsert_metrics(result.rows)
+            line += f", write {time.perf_counter() - began:.2f}s"
+        click.echo(line + ")")
+        for period, count in result.written.items():
+            totals[period] = totals.get(period, 0) + count
+    summary = ", ".join(f"{count} {period}" for period, count in totals.items())
+    click.echo(f"{'Would write' if dry_run else 'Wrote'} {summary} rows.")
+
+
+@metrics_cli.command("backfill")
+@_date_range_options
+@click.option("--no-rollups", is_flag=True, help="Only rebuild daily rows.")
+@click.option("--dry-run", is_flag=True, help="Compute and time each partition without writing.")
+def metrics_backfill(start, end, workers, no_rollups, dry_run):
+    """Recompute stored metrics from inspection history, one year per worker process."""
+    from src.utils.metric_partitions import run_partitions, compute_backfill
+
+    partitions = _partitions(start, end)
+    began = time.perf_counter()
+    results = list(run_partitions(compute_backfill, _database_url(), partitions, workers,
+                                  with_rollups=not no_rollups))
+    _write_partitions(results, dry_run)
+    click.echo(f"{len(partitions)} partitions in {time.perf_counter() - began:.2f}s.")
+
+
+@metrics_cli.command("rollup")
+@_date_range_options
+@click.option("--dry-run", is_flag=True, help="Compute and time each partition without writing.")
+def metrics_rollup(start, end, workers, dry_run):
+    """Recompute monthly and yearly rows from the stored daily rows."""
+    from src.utils.metric_partitions import run_partitions, compute_rollup
+
+    partitions = _partitions(start, end)
+    began = time.perf_counter()
+    results = list(run_partitions(compute_rollup, _database_url(), partitions, workers))
+    _write_partitions(results, dry_run)
+    click.echo(f"{len(partitions)} partitions in {time.perf_counter() - began:.2f}s.")
+
+
+@metrics_cli.command("verify")
+@_date_range_options
+@click.option("--no-rollups", is_flag=True, help="Only check daily rows.")
+@click.option("--show", type=int, default=5, help="Mismatches to print per partition.")
+def metrics_verify(start, end, workers, no_rollups, show):
+    """Compare stored metrics with a fresh recomputation; exits non-zero on any mismatch."""
+    from src.utils.metric_partitions import run_partitions, compute_verify
+
+    partitions = _partitions(start, end)
+    results = sorted(run_partitions(compute_verify, _database_url(), partitions, workers,
+                                    with_rollups=not no_rollups), key=lambda r: r.start)
+    mismatched = 0
+    for result in results:
+        status = "ok" if not result.mismatches else f"{len(result.mismatches)} mismatches"
+        click.echo(f"{result.label}: {status} ({_timings(result)})")
+        for (day, period), detail in result.mismatches[:show]:
+            click.echo(f"  {day} {period}: {detail}")
+        mismatched += len(result.mismatches)
+    if mismatched:
+        raise click.ClickException(f"{mismatched} stored metric rows differ from a recomputation.")
+    click.echo("All stored metrics match.")
+
+
+def _replica_engine():
+    from src.extensions import db
+    from src.utils.db_engines import REPLICA
+
+    if REPLICA not in db.engines:
+        raise click.ClickException("No replica configured; set DATABASE_REPLICA_URL.")
+    return db.engines[REPLICA]
+
+
+@db_cli.command("replica-status")
+def replica_status():
+    """Compare row counts on the primary and the read replica."""
+    from sqlalchemy import func, select
+    from src.extensions import db
+    from src.models.substation import Substation, InspectionTest, ReliabilityMetric
+
+    replica = _replica_engine()
+    click.echo(f"primary: {db.engine.url.render_as_string(hide_password=True)}")
+    click.echo(f"replica: {replica.url.render_as_string(hide_password=True)}")
+    behind = False
+    for model in (Substation, InspectionTest, ReliabilityMetric):
+        stmt = select(func.count()).select_from(model)
+        with db.engine.connect() as connection:
+            primary_count = connection.execute(stmt).scalar()
+        with replica.connect() as connection:
+            replica_count = connection.execute(stmt).scalar()
+        behind = behind or primary_count != replica_count
+        click.echo(f"{model.__tablename__}: primary {primary_count}, replica {replica_count}")
+    click.echo("Replica is behind the primary." if behind else "Replica matches the primary.")
+
+
+@db_cli.command("sync-replica")
+def sync_replica():
+    """Copy a SQLite primary over a SQLite replica file, for trying read routing locally."""
+    import sqlite3
+    from src.extensions import db
+
+    replica = _replica_engine()
+    if db.engine.dialect.name != "sqlite" or replica.dialect.name != "sqlite":
+        raise click.ClickException("sync-replica only copies SQLite files; use database replication for PostgreSQL.")
+    replica.dispose()
+    source = sqlite3.connect(db.engine.url.database)
+    target = sqlite3.connect(replica.url.database)
+    try:
+        source.backup(target)
+    finally:
+        target.close()
+        source.close()
+    click.echo(f"Copied {db.engine.url.database} to {replica.url.database}.")
+
+
+@db_cli.command("rebuild-search")
+def rebuild_search():
+    """Re-index every inspection for full-text search."""
+    from src.utils.inspection_search import backend, ensure_search_index, rebuild_search_index
+
+    if backend() is None:
+        raise click.ClickException("Full-text search needs SQLite (FTS5) or PostgreSQL.")
+    count = ensure_search_index()
+    if count is None:
+        count = rebuild_search_index()
+    click.echo(f"Indexed {count} inspections.")
+
+
+@inspections_cli.command("archive")
+@click.option("--hot-years", type=int, default=2, envvar="INSPECTION_HOT_YEARS", show_default=True,
+              help="Calendar years, counting this one, to keep in the hot table.")
+@click.option("--dry-run", is_flag=True, help="Count what would move without moving it.")
+def archive_inspections(hot_years, dry_run):
+    """Move inspections from closed years into the archive table, one year per transaction."""
+    from sqlalchemy import func, select
+    from src.extensions import db, cache
+    from src.utils.cache import INVENTORY
+    from src.utils.inspection_archive import archive_closed_years, ensure_archive, hot_cutoff, archive_table, HOT
+
+    ensure_archive()
+    click.echo(f"Keeping inspections from {hot_cutoff(hot_years).isoformat()} on hot.")
+    began = time.perf_counter()
+    moved = archive_closed_years(hot_years, dry_run=dry_run,
+                                 progress=lambda year, count: click.echo(f"{year}: {count} inspections"))
+    if not dry_run and any(moved.values()):
+        # Raw statements skip the ORM hooks that bump cached view versions
+        cache.bump(INVENTORY)
+    hot, archived = (db.session.execute(select(func.count()).select_from(table)).scalar()
+                     for table in (HOT, archive_table))
+    click.echo(f"{'Would move' if dry_run else 'Moved'} {sum(moved.values())} inspections "
+               f"in {time.perf_counter() - began:.2f}s; {hot} hot, {archived} archived.")
+
+
+def register_commands(app):
+    app.cli.add_command(substations_cli)
+    app.cli.add_command(metrics_cli)
+    app.cli.add_command(db_cli)
+    app.cli.add_command(inspections_cli)
@@ -1,5 +1,14 @@
 from flask_sqlalchemy import SQLAlchemy
 from flask_login import LoginManager
+from src.utils.cache import ResponseCache
+from src.utils.db_engines import RoutingSession
+from src.utils.sql_profiler import SQLProfiler
+from src.utils.prometheus import PrometheusMetrics
+from src.utils.metric_store import MetricStore
 
-db = SQLAlchemy()
+db = SQLAlchemy(session_options={"class_": RoutingSession})
 login_manager = LoginManager()
+cache = ResponseCache()
+profiler = SQLProfiler()
+prometheus = PrometheusMetrics()
+metric_store = MetricStore()
@@ -1,15 +1,15 @@
 from flask_wtf import FlaskForm
-from wtforms import StringField, SubmitField, DateField, SelectField, TextAreaField
-from wtforms.validators import DataRequired, Optional
-from wtforms_sqlalchemy.fields import QuerySelectField
-from src.models.substation import Substation # Assuming Substation model is correctly imported
+from wtforms import StringField, SubmitField, DateField, SelectField, TextAreaField, IntegerField
+from wtforms.validators import DataRequired, Optional, ValidationError
+from src.extensions import db
+from src.models.substation import Substation, INSPECTION_STATUSES, TESTING_STATUSES
 
 class InspectionTestForm(FlaskForm):
-    substation_id = SelectField(
+    # Picked through the typeahead search, so only the submitted id is checked (see validate_substation_id)
+    substation_id = IntegerField(
         "Substation",
-        coerce=int,
         validators=[DataRequired()],
-        render_kw={"class": "form-select js-example-basic-single"}
+        render_kw={"class": "form-select js-substation-picker"}
     )
     inspection_date = DateField(
         "Inspection Date",
@@ -25,22 +25,13 @@ class InspectionTestForm(FlaskForm):
     )
     inspection_status = SelectField(
         "Inspection Status",
-        choices=[
-            ("Inspected", "Inspected"),
-            ("Pending", "Pending"),
-            ("Failed", "Failed")
-        ],
+        choices=[(status, status) for status in INSPECTION_STATUSES],
         validators=[DataRequired()],
         render_kw={"class": "form-select"}
     )
     testing_status = SelectField(
         "Testing Status",
-        choices=[
-            ("Tested", "Tested"),
-            ("Pending", "Pending"),
-            ("Failed", "Failed"),
-            ("N/A", "N/A")
-        ],
+        choices=[(status, status) for status in TESTING_STATUSES],
         validators=[DataRequired()],
         render_kw={"class": "form-select"}
     )
@@ -53,7 +44,6 @@ class InspectionTestForm(FlaskForm):
         render_kw={"class": "btn btn-primary"}
     )
 
-    # Optional: A query factory if you were using QuerySelectField directly, but we use SelectField with choices populated in route
-    # def get_substations():
-    #     return Substation.query.all()
-    # substation = QuerySelectField(query_factory=get_substations, get_label='name', allow_blank=False, validators=[DataRequired()])
+    def validate_substation_id(self, field):
+        if db.session.get(Substation, field.data) is None:
+            raise ValidationError("Select an existing substation.")
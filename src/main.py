@@ -1,22 +1,68 @@
 import os
 from flask import Flask
-from src.extensions import db, login_manager # Import login_manager from extensions
+from src.extensions import db, login_manager, cache, profiler, prometheus, metric_store # Import login_manager from extensions
 from src.routes.main import main_bp
 from src.routes.auth import auth_bp
+from src.utils.metric_scheduler import start_metric_scheduler
+from src.utils.substation_status import rebuild_substation_status
+from src.commands import register_commands
+from src.utils.schema import (upgrade_metric_constraints, upgrade_substation_status, upgrade_substation_search_indexes,
+                              upgrade_inspection_indexes)
+from src.utils.metric_counters import recount_counters, AGGREGATE_ID
+from src.utils.jobs import runner as job_runner
+from src.utils.db_engines import database_config, configure_engines
+from src.utils.inspection_search import ensure_search_index
+from src.utils.inspection_archive import ensure_archive
 
 def create_app():
     app = Flask(__name__)
     app.config["SECRET_KEY"] = os.environ.get("SECRET_KEY", "fire_fighting_reliability_secret_key")
 
-    # PostgreSQL configuration for Render.com
-    database_url = os.environ.get("DATABASE_URL")
-    if database_url and database_url.startswith("postgres://"):
-        database_url = database_url.replace("postgres://", "postgresql://")
-    app.config["SQLALCHEMY_DATABASE_URI"] = database_url or "sqlite:///fire_fighting.db"
+    # Primary database (PostgreSQL on Render.com), pool sizing and an optional read replica bind
+    app.config.update(database_config())
     app.config["SQLALCHEMY_TRACK_MODIFICATIONS"] = False
 
+    # Background daily metric snapshot (seconds between snapshots; 0 disables)
+    app.config["METRIC_SCHEDULER_ENABLED"] = os.environ.get("METRIC_SCHEDULER_ENABLED", "1") == "1"
+    app.config["METRIC_SNAPSHOT_INTERVAL"] = int(os.environ.get("METRIC_SNAPSHOT_INTERVAL", 900))
+    # Seconds between reconciling the running metric counters with a full recount
+    app.config["METRIC_VERIFY_INTERVAL"] = int(os.environ.get("METRIC_VERIFY_INTERVAL", 3600))
+
+    # Version-invalidated view cache shared by all workers on this host
+    app.config["CACHE_ENABLED"] = os.environ.get("CACHE_ENABLED", "1") == "1"
+    app.config["CACHE_PATH"] = os.environ.get("CACHE_PATH")
+    app.config["CACHE_TTL"] = int(os.environ.get("CACHE_TTL", 300))
+    # Seconds a cached logged-in user may be served before it is re-read
+    app.config["USER_CACHE_TTL"] = int(os.environ.get("USER_CACHE_TTL", 60))
+    # Background jobs: pool threads per worker process, seconds between heartbeats of held jobs,
+    # how long a job may go without one, and how often the scheduler fails such orphaned jobs
+    app.config["JOB_WORKERS"] = int(os.environ.get("JOB_WORKERS", 2))
+    app.config["JOB_HEARTBEAT_SECONDS"] = int(os.environ.get("JOB_HEARTBEAT_SECONDS", 60))
+    app.config["JOB_STALE_SECONDS"] = int(os.environ.get("JOB_STALE_SECONDS", 600))
+    app.config["JOB_SWEEP_INTERVAL"] = int(os.environ.get("JOB_SWEEP_INTERVAL", 300))
+    # Per-request SQL profiling of a sample of requests (admins can force it with ?profile=1)
+    app.config["PROFILE_ENABLED"] = os.environ.get("PROFILE_ENABLED", "1") == "1"
+    app.config["PROFILE_SAMPLE_RATE"] = float(os.environ.get("PROFILE_SAMPLE_RATE", 0.05))
+    app.config["PROFILE_SLOW_MS"] = float(os.environ.get("PROFILE_SLOW_MS", 100))
+    app.config["PROFILE_N_PLUS_ONE"] = int(os.environ.get("PROFILE_N_PLUS_ONE", 10))
+    # Prometheus exposition at /metrics/prometheus, aggregated across workers through per-process files
+    app.config["PROMETHEUS_ENABLED"] = os.environ.get("PROMETHEUS_ENABLED", "1") == "1"
+    app.config["PROMETHEUS_MULTIPROC_DIR"] = os.environ.get("PROMETHEUS_MULTIPROC_DIR")
+    app.config["PROMETHEUS_TOKEN"] = os.environ.get("PROMETHEUS_TOKEN")
+    # Without a token the endpoint answers 404 unless it is deliberately made public
+    app.config["PROMETHEUS_PUBLIC"] = os.environ.get("PROMETHEUS_PUBLIC", "0") == "1"
+    # In-process NumPy copy of ReliabilityMetric behind the chart endpoints; seconds before a forced reload
+    app.config["METRIC_STORE_TTL"] = int(os.environ.get("METRIC_STORE_TTL", 300))
+
     # Initialize extensions
     db.init_app(app)
+    with app.app_context():
+        configure_engines(db)
+    cache.init_app(app)
+    job_runner.init_app(app)
+    profiler.init_app(app)
+    prometheus.init_app(app)
+    metric_store.init_app(app)
     
     # Initialize Flask-Login
     login_manager.init_app(app)
@@ -24,12 +70,14 @@ def create_app():
 
     @login_manager.user_loader
     def load_user(user_id):
-        from src.models.user import User  # Import here to avoid circular imports
-        return User.query.get(int(user_id))
+        # Cached principal instead of a User query on every request; User writes invalidate it
+        from src.utils.user_cache import load_principal  # Import here to avoid circular imports
+        return load_principal(int(user_id))
 
     # Register blueprints
     app.register_blueprint(main_bp)
     app.register_blueprint(auth_bp)
+    register_commands(app)
 
     # Create tables and run migrations within app context
     with app.app_context():
@@ -82,7 +130,43 @@ def create_app():
         except Exception as e:
             print(f"Migration check failed (this is normal for SQLite): {e}")
             # For SQLite or if migration fails, just continue
-            pass
+            db.session.rollback()
+        
+        # Swap a legacy UNIQUE(date) for UNIQUE(date, period_type) so metric upserts can target it
+        try:
+            if upgrade_metric_constraints():
+                print("✅ Upgraded reliability_metric unique constraint to (date, period_type)")
+        except Exception as e:
+            print(f"Metric constraint upgrade skipped: {e}")
+        
+        # Index inspections by substation on tables created before the latest-status refresh needed it
+        try:
+            for name in upgrade_inspection_indexes():
+                print(f"✅ Created index {name}")
+        except Exception as e:
+            print(f"Inspection index upgrade skipped: {e}")
+        
+        # Index the substation picker's name search on tables created before it existed
+        try:
+            for name in upgrade_substation_search_indexes():
+                print(f"✅ Created index {name}")
+        except Exception as e:
+            print(f"Substation search index upgrade skipped: {e}")
+        
+        # Archive table and hot + archive history view, which the status and metric queries read
+        try:
+            if ensure_archive():
+                print("✅ Created inspection archive and history view")
+        except Exception as e:
+            print(f"Inspection archive setup skipped: {e}")
+        
+        # Full-text index over hot and archived inspection notes and substation names, filled once from existing rows
+        try:
+            indexed = ensure_search_index()
+            if indexed is not None:
+                print(f"✅ Built full-text search index over {indexed} inspections")
+        except Exception as e:
+            print(f"Full-text search index skipped: {e}")
         
         # Create admin user
         from src.models.user import User, Role
@@ -94,8 +178,34 @@ def create_app():
             db.session.commit()
             print("Admin user created")
         
+        # Populate the latest-inspection table and the metric counters the first time they exist
+        from src.models.substation import InspectionTest, SubstationStatus, MetricAggregate
+        try:
+            if upgrade_substation_status():
+                print("Recreated substation status table with new columns")
+            if not SubstationStatus.query.first() and InspectionTest.query.first():
+                print(f"Built latest inspection status for {rebuild_substation_status()} substations")
+            elif db.session.get(MetricAggregate, AGGREGATE_ID) is None:
+                recount_counters()
+                print("Seeded metric counters")
+        except Exception as e:
+            db.session.rollback()
+            print(f"Substation status rebuild skipped: {e}")
+        
+        # Jobs orphaned by a worker that was killed or restarted can then be retried
+        try:
+            stale = job_runner.fail_stale()
+            if stale:
+                print(f"Marked {stale} interrupted background jobs as failed")
+        except Exception as e:
+            db.session.rollback()
+            print(f"Stale job check skipped: {e}")
+        
         print("Database tables created successfully")
 
+    # Snapshot today's metrics in the background instead of on every dashboard view
+    start_metric_scheduler(app)
+
     return app
 
 app = create_app()
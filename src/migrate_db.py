@@ -3,6 +3,8 @@ import os
 from src.main import create_app
 from src.extensions import db
 from sqlalchemy import text
+from src.utils.schema import upgrade_metric_constraints, upgrade_substation_search_indexes, upgrade_inspection_indexes
+from src.utils.inspection_archive import ensure_archive
 
 def migrate_database():
     app = create_app()
@@ -60,6 +62,16 @@ def migrate_database():
                 print("✅ Added unique constraint")
             else:
                 print("✅ period_type column already exists. No migration needed.")
+            
+            # Older databases may still carry UNIQUE(date) alongside the composite constraint
+            if upgrade_metric_constraints():
+                print("✅ Replaced legacy unique constraint on date")
+            for name in upgrade_inspection_indexes():
+                print(f"✅ Created index {name}")
+            for name in upgrade_substation_search_indexes():
+                print(f"✅ Created index {name}")
+            if ensure_archive():
+                print("✅ Created inspection archive and history view")
                 
         except Exception as e:
             db.session.rollback()
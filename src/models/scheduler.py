@@ -0,0 +1,11 @@
+# src/models/scheduler.py
+from src.extensions import db
+
+class SchedulerLease(db.Model):
+    """One row per scheduled task; claimed with a compare-and-set UPDATE so only one worker runs it"""
+    name = db.Column(db.String(64), primary_key=True)
+    holder = db.Column(db.String(128))
+    last_run_at = db.Column(db.DateTime)
+
+    def __repr__(self):
+        return f'<SchedulerLease {self.name} held by {self.holder}>'
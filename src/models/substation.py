@@ -2,19 +2,37 @@
 from src.extensions import db # Ensure this import is correct based on your project structure
 from datetime import datetime
 
+# Every status an inspection row can hold; imports and the bulk editor also write the "Not ..." values
+INSPECTION_STATUSES = ("Inspected", "Pending", "Failed", "Not Inspected")
+TESTING_STATUSES = ("Tested", "Pending", "Failed", "N/A", "Not Tested")
+
 class Substation(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     name = db.Column(db.String(100), unique=True, nullable=False)
-    coverage_status = db.Column(db.String(50), nullable=False)
+    coverage_status = db.Column(db.String(50), nullable=False, index=True)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
 
     def __repr__(self):
         return f'<Substation {self.name}>'
 
+# Case-insensitive name lookups (the substation picker's prefix search) range-scan this on SQLite;
+# PostgreSQL gets a text_pattern_ops twin for LIKE prefixes (see upgrade_substation_search_indexes)
+db.Index('ix_substation_name_lower', db.func.lower(Substation.name))
+
 class InspectionTest(db.Model):
+    __table_args__ = (
+        # Latest-status refreshes select by substation and rank by (date, id); this serves both
+        db.Index('ix_inspection_test_substation_date', 'substation_id', 'inspection_date', 'id'),
+    )
+
     id = db.Column(db.Integer, primary_key=True)
     # ADD ondelete='CASCADE' HERE
-    substation_id = db.Column(db.Integer, db.ForeignKey('substation.id', ondelete='CASCADE'), nullable=False)
+    # active_history loads the old value before a change, so moving a record to another
+    # substation also refreshes the status of the one it left, even on an expired object
+    substation_id = db.column_property(
+        db.Column(db.Integer, db.ForeignKey('substation.id', ondelete='CASCADE'), nullable=False),
+        active_history=True
+    )
     inspection_date = db.Column(db.Date, nullable=False)
     testing_date = db.Column(db.Date, nullable=True)
     inspection_status = db.Column(db.String(20), nullable=False)
@@ -27,10 +45,47 @@ class InspectionTest(db.Model):
     user = db.relationship('User', backref=db.backref('inspections', lazy=True))
 
 class ReliabilityMetric(db.Model):
+    # Daily, monthly and yearly rows share first-of-period dates, so uniqueness is per period type
+    __table_args__ = (
+        db.UniqueConstraint('date', 'period_type', name='_date_period_type_uc'),
+        # Trend queries filter on period_type, then range-scan date
+        db.Index('ix_reliability_metric_period_type_date', 'period_type', 'date'),
+    )
+
     id = db.Column(db.Integer, primary_key=True)
-    date = db.Column(db.Date, unique=True, nullable=False)
+    date = db.Column(db.Date, nullable=False)
+    period_type = db.Column(db.String(10), nullable=False, default='daily')
     reliability_score = db.Column(db.Float, nullable=False)
     testing_compliance = db.Column(db.Float, nullable=False)
     inspection_compliance = db.Column(db.Float)
     coverage_ratio = db.Column(db.Float)
     effective_reliability = db.Column(db.Float)
+
+class SubstationStatus(db.Model):
+    """Latest inspection per substation, kept current by src.utils.substation_status"""
+    substation_id = db.Column(db.Integer, db.ForeignKey('substation.id', ondelete='CASCADE'), primary_key=True)
+    latest_inspection_id = db.Column(db.Integer, db.ForeignKey('inspection_test.id', ondelete='SET NULL'))
+    latest_inspection_date = db.Column(db.Date, index=True)
+    inspection_status = db.Column(db.String(20))
+    testing_status = db.Column(db.String(20))
+    # Whether any record, not just the latest, was Inspected / Tested
+    ever_inspected = db.Column(db.Boolean, nullable=False, default=False)
+    ever_tested = db.Column(db.Boolean, nullable=False, default=False)
+
+    substation = db.relationship('Substation', backref=db.backref('status', uselist=False, passive_deletes=True))
+    latest_inspection = db.relationship('InspectionTest', foreign_keys=[latest_inspection_id])
+
+class MetricAggregate(db.Model):
+    """Single row of running totals behind the current metrics, kept in step by src.utils.metric_counters"""
+    id = db.Column(db.Integer, primary_key=True)
+    total_substations = db.Column(db.Integer, nullable=False, default=0)
+    fully_covered = db.Column(db.Integer, nullable=False, default=0)
+    partially_covered = db.Column(db.Integer, nullable=False, default=0)
+    inspected_substations = db.Column(db.Integer, nullable=False, default=0)
+    tested_substations = db.Column(db.Integer, nullable=False, default=0)
+    total_inspection_records = db.Column(db.Integer, nullable=False, default=0)
+    inspected_records = db.Column(db.Integer, nullable=False, default=0)
+    inspection_status_records = db.Column(db.Integer, nullable=False, default=0)
+    tested_records = db.Column(db.Integer, nullable=False, default=0)
+    testing_status_records = db.Column(db.Integer, nullable=False, default=0)
+    verified_at = db.Column(db.DateTime)
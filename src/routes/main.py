@@ -1,86 +1,67 @@
 # src/routes/main.py
-from flask import Blueprint, render_template, request, redirect, url_for, flash
+import hashlib
+import os
+from flask import Blueprint, render_template, request, redirect, url_for, flash, jsonify, abort, send_file, current_app
+from flask import Response, stream_with_context
 from flask_login import login_required, current_user
 from datetime import datetime, date, timedelta
-from sqlalchemy import func, case, distinct
-from sqlalchemy.orm import joinedload # Import joinedload for eager loading
 
-from src.extensions import db
-from src.models.substation import Substation, InspectionTest, ReliabilityMetric
+from src.extensions import db, cache, profiler, prometheus
+from src.utils.prometheus import reliability_gauges
+from src.utils.db_engines import replica_reads
+from src.utils.substation_search import search_substations, DEFAULT_LIMIT as SEARCH_LIMIT
+from src.utils.cache import METRICS, INVENTORY
+from src.models.substation import Substation, InspectionTest, ReliabilityMetric, SubstationStatus
+from src.models.substation import INSPECTION_STATUSES, TESTING_STATUSES
 from src.models.user import Role, User # Ensure User is imported
 from src.forms.substation_forms import SubstationForm
 from src.forms.inspection_forms import InspectionTestForm # Keep this import
+from src.utils.inspection_listing import InspectionListing, ListingError
+from src.utils.inspection_search import InspectionSearch, SearchError
+from src.utils.bulk_inspections import bulk_update_latest_inspections, bulk_update_coverage
+from src.utils.metric_counters import reset_counters
+from src.utils.inspection_archive import purge_archived
+from src.utils.jobs import runner as job_runner, JobError
+from src.models.job import Job, JobStatus
+from src.utils.importer import ErrorReport, report_path, import_inspections
+from src.utils.importer import import_substations as import_substations_file
+from src.utils.exporter import export_stream, ExportError
+from src.utils import metric_trends
+from src.utils.metric_trends import MetricSeriesRequest, SeriesError
 
 main_bp = Blueprint("main", __name__)
 
 @main_bp.route("/")
 @main_bp.route("/dashboard")
 @login_required
+@replica_reads
 def dashboard():
     # UPDATED: Use MetricCalculator for consistent calculations
     from src.utils.metric_calculator import MetricCalculator
     
-    # Calculate current metrics using the calculator
-    metrics = MetricCalculator.calculate_current_metrics()
-    
-    # Store today's daily metric automatically
-    MetricCalculator.store_daily_metric()
+    # One snapshot feeds the cards and the pies; today's daily metric is
+    # stored by the background scheduler, so this view never writes
+    snapshot = cache.get_or_compute("dashboard_snapshot", MetricCalculator.snapshot)
+    metrics = MetricCalculator.calculate_current_metrics(snapshot)
     
     # Extract values for template
     total_substations = metrics['total_substations']
-    coverage_ratio = metrics['coverage_ratio']
     inspection_compliance = metrics['inspection_compliance']
     testing_compliance = metrics['testing_compliance']
     effective_reliability = metrics['effective_reliability']
-    
-    # Calculate individual counts for charts
-    fully_covered = Substation.query.filter_by(coverage_status="Fully Covered").count()
-    partially_covered = Substation.query.filter_by(coverage_status="Partially Covered").count()
 
     # Prepare data for Chart.js
     
     # Coverage Status Distribution
-    # This remains unchanged as 'Fully Covered', 'Partially Covered', 'Not Covered' are already distinct.
-    coverage_data = {
-        "labels": ["Fully Covered", "Partially Covered", "Not Covered"],
-        "data": [fully_covered, partially_covered, total_substations - fully_covered - partially_covered]
-    }
-
-    # Inspection Status Distribution (modified for simplified chart view)
-    # Map 'Pending', 'Failed', and 'Not Inspected' (from new records) to 'Not Inspected'
-    inspection_status_case = case(
-        (InspectionTest.inspection_status == "Inspected", "Inspected"),
-        else_="Not Inspected"
-    ).label("simplified_inspection_status")
-
-    # Count records based on the simplified status
-    inspection_status_counts = db.session.query(
-        inspection_status_case, func.count(InspectionTest.id)
-    ).group_by(inspection_status_case).all()
-
-    inspection_data_labels = [label for label, count in inspection_status_counts]
-    inspection_data_values = [count for label, count in inspection_status_counts]
-
-    # Calculate total inspection records for accurate percentages in tooltip
-    total_inspection_records = db.session.query(func.count(InspectionTest.id)).filter(InspectionTest.inspection_status.isnot(None)).scalar() or 0
-
-    # Testing Status Distribution (modified for simplified chart view)
-    # Map 'Pending', 'Failed', 'N/A', and 'Not Tested' (from new records) to 'Not Tested'
-    testing_status_case = case(
-        (InspectionTest.testing_status == "Tested", "Tested"),
-        else_="Not Tested"
-    ).label("simplified_testing_status")
-
-    # Count records based on the simplified status
-    testing_status_counts = db.session.query(
-        testing_status_case, func.count(InspectionTest.id)
-    ).group_by(testing_status_case).all()
-
-    testing_data_labels = [label for label, count in testing_status_counts]
-    testing_data_values = [count for label, count in testing_status_counts]
-
-    # Calculate total testing records for accurate percentages in tooltip
-    total_testing_records = db.session.query(func.count(InspectionTest.id)).filter(InspectionTest.testing_status.isnot(None)).scalar() or 0
+    coverage_data = snapshot.coverage_chart()
+
+    # Inspection Status Distribution (simplified to Inspected / Not Inspected)
+    inspection_data_labels, inspection_data_values = snapshot.inspection_chart()
+    total_inspection_records = snapshot.inspection_status_records
+
+    # Testing Status Distribution (simplified to Tested / Not Tested)
+    testing_data_labels, testing_data_values = snapshot.testing_chart()
+    total_testing_records = snapshot.testing_status_records
 
     return render_template("dashboard.html",
                            total_substations=total_substations,
@@ -106,26 +87,29 @@ def substations():
         flash("You do not have permission to view substations.", "danger")
         return redirect(url_for("main.dashboard"))
     
-    substations = Substation.query.all()
+    # One keyset page at a time, like the inspections listing, instead of every row at once
+    try:
+        listing = InspectionListing.from_args(request.args)
+    except ListingError as e:
+        flash(str(e), "warning")
+        listing = InspectionListing()
+    page = listing.fetch()
     form = SubstationForm()
-    
-    substations_with_status = []
-    for sub in substations:
-        latest_inspection = InspectionTest.query.filter_by(substation_id=sub.id)\
-                                .order_by(InspectionTest.inspection_date.desc()).first()
-        sub_status = {
-            "id": sub.id,
-            "name": sub.name,
-            "coverage_status": sub.coverage_status,
-            "last_inspection_date": latest_inspection.inspection_date.strftime('%Y-%m-%d') if latest_inspection else 'N/A',
-            "inspection_status": latest_inspection.inspection_status if latest_inspection else 'Not Inspected',
-            "testing_status": latest_inspection.testing_status if latest_inspection else 'N/A',
-            "created_at": sub.created_at.strftime('%Y-%m-%d %H:%M:%S')
-        }
-        substations_with_status.append(sub_status)
-
-
-    return render_template("substations.html", substations=substations_with_status, form=form)
+
+    substations_with_status = [{
+        "id": item["id"],
+        "name": item["name"],
+        "coverage_status": item["coverage_status"],
+        "last_inspection_date": item["latest_inspection_date"],
+        "inspection_status": item["inspection_status"],
+        "testing_status": item["testing_status"],
+        "created_at": item["created_at"]
+    } for item in page["items"]]
+    filter_args = {key: request.args[key] for key in ("coverage_status", "sort", "direction", "limit")
+                   if request.args.get(key)}
+
+    return render_template("substations.html", substations=substations_with_status, form=form,
+                           listing=listing, next_cursor=page["next_cursor"], filter_args=filter_args)
 
 @main_bp.route("/substations/add", methods=["GET", "POST"])
 @login_required
@@ -175,6 +159,8 @@ def delete_substation(substation_id):
 
     substation = Substation.query.get_or_404(substation_id)
     try:
+        # SQLite leaves foreign keys unenforced, so the archive's ON DELETE CASCADE may not fire
+        purge_archived(substation_id=substation.id)
         db.session.delete(substation)
         db.session.commit()
         flash("Substation deleted successfully!", "success")
@@ -190,39 +176,68 @@ def inspections():
         flash("You do not have permission to view inspections.", "danger")
         return redirect(url_for("main.dashboard"))
 
-    all_substations = Substation.query.options(joinedload(Substation.inspections)).all()
-
-    tested_substations = []
-    not_tested_substations = []
+    # One page of one tab, keyset-paginated on the sort column and id
+    tab = request.args.get("tested") if request.args.get("tested") in ("tested", "not_tested") else "tested"
+    try:
+        listing = InspectionListing.from_args(request.args, tested=tab)
+    except ListingError as e:
+        flash(str(e), "warning")
+        listing = InspectionListing(tested=tab)
+    page = listing.fetch()
+
+    # Current filters, carried over by the tab, sort and next-page links
+    filter_args = {key: request.args[key] for key in ("coverage_status", "date_from", "date_to", "sort", "direction", "limit")
+                   if request.args.get(key)}
+
+    return render_template("inspections.html",
+                           substations=page["items"],
+                           next_cursor=page["next_cursor"],
+                           tab=tab,
+                           listing=listing,
+                           filter_args=filter_args)
+
+@main_bp.route("/inspections/search")
+@login_required
+@replica_reads
+def search_inspections():
+    """Ranked full-text search over inspection notes and substation names"""
+    if not current_user.is_inspector() and not current_user.is_admin():
+        if _wants_json():
+            return jsonify({"error": "You do not have permission to search inspections."}), 403
+        flash("You do not have permission to search inspections.", "danger")
+        return redirect(url_for("main.dashboard"))
 
-    for sub in all_substations:
-        # Get the most recent inspection for this substation by sorting in Python
-        # orderBy() on the query level is removed to avoid index errors.
-        latest_inspection = next(
-            (i for i in sorted(sub.inspections, key=lambda x: x.inspection_date if x.inspection_date else date.min, reverse=True)),
-            None
-        )
+    try:
+        search = InspectionSearch.from_args(request.args)
+        results = search.fetch()
+    except SearchError as e:
+        if _wants_json():
+            return jsonify({"error": str(e)}), 400
+        flash(str(e), "warning")
+        search, results = None, {"items": [], "page": 1, "per_page": 0, "has_more": False}
+
+    if _wants_json():
+        items = [dict(item, inspection_date=item["inspection_date"].isoformat(), snippet=str(item["snippet"]),
+                      substation_highlight=str(item["substation_highlight"])) for item in results["items"]]
+        return jsonify(dict(results, items=items))
+
+    filter_args = {key: request.args[key] for key in ("q", "date_from", "date_to", "inspection_status",
+                                                      "testing_status", "per_page") if request.args.get(key)}
+    return render_template("search_inspections.html", search=search, results=results, filter_args=filter_args,
+                           inspection_statuses=INSPECTION_STATUSES, testing_statuses=TESTING_STATUSES)
+
+@main_bp.route("/api/inspections")
+@login_required
+def inspections_api():
+    """Paginated JSON listing of substations with their latest inspection"""
+    if not current_user.is_inspector() and not current_user.is_admin():
+        return jsonify({"error": "You do not have permission to view inspections."}), 403
 
-        sub_data = {
-            "id": sub.id,
-            "name": sub.name,
-            "coverage_status": sub.coverage_status,
-            "latest_inspection_date": latest_inspection.inspection_date.strftime('%Y-%m-%d') if latest_inspection and latest_inspection.inspection_date else 'N/A',
-            "inspection_status": latest_inspection.inspection_status if latest_inspection else 'Not Inspected',
-            "testing_status": latest_inspection.testing_status if latest_inspection else 'N/A',
-            "notes": latest_inspection.notes if latest_inspection else '',
-            "user_recorded": latest_inspection.user.username if latest_inspection and latest_inspection.user else 'N/A',
-            "created_at": sub.created_at.strftime('%Y-%m-%d %H:%M:%S')
-        }
-
-        if latest_inspection and latest_inspection.testing_status == "Tested":
-            tested_substations.append(sub_data)
-        else:
-            not_tested_substations.append(sub_data)
-
-    return render_template("inspections.html", 
-                           tested_substations=tested_substations,
-                           not_tested_substations=not_tested_substations)
+    try:
+        listing = InspectionListing.from_args(request.args)
+    except ListingError as e:
+        return jsonify({"error": str(e)}), 400
+    return jsonify(listing.fetch())
 
 @main_bp.route("/inspections/add", methods=["GET", "POST"])
 @login_required
@@ -232,8 +247,6 @@ def add_inspection():
         return redirect(url_for("main.dashboard"))
     
     form = InspectionTestForm()
-    substations = Substation.query.all()
-    form.substation_id.choices = [(s.id, s.name) for s in substations]
 
     if form.validate_on_submit():
         new_inspection = InspectionTest(
@@ -253,7 +266,7 @@ def add_inspection():
         except Exception as e:
             db.session.rollback()
             flash(f"Error adding inspection: {e}", "danger")
-    return render_template("add_inspection.html", form=form, substations=substations)
+    return render_template("add_inspection.html", form=form, selected_substation=_selected_substation(form))
 
 @main_bp.route("/inspections/edit/<int:inspection_id>", methods=["GET", "POST"])
 @login_required
@@ -264,8 +277,6 @@ def edit_inspection(inspection_id):
 
     inspection = InspectionTest.query.get_or_404(inspection_id)
     form = InspectionTestForm(obj=inspection)
-    substations = Substation.query.all()
-    form.substation_id.choices = [(s.id, s.name) for s in substations]
 
     if form.validate_on_submit():
         inspection.substation_id = form.substation_id.data
@@ -281,7 +292,44 @@ def edit_inspection(inspection_id):
             db.session.rollback()
             flash(f"Error updating inspection: {e}", "danger")
     
-    return render_template("edit_inspection.html", form=form, inspection_id=inspection.id, substations=substations)
+    return render_template("edit_inspection.html", form=form, inspection_id=inspection.id,
+                           selected_substation=_selected_substation(form))
+
+def _selected_substation(form):
+    """The substation to pre-fill the picker with: the submitted or stored id, if it still exists"""
+    try:
+        return db.session.get(Substation, int(form.substation_id.data)) if form.substation_id.data else None
+    except (TypeError, ValueError):
+        return None
+
+@main_bp.route("/api/substations/search")
+@login_required
+def search_substations_api():
+    """Typeahead matches for the substation picker, in select2's {"results": [{"id", "text"}]} shape"""
+    if not current_user.is_inspector() and not current_user.is_admin():
+        return jsonify({"error": "You do not have permission to search substations."}), 403
+    term = request.args.get("q", "")
+    limit = request.args.get("limit", SEARCH_LIMIT, type=int) or SEARCH_LIMIT
+
+    # Substation writes bump the inventory version, so version + query identify the
+    # result without running it; without the cache the ETag is a hash of the body
+    etag = None
+    if cache.enabled:
+        version = cache.versions([INVENTORY])[0]
+        etag = hashlib.sha1(f"{version}:{term.strip().lower()}:{limit}".encode()).hexdigest()
+        if etag in request.if_none_match:
+            response = Response(status=304)
+            response.set_etag(etag)
+            return response
+
+    rows = search_substations(term, limit)
+    response = jsonify({"results": [{"id": id, "text": name} for id, name in rows]})
+    if etag:
+        response.set_etag(etag)
+    else:
+        response.add_etag()
+    response.headers["Cache-Control"] = "private, no-cache"
+    return response.make_conditional(request)
 
 @main_bp.route("/inspections/delete/<int:inspection_id>", methods=["POST"])
 @login_required
@@ -318,35 +366,12 @@ def bulk_update_inspections():
     substation_ids = [int(s_id) for s_id in selected_substation_ids_str.split(',') if s_id.strip()]
 
     try:
-        for sub_id in substation_ids:
-            substation = Substation.query.get(sub_id)
-            if substation:
-                # Find the latest inspection record for this substation
-                latest_inspection = InspectionTest.query.filter_by(substation_id=sub_id)\
-                                                      .order_by(InspectionTest.inspection_date.desc()).first()
-                
-                if latest_inspection:
-                    # Update existing record
-                    if new_inspection_status:
-                        latest_inspection.inspection_status = new_inspection_status
-                    if new_testing_status:
-                        latest_inspection.testing_status = new_testing_status
-                    latest_inspection.user_id = current_user.id # Update who performed the change
-                    latest_inspection.created_at = datetime.utcnow() # Update timestamp to reflect last modification
-                else:
-                    # Create a new inspection record if none exists for this substation
-                    new_inspection = InspectionTest(
-                        substation_id=sub_id,
-                        inspection_date=date.today(), # Use current date for new entry
-                        testing_date=date.today() if new_testing_status and new_testing_status != 'N/A' else None, # Set testing date if testing status is provided and not N/A
-                        inspection_status=new_inspection_status or "Pending", # Default to Pending if not provided
-                        testing_status=new_testing_status or "N/A", # Default to N/A if not provided
-                        notes="Bulk updated",
-                        user_id=current_user.id
-                    )
-                    db.session.add(new_inspection)
+        updated_count, inserted_count = bulk_update_latest_inspections(
+            substation_ids, new_inspection_status, new_testing_status, current_user.id
+        )
         db.session.commit()
-        flash(f"Successfully updated inspection/testing records for {len(substation_ids)} substations.", "success")
+        flash(f"Successfully updated {updated_count} and created {inserted_count} inspection/testing records "
+              f"for {len(substation_ids)} selected substations.", "success")
     except Exception as e:
         db.session.rollback()
         flash(f"Error during bulk update: {e}", "danger")
@@ -356,6 +381,7 @@ def bulk_update_inspections():
 
 @main_bp.route("/metrics")
 @login_required
+@replica_reads
 def metrics():
     # Ensure current_user is available and has necessary attributes
     if not hasattr(current_user, 'is_authenticated') or not current_user.is_authenticated:
@@ -368,81 +394,34 @@ def metrics():
         return redirect(url_for("main.dashboard"))
 
 
-    # Weekly Trend (Last 12 Weeks)
-    # Cast date to DATE for proper grouping and ordering in PostgreSQL
-    weekly_metrics_raw = db.session.query(
-        func.to_char(ReliabilityMetric.date, "YYYY-MM-DD").label("date"),
-        ReliabilityMetric.reliability_score,
-        ReliabilityMetric.testing_compliance,
-        ReliabilityMetric.inspection_compliance,
-        ReliabilityMetric.coverage_ratio,
-        ReliabilityMetric.effective_reliability
-    ).filter(
-        ReliabilityMetric.date >= (date.today() - timedelta(weeks=12))
-    ).order_by(ReliabilityMetric.date).all()
-
-    weekly_metrics = []
-    for week_data in weekly_metrics_raw:
-        weekly_metrics.append({
-            'date': week_data.date,
-            'reliability_score': week_data.reliability_score,
-            'testing_compliance': week_data.testing_compliance,
-            'inspection_compliance': week_data.inspection_compliance,
-            'coverage_ratio': week_data.coverage_ratio,
-            'effective_reliability': week_data.effective_reliability
-        })
-
-    # Monthly Trend (Last 12 Months)
-    # Using func.to_char for PostgreSQL compatibility
-    monthly_metrics_raw = db.session.query(
-        func.to_char(ReliabilityMetric.date, "YYYY-MM").label("month"),
-        func.avg(ReliabilityMetric.reliability_score).label("avg_reliability"),
-        func.avg(ReliabilityMetric.testing_compliance).label("avg_testing_compliance"),
-        func.avg(ReliabilityMetric.inspection_compliance).label("avg_inspection_compliance"),
-        func.avg(ReliabilityMetric.coverage_ratio).label("avg_coverage_ratio"),
-        func.avg(ReliabilityMetric.effective_reliability).label("avg_effective_reliability")
-    ).filter(
-        ReliabilityMetric.date >= (date.today() - timedelta(days=30*12)) # Approximately 12 months
-    ).group_by("month").order_by("month").all()
-    
-    monthly_metrics = []
-    for month_data in monthly_metrics_raw:
-        monthly_metrics.append({
-            'month': month_data.month,
-            'avg_reliability': month_data.avg_reliability,
-            'avg_testing_compliance': month_data.avg_testing_compliance,
-            'avg_inspection_compliance': month_data.avg_inspection_compliance,
-            'avg_coverage_ratio': month_data.avg_coverage_ratio,
-            'avg_effective_reliability': month_data.avg_effective_reliability
-        })
-
-    # Yearly Trend (Last 5 Years)
-    # Using func.to_char for PostgreSQL compatibility
-    yearly_metrics_raw = db.session.query(
-        func.to_char(ReliabilityMetric.date, "YYYY").label("year"),
-        func.avg(ReliabilityMetric.reliability_score).label("avg_reliability"),
-        func.avg(ReliabilityMetric.testing_compliance).label("avg_testing_compliance"),
-        func.avg(ReliabilityMetric.inspection_compliance).label("avg_inspection_compliance"),
-        func.avg(ReliabilityMetric.coverage_ratio).label("avg_coverage_ratio"),
-        func.avg(ReliabilityMetric.effective_reliability).label("avg_effective_reliability")
-    ).filter(ReliabilityMetric.date >= (date.today() - timedelta(days=365*5))).group_by("year").order_by("year").all()
-    
-    yearly_metrics = []
-    for year_data in yearly_metrics_raw:
-        yearly_metrics.append({
-            'year': year_data.year,
-            'avg_reliability': year_data.avg_reliability,
-            'avg_testing_compliance': year_data.avg_testing_compliance,
-            'avg_inspection_compliance': year_data.avg_inspection_compliance,
-            'avg_coverage_ratio': year_data.avg_coverage_ratio,
-            'avg_effective_reliability': year_data.avg_effective_reliability
-        })
+    # One grouped query per granularity; works on SQLite and PostgreSQL.
+    # Cached until a ReliabilityMetric write (or the day changes)
+    weekly_metrics, monthly_metrics, yearly_metrics = cache.get_or_compute(
+        f"metrics_trends:{date.today().isoformat()}",
+        lambda: (metric_trends.weekly_trend(weeks=12),
+                 metric_trends.monthly_trend(months=12),
+                 metric_trends.yearly_trend(years=5)),
+        depends_on=(METRICS,)
+    )
 
     return render_template("metrics.html", 
                            weekly_metrics=weekly_metrics,
                            monthly_metrics=monthly_metrics,
                            yearly_metrics=yearly_metrics)
 
+@main_bp.route("/api/metrics/series")
+@login_required
+def metric_series_api():
+    """Stored metrics for a period type and date range, with rolling analytics, from the in-process store.
+    An optional `points` budget downsamples the rows (LTTB) for charting."""
+    if not (current_user.is_admin() or current_user.is_inspector()):
+        return jsonify({"error": "You do not have permission to view metrics."}), 403
+
+    try:
+        return jsonify(MetricSeriesRequest.from_args(request.args).fetch())
+    except SeriesError as e:
+        return jsonify({"error": str(e)}), 400
+
 @main_bp.route("/import_substations", methods=["GET", "POST"])
 @login_required
 def import_substations():
@@ -461,38 +440,67 @@ def import_substations():
             flash('No selected file', 'danger')
             return redirect(request.url)
         
-        if file and file.filename.endswith('.csv'):
-            try:
-                # Read CSV using pandas
-                df = pd.read_csv(file)
-                
-                # Assuming CSV has 'name' and 'coverage_status' columns
-                # Add validation for columns and data types if necessary
-                
-                imported_count = 0
-                for index, row in df.iterrows():
-                    name = row['name']
-                    coverage_status = row['coverage_status']
-                    
-                    # Check if substation already exists
-                    existing_substation = Substation.query.filter_by(name=name).first()
-                    if not existing_substation:
-                        new_substation = Substation(name=name, coverage_status=coverage_status)
-                        db.session.add(new_substation)
-                        imported_count += 1
-                    else:
-                        flash(f"Substation '{name}' already exists and was skipped.", "info")
-
-                db.session.commit()
-                flash(f"Successfully imported {imported_count} new substations!", "success")
-                return redirect(url_for("main.substations"))
-            except Exception as e:
-                db.session.rollback()
-                flash(f"Error importing CSV: {e}", "danger")
-        else:
-            flash('Invalid file type. Please upload a CSV file.', 'danger')
+        kind = request.form.get('kind', 'substations')
+        report = ErrorReport(_import_report_dir())
+        try:
+            if kind == 'inspections':
+                imported_count = import_inspections(file.stream, file.filename, report, user_id=current_user.id)
+            else:
+                imported_count = import_substations_file(file.stream, file.filename, report)
+        except Exception as e:
+            db.session.rollback()
+            flash(f"Error importing file: {e}", "danger")
+            return render_template("import_substations.html", kind=kind)
+        finally:
+            report.close()
+
+        label = "inspection records" if kind == 'inspections' else "substations"
+        if report.count == 0:
+            flash(f"Successfully imported {imported_count} new {label}!", "success")
+            return redirect(url_for("main.inspections" if kind == 'inspections' else "main.substations"))
+
+        # One summary message plus a downloadable row-level report instead of a flash per row
+        flash(f"Imported {imported_count} new {label}; {report.count} row(s) were skipped.", "warning")
+        return render_template("import_substations.html", kind=kind,
+                               report_url=url_for("main.import_report", token=report.token))
             
-    return render_template("import_substations.html")
+    return render_template("import_substations.html", kind=request.args.get('kind', 'substations'))
+
+@main_bp.route("/import_substations/report/<token>")
+@login_required
+def import_report(token):
+    if not current_user.is_admin():
+        flash("You do not have permission to view import reports.", "danger")
+        return redirect(url_for("main.dashboard"))
+
+    path = report_path(_import_report_dir(), token)
+    if not path or not os.path.exists(path):
+        abort(404)
+    return send_file(path, mimetype="text/csv", as_attachment=True, download_name=f"import_errors_{token[:8]}.csv")
+
+def _import_report_dir():
+    return os.path.join(current_app.instance_path, "import_reports")
+
+@main_bp.route("/export/<dataset>")
+@login_required
+@replica_reads
+def export_data(dataset):
+    """Stream substations, inspection history or reliability metrics as CSV or XLSX"""
+    if not current_user.is_inspector() and not current_user.is_admin():
+        flash("You do not have permission to export data.", "danger")
+        return redirect(url_for("main.dashboard"))
+
+    args = {"period_type": request.args.get("period_type")}
+    try:
+        for key in ("start", "end"):
+            if request.args.get(key):
+                args[key] = datetime.strptime(request.args[key], "%Y-%m-%d").date()
+        generator, mimetype, filename = export_stream(dataset, request.args.get("format", "csv"), args)
+    except (ValueError, ExportError) as e:
+        return jsonify({"error": str(e)}), 400
+
+    return Response(stream_with_context(generator), mimetype=mimetype,
+                    headers={"Content-Disposition": f"attachment; filename={filename}"})
 
 @main_bp.route("/reset_substation_ids", methods=["POST"])
 @login_required
@@ -504,9 +512,13 @@ def reset_substation_ids():
     try:
         # Delete all records from related tables first to avoid foreign key constraints
         # Ensure to delete from children tables before parent tables
+        SubstationStatus.query.delete()
         InspectionTest.query.delete()
+        purge_archived()
         Substation.query.delete()
         ReliabilityMetric.query.delete() # Assuming reliability metrics are related to substations or generated based on them
+        # Bulk deletes skip the flush hooks; zero the running totals with them
+        reset_counters()
 
         # Reset the auto-increment sequence for PostgreSQL if you are using it
         # This part is highly database-specific. For SQLite, it's usually handled automatically or not needed as directly.
@@ -545,10 +557,7 @@ def bulk_edit_substations():
     try:
         substation_ids = [int(s_id) for s_id in selected_ids_str.split(',') if s_id.strip()]
         
-        num_updated = db.session.query(Substation).filter(Substation.id.in_(substation_ids)).update(
-            {"coverage_status": new_coverage_status},
-            synchronize_session='fetch'
-        )
+        num_updated = bulk_update_coverage(substation_ids, new_coverage_status)
         db.session.commit()
         flash(f"Successfully updated coverage status for {num_updated} substations to '{new_coverage_status}'.", "success")
     except Exception as e:
@@ -558,68 +567,152 @@ def bulk_edit_substations():
     return redirect(url_for("main.substations"))
 
 
+@main_bp.route("/admin/cache_stats")
+@login_required
+def cache_stats():
+    """Hit/miss counters of the view cache for the worker serving this request"""
+    if not current_user.is_admin():
+        return jsonify({"error": "You do not have permission to view cache statistics."}), 403
+    return jsonify(cache.stats())
+
+@main_bp.route("/metrics/prometheus")
+@replica_reads
+def prometheus_metrics():
+    """Prometheus text exposition; needs `Authorization: Bearer <PROMETHEUS_TOKEN>`, or PROMETHEUS_PUBLIC=1"""
+    if not prometheus.enabled:
+        abort(404)
+    token = current_app.config.get("PROMETHEUS_TOKEN")
+    if not token and not current_app.config.get("PROMETHEUS_PUBLIC"):
+        abort(404)
+    if token and request.headers.get("Authorization") != f"Bearer {token}":
+        return Response("Unauthorized\n", status=401, mimetype="text/plain")
+    from src.utils.metric_calculator import MetricCalculator
+    body = prometheus.render(reliability_gauges(MetricCalculator.snapshot()))
+    return Response(body, content_type="text/plain; version=0.0.4; charset=utf-8")
+
+@main_bp.route("/admin/perf")
+@login_required
+def perf():
+    """Sampled SQL profiles and per-endpoint query totals for the worker serving this request"""
+    if not current_user.is_admin():
+        if _wants_json():
+            return jsonify({"error": "You do not have permission to view performance data."}), 403
+        flash("You do not have permission to view performance data.", "danger")
+        return redirect(url_for("main.dashboard"))
+    stats = profiler.stats()
+    if _wants_json():
+        return jsonify(stats)
+    return render_template("perf.html", stats=stats)
+
+@main_bp.route("/admin/perf/reset", methods=["POST"])
+@login_required
+def reset_perf():
+    if not current_user.is_admin():
+        flash("You do not have permission to reset performance data.", "danger")
+        return redirect(url_for("main.dashboard"))
+    profiler.reset()
+    flash("Performance data cleared for this worker.", "success")
+    return redirect(url_for("main.perf"))
+
 @main_bp.route("/admin/calculate_metrics", methods=["POST"])
 @login_required
 def calculate_metrics():
-    """Admin route to manually trigger metric calculations"""
+    """Admin route to queue a full metric recalculation"""
     if not current_user.is_admin():
         flash("You do not have permission to calculate metrics.", "danger")
         return redirect(url_for("main.dashboard"))
     
-    try:
-        from src.utils.metric_calculator import MetricCalculator
-        
-        # Store today's daily metric
-        MetricCalculator.store_daily_metric()
-        
-        # Process historical metrics
-        MetricCalculator.process_historical_metrics()
-        
-        flash("Metrics calculated and stored successfully!", "success")
-    except Exception as e:
-        flash(f"Error calculating metrics: {e}", "danger")
-    
-    return redirect(url_for("main.metrics"))
+    return _enqueue_job("recalculate_metrics", {}, "Recalculation of all metrics")
 
 @main_bp.route("/admin/monthly_metrics/<int:year>/<int:month>", methods=["POST"])
 @login_required
 def calculate_monthly_metrics(year, month):
-    """Admin route to calculate metrics for a specific month"""
+    """Admin route to queue metric calculation for a specific month"""
     if not current_user.is_admin():
         flash("You do not have permission to calculate metrics.", "danger")
         return redirect(url_for("main.dashboard"))
     
-    try:
-        from src.utils.metric_calculator import MetricCalculator
-        
-        success = MetricCalculator.store_monthly_metric(year, month)
-        if success:
-            flash(f"Monthly metrics for {year}-{month:02d} calculated successfully!", "success")
-        else:
-            flash(f"No daily data available for {year}-{month:02d}.", "warning")
-    except Exception as e:
-        flash(f"Error calculating monthly metrics: {e}", "danger")
-    
-    return redirect(url_for("main.metrics"))
+    if not 1 <= month <= 12:
+        if _wants_json():
+            return jsonify({"error": f"Invalid month: {month}"}), 400
+        flash(f"Invalid month: {month}", "danger")
+        return redirect(url_for("main.metrics"))
+    return _enqueue_job("monthly_metrics", {"year": year, "month": month},
+                        f"Monthly metrics for {year}-{month:02d}")
 
 @main_bp.route("/admin/yearly_metrics/<int:year>", methods=["POST"])
 @login_required
 def calculate_yearly_metrics(year):
-    """Admin route to calculate metrics for a specific year"""
+    """Admin route to queue metric calculation for a specific year"""
     if not current_user.is_admin():
         flash("You do not have permission to calculate metrics.", "danger")
         return redirect(url_for("main.dashboard"))
     
+    return _enqueue_job("yearly_metrics", {"year": year}, f"Yearly metrics for {year}")
+
+def _wants_json():
+    return request.accept_mimetypes.best == "application/json"
+
+def _enqueue_job(kind, params, description):
+    """Queue a background job; JSON callers get 202 with the job, form posts a flash and redirect"""
     try:
-        from src.utils.metric_calculator import MetricCalculator
-        
-        success = MetricCalculator.store_yearly_metric(year)
-        if success:
-            flash(f"Yearly metrics for {year} calculated successfully!", "success")
-        else:
-            flash(f"No monthly data available for {year}.", "warning")
-    except Exception as e:
-        flash(f"Error calculating yearly metrics: {e}", "danger")
+        job = job_runner.enqueue(kind, params, user_id=current_user.id)
+    except JobError as e:
+        if _wants_json():
+            return jsonify({"error": str(e)}), 400
+        flash(f"Could not queue job: {e}", "danger")
+        return redirect(url_for("main.metrics"))
     
+    if _wants_json():
+        return jsonify(job.to_dict()), 202
+    flash(f"{description} queued as job #{job.id}. Progress is shown below.", "info")
     return redirect(url_for("main.metrics"))
 
+@main_bp.route("/admin/jobs")
+@login_required
+def list_jobs():
+    """Recent background jobs, newest first"""
+    if not current_user.is_admin():
+        return jsonify({"error": "You do not have permission to view jobs."}), 403
+    limit = min(request.args.get("limit", 10, type=int) or 10, 100)
+    query = Job.query
+    if request.args.get("active"):
+        query = query.filter(Job.status.in_(JobStatus.ACTIVE))
+    jobs = query.order_by(Job.id.desc()).limit(limit).all()
+    return jsonify({"jobs": [_job_dict(job) for job in jobs]})
+
+def _job_dict(job):
+    # Stale jobs lost their worker; the panel offers cancel and retry for them
+    return dict(job.to_dict(), stale=job_runner.is_stale(job))
+
+@main_bp.route("/admin/jobs/<int:job_id>")
+@login_required
+def job_status(job_id):
+    """Progress and outcome of one background job"""
+    if not current_user.is_admin():
+        return jsonify({"error": "You do not have permission to view jobs."}), 403
+    job = db.session.get(Job, job_id)
+    if job is None:
+        return jsonify({"error": f"Job {job_id} not found"}), 404
+    return jsonify(_job_dict(job))
+
+@main_bp.route("/admin/jobs/<int:job_id>/cancel", methods=["POST"])
+@login_required
+def cancel_job(job_id):
+    if not current_user.is_admin():
+        return jsonify({"error": "You do not have permission to cancel jobs."}), 403
+    try:
+        return jsonify(job_runner.cancel(job_id).to_dict())
+    except JobError as e:
+        return jsonify({"error": str(e)}), 409
+
+@main_bp.route("/admin/jobs/<int:job_id>/retry", methods=["POST"])
+@login_required
+def retry_job(job_id):
+    if not current_user.is_admin():
+        return jsonify({"error": "You do not have permission to retry jobs."}), 403
+    try:
+        return jsonify(job_runner.retry(job_id).to_dict()), 202
+    except JobError as e:
+        return jsonify({"error": str(e)}), 409
+
@@ -0,0 +1,145 @@
+// Background job panel for the metrics page: lists recent jobs and polls while any are active
+(function() {
+    const POLL_INTERVAL_MS = 2000;
+    const STATUS_BADGES = {
+        queued: "bg-secondary",
+        running: "bg-primary",
+        succeeded: "bg-success",
+        failed: "bg-danger",
+        cancelled: "bg-warning text-dark"
+    };
+    const JOB_LABELS = {
+        recalculate_metrics: "Recalculate all metrics",
+        monthly_metrics: "Monthly metrics",
+        yearly_metrics: "Yearly metrics"
+    };
+
+    let pollTimer = null;
+    const seenActive = new Set();
+
+    function panel() {
+        return document.getElementById("jobsPanel");
+    }
+
+    function describe(job) {
+        const label = JOB_LABELS[job.kind] || job.kind;
+        const params = job.params || {};
+        if (params.month) {
+            return `${label} ${params.year}-${String(params.month).padStart(2, "0")}`;
+        }
+        if (params.year) {
+            return `${label} ${params.year}`;
+        }
+        return label;
+    }
+
+    function escapeHtml(text) {
+        const div = document.createElement("div");
+        div.textContent = text == null ? "" : String(text);
+        return div.innerHTML;
+    }
+
+    function renderJob(job) {
+        const percent = Math.round((job.progress || 0) * 100);
+        const active = job.status === "queued" || job.status === "running";
+        let actions = "";
+        const cancelButton = `<button type="button" class="btn btn-sm btn-outline-danger" data-job-action="cancel" data-job-id="${job.id}">Cancel</button>`;
+        const retryButton = `<button type="button" class="btn btn-sm btn-outline-primary" data-job-action="retry" data-job-id="${job.id}">Retry</button>`;
+        if (job.stale) {
+            // Its worker stopped: nothing will pick up a cancellation request, so offer both
+            actions = `${cancelButton} ${retryButton}`;
+        } else if (active && !job.cancel_requested) {
+            actions = cancelButton;
+        } else if (job.status === "failed" || job.status === "cancelled") {
+            actions = retryButton;
+        }
+        const progressBar = active ? `
+            <div class="progress mt-2" style="height: 6px;">
+                <div class="progress-bar progress-bar-striped progress-bar-animated" role="progressbar"
+                     style="width: ${percent}%" aria-valuenow="${percent}" aria-valuemin="0" aria-valuemax="100"></div>
+            </div>` : "";
+        return `
+            <li class="list-group-item">
+                <div class="d-flex justify-content-between align-items-center">
+                    <div>
+                        <strong>#${job.id}</strong> ${escapeHtml(describe(job))}
+                        <span class="badge ${STATUS_BADGES[job.status] || "bg-secondary"} ms-2">${job.status}</span>
+                        <small class="text-muted ms-2">${escapeHtml(job.message)}</small>
+                    </div>
+                    <div>${actions}</div>
+                </div>
+                ${progressBar}
+            </li>`;
+    }
+
+    function render(jobs) {
+        const container = panel();
+        if (!container) {
+            return;
+        }
+        container.classList.toggle("d-none", jobs.length === 0);
+        document.getElementById("jobsList").innerHTML = jobs.map(renderJob).join("");
+
+        // Offer a reload once a job this page watched has finished successfully
+        jobs.forEach(function(job) {
+            const active = job.status === "queued" || job.status === "running";
+            if (active) {
+                seenActive.add(job.id);
+            } else if (seenActive.has(job.id) && job.status === "succeeded") {
+                document.getElementById("jobsReload").classList.remove("d-none");
+            }
+        });
+    }
+
+    function refreshJobs() {
+        const container = panel();
+        if (!container) {
+            return;
+        }
+        fetch(container.dataset.jobsUrl + "?limit=5", { headers: { "Accept": "application/json" } })
+            .then(response => response.json())
+            .then(data => {
+                const jobs = data.jobs || [];
+                render(jobs);
+                const anyActive = jobs.some(job => job.status === "queued" || job.status === "running");
+                clearTimeout(pollTimer);
+                if (anyActive) {
+                    pollTimer = setTimeout(refreshJobs, POLL_INTERVAL_MS);
+                }
+            })
+            .catch(error => console.error("Could not load background jobs:", error));
+    }
+
+    function postJson(url) {
+        return fetch(url, { method: "POST", headers: { "Accept": "application/json" } })
+            .then(response => response.json().then(body => {
+                if (!response.ok) {
+                    throw new Error(body.error || response.statusText);
+                }
+                return body;
+            }));
+    }
+
+    // Queue a job from an admin action without leaving the page
+    window.queueJob = function(url) {
+        postJson(url)
+            .then(refreshJobs)
+            .catch(error => alert(`Could not queue job: ${error.message}`));
+    };
+
+    document.addEventListener("click", function(event) {
+        const button = event.target.closest("[data-job-action]");
+        if (!button) {
+            return;
+        }
+        button.disabled = true;
+        postJson(`/admin/jobs/${button.dataset.jobId}/${button.dataset.jobAction}`)
+            .then(refreshJobs)
+            .catch(error => {
+                alert(error.message);
+                refreshJobs();
+            });
+    });
+
+    document.addEventListener("DOMContentLoaded", refreshJobs);
+})();
@@ -0,0 +1,19 @@
+// Substation picker: select2 backed by the typeahead search endpoint instead of a full <option> list
+$(document).ready(function() {
+    $('.js-substation-picker').each(function() {
+        var $select = $(this);
+        $select.select2({
+            width: '100%',
+            placeholder: 'Search substations',
+            ajax: {
+                url: $select.data('search-url'),
+                dataType: 'json',
+                delay: 250,
+                cache: true,
+                data: function(params) {
+                    return {q: params.term || '', limit: 20};
+                }
+            }
+        });
+    });
+});
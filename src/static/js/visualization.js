@@ -115,16 +115,13 @@ document.addEventListener("DOMContentLoaded", function() {
         }
     };
 
-    // Daily Chart (formerly Weekly)
+    // Weekly Chart (ISO weeks, averaged from daily rows)
     if (weeklyMetrics && weeklyMetrics.length > 0) {
-        var dailyLabels = weeklyMetrics.map(m => {
-            const date = new Date(m.date);
-            return date.toLocaleDateString('en-US', { month: 'short', day: 'numeric' });
-        });
-        var dailyDatasets = [
+        var weeklyLabels = weeklyMetrics.map(m => m.week);
+        var weeklyDatasets = [
             {
                 label: "Effective Reliability",
-                data: weeklyMetrics.map(m => m.effective_reliability),
+                data: weeklyMetrics.map(m => m.avg_effective_reliability),
                 borderColor: colors.effective.border,
                 backgroundColor: colors.effective.background,
                 fill: true,
@@ -132,7 +129,7 @@ document.addEventListener("DOMContentLoaded", function() {
             },
             {
                 label: "Testing Compliance",
-                data: weeklyMetrics.map(m => m.testing_compliance),
+                data: weeklyMetrics.map(m => m.avg_testing_compliance),
                 borderColor: colors.testing.border,
                 backgroundColor: colors.testing.background,
                 fill: false,
@@ -140,7 +137,7 @@ document.addEventListener("DOMContentLoaded", function() {
             },
             {
                 label: "Inspection Compliance",
-                data: weeklyMetrics.map(m => m.inspection_compliance),
+                data: weeklyMetrics.map(m => m.avg_inspection_compliance),
                 borderColor: colors.inspection.border,
                 backgroundColor: colors.inspection.background,
                 fill: false,
@@ -148,16 +145,16 @@ document.addEventListener("DOMContentLoaded", function() {
             },
             {
                 label: "Coverage Ratio",
-                data: weeklyMetrics.map(m => m.coverage_ratio),
+                data: weeklyMetrics.map(m => m.avg_coverage_ratio),
                 borderColor: colors.coverage.border,
                 backgroundColor: colors.coverage.background,
                 fill: false,
                 borderWidth: 2
             }
         ];
-        var dailyCtx = document.getElementById("dailyChart").getContext("2d");
-        createLineChart(dailyCtx, dailyLabels, dailyDatasets, "Daily Reliability Trends", {
-            xAxisTitle: 'Date'
+        var weeklyCtx = document.getElementById("dailyChart").getContext("2d");
+        createLineChart(weeklyCtx, weeklyLabels, weeklyDatasets, "Weekly Reliability Trends", {
+            xAxisTitle: 'ISO Week'
         });
     }
 
@@ -251,6 +248,72 @@ document.addEventListener("DOMContentLoaded", function() {
         });
     }
 
+    // Daily History Chart: fetched on demand, LTTB-downsampled server side to about one point per pixel
+    var historyForm = document.getElementById("historyRange");
+    var historyChart = null;
+
+    function loadHistoryChart() {
+        var canvas = document.getElementById("historyChart");
+        var points = Math.max(100, Math.min(canvas.clientWidth || 800, 2000));
+        var params = new URLSearchParams({
+            period: 'daily',
+            points: points,
+            metrics: 'effective_reliability,testing_compliance,inspection_compliance,coverage_ratio'
+        });
+        var start = document.getElementById("historyStart").value;
+        var end = document.getElementById("historyEnd").value;
+        if (start) params.set('start', start);
+        if (end) params.set('end', end);
+
+        fetch(`${historyForm.dataset.seriesUrl}?${params.toString()}`, { credentials: 'same-origin' })
+            .then(response => response.json().then(body => ({ ok: response.ok, body: body })))
+            .then(({ ok, body }) => {
+                var summary = document.getElementById("historySummary");
+                if (!ok) {
+                    summary.textContent = body.error || 'Could not load the series.';
+                    return;
+                }
+                summary.textContent = body.rows
+                    ? `${body.points} of ${body.rows} days plotted, ${body.start} to ${body.end}`
+                    : 'No stored daily metrics in this range';
+                var series = body.metrics;
+                var datasets = [
+                    ["Effective Reliability", series.effective_reliability, colors.effective, true, 2],
+                    ["Testing Compliance", series.testing_compliance, colors.testing, false, 1.5],
+                    ["Inspection Compliance", series.inspection_compliance, colors.inspection, false, 1.5],
+                    ["Coverage Ratio", series.coverage_ratio, colors.coverage, false, 1.5]
+                ].map(([label, metric, color, fill, width]) => ({
+                    label: label,
+                    data: metric.values,
+                    borderColor: color.border,
+                    backgroundColor: color.background,
+                    fill: fill,
+                    borderWidth: width
+                }));
+                if (historyChart) historyChart.destroy();
+                historyChart = createLineChart(canvas.getContext("2d"), body.dates, datasets, "Daily Reliability History", {
+                    xAxisTitle: 'Day',
+                    animation: false,
+                    spanGaps: true,
+                    elements: {
+                        line: { tension: 0 },
+                        point: { radius: 0, hoverRadius: 4 }
+                    }
+                });
+            });
+    }
+
+    if (historyForm) {
+        historyForm.addEventListener('submit', function (e) {
+            e.preventDefault();
+            loadHistoryChart();
+        });
+        // First load once the tab is visible, so the canvas has its real width
+        document.getElementById("history-tab").addEventListener('shown.bs.tab', function () {
+            if (!historyChart) loadHistoryChart();
+        });
+    }
+
     // Add animation and loading states
     function showLoadingState(chartId) {
         const canvas = document.getElementById(chartId);
@@ -297,9 +360,9 @@ function refreshChart(chartType) {
     // Implementation would depend on your specific needs
 }
 
-function exportChartData(chartType) {
-    // Function to export chart data as CSV
-    console.log(`Exporting ${chartType} data...`);
-    // Implementation for data export
+function exportChartData(chartType, format = 'csv') {
+    // Download the stored metrics behind a chart; the server streams the file
+    const params = new URLSearchParams({ format: format, period_type: chartType });
+    window.location.href = `/export/reliability_metrics?${params.toString()}`;
 }
 
@@ -0,0 +1,98 @@
+# src/utils/bulk_inspections.py
+from datetime import datetime, date
+from sqlalchemy import select, update, insert, func
+from src.extensions import db
+from src.models.substation import Substation, InspectionTest, SubstationStatus
+from src.utils.substation_status import chunked, refresh_substation_status
+from src.utils.metric_counters import apply_delta, coverage_delta
+
+
+def bulk_update_latest_inspections(substation_ids, new_inspection_status, new_testing_status, user_id, session=None):
+    """Apply new statuses to each substation's latest inspection, creating one where none exists.
+
+    Set-based: one lookup of latest inspection ids, one UPDATE and one batched
+    multi-row INSERT per chunk of ids. Returns (updated_count, inserted_count).
+    The caller commits.
+    """
+    session = session or db.session
+    ids = sorted(set(substation_ids))
+
+    latest_ids = []
+    without_history = []
+    for chunk in chunked(ids):
+        rows = session.execute(
+            select(Substation.id, SubstationStatus.latest_inspection_id)
+            .outerjoin(SubstationStatus, SubstationStatus.substation_id == Substation.id)
+            .where(Substation.id.in_(chunk))
+        ).all()
+        for sub_id, latest_id in rows:
+            if latest_id:
+                latest_ids.append(latest_id)
+            else:
+                without_history.append(sub_id)
+
+    values = {
+        "user_id": user_id,  # Update who performed the change
+        "created_at": datetime.utcnow()  # Update timestamp to reflect last modification
+    }
+    if new_inspection_status:
+        values["inspection_status"] = new_inspection_status
+    if new_testing_status:
+        values["testing_status"] = new_testing_status
+
+    updated = 0
+    for chunk in chunked(latest_ids):
+        result = session.execute(
+            update(InspectionTest)
+            .where(InspectionTest.id.in_(chunk))
+            .values(**values)
+            .execution_options(synchronize_session=False)
+        )
+        updated += result.rowcount
+
+    today = date.today()
+    new_rows = [{
+        "substation_id": sub_id,
+        "inspection_date": today,
+        "testing_date": today if new_testing_status and new_testing_status != 'N/A' else None,
+        "inspection_status": new_inspection_status or "Pending",
+        "testing_status": new_testing_status or "N/A",
+        "notes": "Bulk updated",
+        "user_id": user_id,
+        "created_at": values["created_at"]
+    } for sub_id in without_history]
+    if new_rows:
+        # executemany of a single INSERT; SQLAlchemy batches it into multi-row VALUES
+        session.execute(insert(InspectionTest), new_rows)
+
+    # Core statements bypass the flush hooks, so refresh the latest-status rows here
+    refresh_substation_status(session.connection(), ids)
+    return updated, len(new_rows)
+
+
+def bulk_update_coverage(substation_ids, new_coverage_status, session=None):
+    """Set the coverage status of many substations, adjusting the metric counters to match.
+
+    Returns the number of substations updated. The caller commits.
+    """
+    session = session or db.session
+    updated = 0
+    for chunk in chunked(sorted(set(substation_ids))):
+        previous = session.execute(
+            select(Substation.coverage_status, func.count(Substation.id))
+            .where(Substation.id.in_(chunk))
+            .group_by(Substation.coverage_status)
+        ).all()
+        result = session.execute(
+            update(Substation)
+            .where(Substation.id.in_(chunk))
+            .values(coverage_status=new_coverage_status)
+            .execution_options(synchronize_session='fetch')
+        )
+        updated += result.rowcount
+        delta = coverage_delta([new_coverage_status] * result.rowcount)
+        for status, count in previous:
+            for key, value in coverage_delta([status] * count, sign=-1).items():
+                delta[key] = delta.get(key, 0) + value
+        apply_delta(session.connection(), delta)
+    return updated
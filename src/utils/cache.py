@@ -0,0 +1,196 @@
+# src/utils/cache.py
+import os
+import pickle
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from sqlalchemy import event
+from src.utils.db_engines import primary_reads
+
+# Which data-version counter each model's writes bump
+INVENTORY = "inventory"
+METRICS = "metrics"
+USERS = "users"
+# Bumped alongside METRICS when a metric write rewrites a past period, not just the current one
+METRIC_HISTORY = "metric_history"
+MODEL_VERSIONS = {
+    "Substation": INVENTORY,
+    "InspectionTest": INVENTORY,
+    "SubstationStatus": INVENTORY,
+    "ReliabilityMetric": METRICS,
+    "User": USERS
+}
+
+
+class ResponseCache:
+    """Two-tier cache of computed view data, keyed by data-version counters.
+
+    Tier 1 is an in-process LRU. Tier 2 is a small SQLite file shared by every
+    gunicorn worker on the host, which also holds the version counters. Writes
+    to tracked models bump their counter on commit, so entries computed against
+    an older version are never served; a TTL is kept as a safety net for writes
+    made outside the ORM.
+    """
+
+    def __init__(self, app=None):
+        self.enabled = False
+        self.path = None
+        self.ttl = 300
+        self.max_entries = 256
+        self._lru = OrderedDict()
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._stats = {"local_hits": 0, "shared_hits": 0, "misses": 0, "invalidations": 0}
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.enabled = app.config.get("CACHE_ENABLED", True)
+        self.path = app.config.get("CACHE_PATH") or os.path.join(app.instance_path, "cache.sqlite3")
+        self.ttl = app.config.get("CACHE_TTL", 300)
+        self.max_entries = app.config.get("CACHE_LRU_SIZE", 256)
+        app.extensions["response_cache"] = self
+        if self.enabled:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            self._connection()
+            _register_invalidation(self)
+
+    # -- shared tier -------------------------------------------------------
+
+    def _connection(self):
+        connections = getattr(self._local, "connections", None)
+        if connections is None:
+            connections = self._local.connections = {}
+        connection = connections.get(self.path)
+        if connection is None:
+            connection = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            connection.execute("CREATE TABLE IF NOT EXISTS versions (name TEXT PRIMARY KEY, version INTEGER NOT NULL)")
+            connection.execute("CREATE TABLE IF NOT EXISTS entries (key TEXT PRIMARY KEY, version TEXT NOT NULL, "
+                               "stored_at REAL NOT NULL, value BLOB NOT NULL)")
+            connections[self.path] = connection
+        return connection
+
+    def versions(self, names):
+        """Current value of each named data-version counter"""
+        rows = dict(self._connection().execute(
+            f"SELECT name, version FROM versions WHERE name IN ({','.join('?' * len(names))})", names
+        ).fetchall())
+        return tuple(rows.get(name, 0) for name in names)
+
+    def bump(self, *names):
+        """Advance data-version counters, invalidating every entry that depends on them"""
+        if not self.enabled or not names:
+            return
+        connection = self._connection()
+        for name in names:
+            connection.execute("INSERT INTO versions (name, version) VALUES (?, 1) "
+                               "ON CONFLICT(name) DO UPDATE SET version = version + 1", (name,))
+        with self._lock:
+            self._stats["invalidations"] += 1
+
+    # -- lookups -----------------------------------------------------------
+
+    def get_or_compute(self, key, compute, depends_on=(INVENTORY,), ttl=None):
+        """Return the cached value for `key` at the current data version, computing it on a miss"""
+        if not self.enabled:
+            return compute()
+
+        version = repr(self.versions(list(depends_on)))
+        now = time.time()
+        ttl = self.ttl if ttl is None else ttl
+
+        with self._lock:
+            entry = self._lru.get(key)
+            if entry and entry[0] == version and now - entry[1] < ttl:
+                self._lru.move_to_end(key)
+                self._stats["local_hits"] += 1
+                return entry[2]
+
+        row = self._connection().execute(
+            "SELECT stored_at, value FROM entries WHERE key = ? AND version = ?", (key, version)
+        ).fetchone()
+        if row and now - row[0] < ttl:
+            value = pickle.loads(row[1])
+            self._remember(key, version, row[0], value, "shared_hits")
+            return value
+
+        # The version counters track the primary's commits, so the value must be read from
+        # the primary too: a lagging replica would cache pre-write data under the new version
+        with primary_reads():
+            value = compute()
+        self._connection().execute(
+            "INSERT OR REPLACE INTO entries (key, version, stored_at, value) VALUES (?, ?, ?, ?)",
+            (key, version, now, pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL))
+        )
+        self._remember(key, version, now, value, "misses")
+        return value
+
+    def _remember(self, key, version, stored_at, value, counter):
+        with self._lock:
+            self._lru[key] = (version, stored_at, value)
+            self._lru.move_to_end(key)
+            while len(self._lru) > self.max_entries:
+                self._lru.popitem(last=False)
+            self._stats[counter] += 1
+
+    def stats(self):
+        """Hit/miss counters for this worker process"""
+        with self._lock:
+            stats = dict(self._stats)
+        lookups = stats["local_hits"] + stats["shared_hits"] + stats["misses"]
+        stats["hit_rate"] = (stats["local_hits"] + stats["shared_hits"]) / lookups if lookups else 0.0
+        stats["lru_entries"] = len(self._lru)
+        return stats
+
+
+def mark_changed(session, *names):
+    """Bump the named versions when `session` next commits, for writes the model hooks cannot classify"""
+    session.info.setdefault("cache_versions", set()).update(names)
+
+
+def _touched_versions(objects):
+    names = set()
+    for obj in objects:
+        name = MODEL_VERSIONS.get(type(obj).__name__)
+        if name:
+            names.add(name)
+    return names
+
+
+_registered = []
+
+
+def _register_invalidation(cache):
+    """Bump data versions after commits that wrote tracked models (ORM flushes or bulk statements)"""
+    if cache in _registered:
+        return
+    _registered.append(cache)
+    from src.extensions import db
+
+    def pending(session):
+        return session.info.setdefault("cache_versions", set())
+
+    @event.listens_for(db.session, "after_flush")
+    def _after_flush(session, flush_context):
+        pending(session).update(_touched_versions(list(session.new) + list(session.dirty) + list(session.deleted)))
+
+    @event.listens_for(db.session, "do_orm_execute")
+    def _on_bulk_statement(orm_execute_state):
+        if orm_execute_state.is_insert or orm_execute_state.is_update or orm_execute_state.is_delete:
+            mapper = orm_execute_state.bind_mapper
+            name = MODEL_VERSIONS.get(mapper.class_.__name__) if mapper else None
+            if name:
+                pending(orm_execute_state.session).add(name)
+
+    @event.listens_for(db.session, "after_commit")
+    def _after_commit(session):
+        names = session.info.pop("cache_versions", None)
+        if names:
+            cache.bump(*sorted(names))
+
+    @event.listens_for(db.session, "after_rollback")
+    def _after_rollback(session):
+        session.info.pop("cache_versions", None)
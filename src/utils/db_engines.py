@@ -0,0 +1,128 @@
+# src/utils/db_engines.py
+import os
+from contextlib import contextmanager
+from functools import wraps
+from flask import g, has_app_context
+from flask_sqlalchemy.session import Session
+from sqlalchemy import event
+
+# Bind key of the read-only replica in SQLALCHEMY_BINDS
+REPLICA = "replica"
+
+
+def _env_int(environ, name, default):
+    return int(environ.get(name, default))
+
+
+def normalize_url(url):
+    # Render.com hands out postgres:// URLs, which SQLAlchemy 2 no longer accepts
+    if url and url.startswith("postgres://"):
+        return url.replace("postgres://", "postgresql://", 1)
+    return url
+
+
+def _in_memory(url):
+    return url in ("sqlite://", "sqlite:///:memory:") or "mode=memory" in url
+
+
+def engine_options(url, environ=os.environ):
+    """SQLALCHEMY_ENGINE_OPTIONS for `url`, sized from DB_POOL_* environment variables"""
+    if _in_memory(url):
+        return {}  # SingletonThreadPool, which takes no sizing options
+    options = {
+        "pool_size": _env_int(environ, "DB_POOL_SIZE", 5),
+        "max_overflow": _env_int(environ, "DB_MAX_OVERFLOW", 10),
+        "pool_timeout": _env_int(environ, "DB_POOL_TIMEOUT", 30)
+    }
+    if url.startswith("sqlite"):
+        # Seconds a writer waits on a locked database before raising "database is locked"
+        options["connect_args"] = {"timeout": _env_int(environ, "SQLITE_BUSY_TIMEOUT", 15)}
+    else:
+        # Server connections can be dropped by the server or a proxy while idle in the pool
+        options["pool_pre_ping"] = environ.get("DB_POOL_PRE_PING", "1") == "1"
+        options["pool_recycle"] = _env_int(environ, "DB_POOL_RECYCLE", 1800)
+    return options
+
+
+def database_config(environ=os.environ):
+    """URI, engine options and binds for create_app from DATABASE_URL and DATABASE_REPLICA_URL"""
+    url = normalize_url(environ.get("DATABASE_URL")) or "sqlite:///fire_fighting.db"
+    config = {
+        "SQLALCHEMY_DATABASE_URI": url,
+        "SQLALCHEMY_ENGINE_OPTIONS": engine_options(url, environ),
+        "SQLALCHEMY_BINDS": {}
+    }
+    replica_url = normalize_url(environ.get("DATABASE_REPLICA_URL"))
+    if replica_url:
+        config["SQLALCHEMY_BINDS"][REPLICA] = {"url": replica_url, **engine_options(replica_url, environ)}
+    return config
+
+
+def _sqlite_pragmas(dbapi_connection, connection_record):
+    cursor = dbapi_connection.cursor()
+    # WAL lets readers in other workers proceed while one worker writes; NORMAL is safe under WAL
+    cursor.execute("PRAGMA journal_mode=WAL")
+    cursor.execute("PRAGMA synchronous=NORMAL")
+    cursor.close()
+
+
+def configure_engines(db):
+    """Apply per-connection SQLite pragmas to every file-backed SQLite engine (call inside an app context)"""
+    for engine in db.engines.values():
+        if engine.dialect.name == "sqlite" and not _in_memory(str(engine.url)):
+            if not event.contains(engine, "connect", _sqlite_pragmas):
+                event.listen(engine, "connect", _sqlite_pragmas)
+
+
+# -- read routing ----------------------------------------------------------
+
+def _replica_requested():
+    return has_app_context() and g.get("read_replica", False)
+
+
+def replica_reads(view):
+    """Send this view's plain SELECTs to the replica bind, when one is configured"""
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        g.read_replica = True
+        return view(*args, **kwargs)
+    return wrapper
+
+
+@contextmanager
+def primary_reads():
+    """Send reads inside the block to the primary, even within a replica_reads view"""
+    if not has_app_context():
+        yield
+        return
+    previous = g.get("read_replica", False)
+    g.read_replica = False
+    try:
+        yield
+    finally:
+        g.read_replica = previous
+
+
+def read_engine():
+    """Engine for reads made outside the session (e.g. streamed exports)"""
+    from src.extensions import db
+
+    if _replica_requested() and REPLICA in db.engines:
+        return db.engines[REPLICA]
+    return db.engine
+
+
+class RoutingSession(Session):
+    """db.session that sends SELECTs from replica_reads views to the replica.
+
+    Flushes and any other statement go to the primary, and once this session
+    has written, its later reads do too so they see their own changes.
+    """
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if bind is None and _replica_requested() and REPLICA in self._db.engines:
+            if self._flushing or clause is None or not getattr(clause, "is_select", False):
+                self.info["wrote"] = True
+            elif not self.info.get("wrote"):
+                return self._db.engines[REPLICA]
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
@@ -0,0 +1,162 @@
+# src/utils/exporter.py
+import csv
+import io
+from sqlalchemy import select
+from src.utils.db_engines import read_engine
+from src.models.substation import Substation, ReliabilityMetric, SubstationStatus
+from src.models.user import User
+from src.utils.inspection_archive import inspection_source
+from src.utils.xlsx_stream import XlsxStream
+
+# Rows fetched per round trip from the server-side cursor
+YIELD_PER = 2000
+# Rows buffered before a CSV chunk is yielded to the client
+CSV_FLUSH_ROWS = 500
+# Excel's hard limit, minus the header row
+XLSX_SHEET_ROWS = 1048575
+# Compressed bytes collected before an XLSX chunk is yielded to the client
+XLSX_FLUSH_BYTES = 64 * 1024
+
+
+class ExportError(ValueError):
+    """Raised for unknown datasets or formats"""
+
+
+def _substations_query(args):
+    return select(
+        Substation.id,
+        Substation.name,
+        Substation.coverage_status,
+        Substation.created_at,
+        SubstationStatus.latest_inspection_date,
+        SubstationStatus.inspection_status,
+        SubstationStatus.testing_status
+    ).outerjoin(SubstationStatus, SubstationStatus.substation_id == Substation.id)\
+     .order_by(Substation.id)
+
+
+def _inspections_query(args):
+    # Archived years are included whenever the range reaches them
+    rows = inspection_source(args.get("start"))
+    stmt = select(
+        rows.c.id,
+        Substation.name.label("substation"),
+        rows.c.inspection_date,
+        rows.c.inspection_status,
+        rows.c.testing_date,
+        rows.c.testing_status,
+        rows.c.notes,
+        User.username.label("recorded_by"),
+        rows.c.created_at
+    ).join(Substation, Substation.id == rows.c.substation_id)\
+     .outerjoin(User, User.id == rows.c.user_id)
+    if args.get("start"):
+        stmt = stmt.where(rows.c.inspection_date >= args["start"])
+    if args.get("end"):
+        stmt = stmt.where(rows.c.inspection_date <= args["end"])
+    return stmt.order_by(rows.c.id)
+
+
+def _metrics_query(args):
+    stmt = select(
+        ReliabilityMetric.date,
+        ReliabilityMetric.period_type,
+        ReliabilityMetric.reliability_score,
+        ReliabilityMetric.effective_reliability,
+        ReliabilityMetric.inspection_compliance,
+        ReliabilityMetric.testing_compliance,
+        ReliabilityMetric.coverage_ratio
+    )
+    if args.get("period_type"):
+        stmt = stmt.where(ReliabilityMetric.period_type == args["period_type"])
+    if args.get("start"):
+        stmt = stmt.where(ReliabilityMetric.date >= args["start"])
+    if args.get("end"):
+        stmt = stmt.where(ReliabilityMetric.date <= args["end"])
+    return stmt.order_by(ReliabilityMetric.date, ReliabilityMetric.period_type)
+
+
+DATASETS = {
+    "substations": _substations_query,
+    "inspections": _inspections_query,
+    "reliability_metrics": _metrics_query
+}
+
+MIMETYPES = {
+    "csv": "text/csv",
+    "xlsx": "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+}
+
+
+def build_query(dataset, args):
+    if dataset not in DATASETS:
+        raise ExportError(f"Unknown dataset '{dataset}'")
+    return DATASETS[dataset](args)
+
+
+def stream_rows(stmt):
+    """Yield (columns, row) pairs through a server-side cursor on its own connection"""
+    with read_engine().connect() as connection:
+        result = connection.execution_options(stream_results=True, yield_per=YIELD_PER).execute(stmt)
+        columns = list(result.keys())
+        yield columns, None
+        for row in result:
+            yield columns, row
+
+
+def _cell(value):
+    return "" if value is None else value
+
+
+def iter_csv(stmt):
+    """Generate CSV text in chunks without holding the result set in memory"""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    pending = 0
+    for columns, row in stream_rows(stmt):
+        if row is None:
+            writer.writerow(columns)
+            continue
+        writer.writerow([_cell(v) for v in row])
+        pending += 1
+        if pending >= CSV_FLUSH_ROWS:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+            pending = 0
+    yield buffer.getvalue()
+
+
+def iter_xlsx(stmt, sheet_title="Export"):
+    """Generate an XLSX workbook in chunks as rows arrive from the cursor.
+
+    The zip is written without seeking (see XlsxStream), so the response starts
+    with the first rows instead of after the whole workbook is built; rows
+    beyond Excel's sheet limit roll over to additional sheets.
+    """
+    workbook = XlsxStream()
+    sheet_rows = None
+    header = None
+    for columns, row in stream_rows(stmt):
+        if row is None:
+            header = columns
+            continue
+        if sheet_rows is None or sheet_rows >= XLSX_SHEET_ROWS:
+            workbook.add_sheet(f"{sheet_title} {workbook.sheet_count + 1}", header)
+            sheet_rows = 0
+        workbook.append(list(row))
+        sheet_rows += 1
+        if workbook.pending >= XLSX_FLUSH_BYTES:
+            yield workbook.drain()
+    if sheet_rows is None:
+        workbook.add_sheet(sheet_title, header)
+    yield workbook.close()
+
+
+def export_stream(dataset, fmt, args):
+    """Return (generator, mimetype, filename) for a dataset export"""
+    if fmt not in MIMETYPES:
+        raise ExportError(f"Unknown format '{fmt}'")
+    stmt = build_query(dataset, args)
+    generator = iter_xlsx(stmt, dataset.replace("_", " ").title()) if fmt == "xlsx" else iter_csv(stmt)
+    return generator, MIMETYPES[fmt], f"{dataset}.{fmt}"
@@ -0,0 +1,247 @@
+# src/utils/importer.py
+import csv
+import os
+import re
+import uuid
+import pandas as pd
+from openpyxl import load_workbook
+from sqlalchemy import select, insert
+from src.extensions import db
+from src.models.substation import Substation, InspectionTest, INSPECTION_STATUSES, TESTING_STATUSES
+from src.utils.substation_status import chunked, refresh_substation_status
+from src.utils.metric_counters import apply_delta, coverage_delta
+
+CHUNK_SIZE = 5000
+
+COVERAGE_STATUSES = {"Fully Covered", "Partially Covered", "Not Covered"}
+
+SUBSTATION_COLUMNS = ["name", "coverage_status"]
+INSPECTION_COLUMNS = ["substation", "inspection_date", "inspection_status"]
+INSPECTION_OPTIONAL_COLUMNS = ["testing_date", "testing_status", "notes"]
+
+REPORT_HEADER = ["row", "column", "value", "error"]
+_TOKEN_RE = re.compile(r"^[0-9a-f]{32}$")
+
+
+class ImportFileError(ValueError):
+    """Raised when an uploaded file cannot be imported at all"""
+
+
+class ErrorReport:
+    """Row-level import errors streamed to a CSV file so memory stays flat"""
+
+    def __init__(self, directory):
+        self.directory = directory
+        self.token = uuid.uuid4().hex
+        self.count = 0
+        self._file = None
+        self._writer = None
+
+    @property
+    def path(self):
+        return os.path.join(self.directory, f"{self.token}.csv")
+
+    def add(self, rows, column, values, message):
+        """Record one error per (row, value) pair"""
+        for row, value in zip(rows, values):
+            if self._writer is None:
+                os.makedirs(self.directory, exist_ok=True)
+                self._file = open(self.path, "w", newline="")
+                self._writer = csv.writer(self._file)
+                self._writer.writerow(REPORT_HEADER)
+            self._writer.writerow([row, column, value, message])
+            self.count += 1
+
+    def close(self):
+        if self._file:
+            self._file.close()
+            self._file = None
+
+
+def report_path(directory, token):
+    """Path of a stored error report, or None for a malformed token"""
+    if not _TOKEN_RE.match(token or ""):
+        return None
+    return os.path.join(directory, f"{token}.csv")
+
+
+def _normalise_columns(df):
+    df.columns = [str(c).strip().lower().replace(" ", "_") for c in df.columns]
+    return df
+
+
+def _xlsx_chunks(stream, chunk_size):
+    workbook = load_workbook(stream, read_only=True, data_only=True)
+    try:
+        rows = workbook.active.iter_rows(values_only=True)
+        header = next(rows, None)
+        if header is None:
+            return
+        header = ["" if h is None else str(h) for h in header]
+        batch = []
+        for row in rows:
+            batch.append(["" if v is None else v for v in row])
+            if len(batch) >= chunk_size:
+                yield pd.DataFrame(batch, columns=header)
+                batch = []
+        if batch:
+            yield pd.DataFrame(batch, columns=header)
+    finally:
+        workbook.close()
+
+
+def iter_chunks(stream, filename, chunk_size=CHUNK_SIZE):
+    """Yield (first_row_number, DataFrame) chunks from a CSV or XLSX upload"""
+    name = (filename or "").lower()
+    if name.endswith(".csv"):
+        chunks = pd.read_csv(stream, chunksize=chunk_size, dtype=str, keep_default_na=False)
+    elif name.endswith(".xlsx"):
+        chunks = _xlsx_chunks(stream, chunk_size)
+    elif name.endswith(".xls"):
+        raise ImportFileError("Legacy .xls files are not supported. Please save as .xlsx or .csv.")
+    else:
+        raise ImportFileError("Invalid file type. Please upload a CSV or XLSX file.")
+
+    # Row numbers as a spreadsheet user sees them: header is row 1
+    first_row = 2
+    for df in chunks:
+        yield first_row, _normalise_columns(df)
+        first_row += len(df)
+
+
+def _require_columns(df, required):
+    missing = [c for c in required if c not in df.columns]
+    if missing:
+        raise ImportFileError(f"Missing required column(s): {', '.join(missing)}")
+
+
+def _text(df, column):
+    if column not in df.columns:
+        return pd.Series("", index=df.index)
+    return df[column].astype(str).str.strip()
+
+
+def _dates(values):
+    """Parse a column of dates, NaT where unparseable.
+
+    ISO dates (the common case) are parsed in one vectorised pass; anything else
+    falls back to per-row parsing, so one file can mix formats. Without a format
+    pandas infers a single one from the first value and rejects every row that
+    differs.
+    """
+    parsed = pd.to_datetime(values, errors="coerce", format="ISO8601")
+    retry = parsed.isna() & values.notna() & values.ne("")
+    if retry.any():
+        parsed[retry] = pd.to_datetime(values[retry], errors="coerce", format="mixed")
+    return parsed
+
+
+def _existing_names(session, names):
+    found = set()
+    for chunk in chunked(names):
+        found.update(session.scalars(select(Substation.name).where(Substation.name.in_(chunk))))
+    return found
+
+
+def _substation_ids(session, names):
+    ids = {}
+    for chunk in chunked(names):
+        ids.update(session.execute(select(Substation.name, Substation.id).where(Substation.name.in_(chunk))).all())
+    return ids
+
+
+def _report(report, row_numbers, df, column, mask, message):
+    if mask.any():
+        report.add(row_numbers[mask], column, df.loc[mask, column] if column in df.columns else [""] * int(mask.sum()), message)
+
+
+def import_substations(stream, filename, report, session=None, chunk_size=CHUNK_SIZE):
+    """Import substations chunk by chunk; returns the number of rows inserted"""
+    session = session or db.session
+    imported = 0
+    for first_row, df in iter_chunks(stream, filename, chunk_size):
+        _require_columns(df, SUBSTATION_COLUMNS)
+        row_numbers = pd.Series(range(first_row, first_row + len(df)), index=df.index)
+        df["name"] = _text(df, "name")
+        df["coverage_status"] = _text(df, "coverage_status")
+
+        blank_name = df["name"].eq("")
+        bad_coverage = ~blank_name & ~df["coverage_status"].isin(COVERAGE_STATUSES)
+        duplicate_in_file = ~blank_name & df["name"].duplicated()
+        candidates = ~(blank_name | bad_coverage | duplicate_in_file)
+
+        # Earlier chunks are already inserted, so this also catches repeats across chunks
+        existing = _existing_names(session, df.loc[candidates, "name"].tolist())
+        already_exists = candidates & df["name"].isin(existing)
+        valid = candidates & ~already_exists
+
+        _report(report, row_numbers, df, "name", blank_name, "Name is required")
+        _report(report, row_numbers, df, "coverage_status", bad_coverage,
+                f"Coverage status must be one of: {', '.join(sorted(COVERAGE_STATUSES))}")
+        _report(report, row_numbers, df, "name", duplicate_in_file, "Duplicate name in file")
+        _report(report, row_numbers, df, "name", already_exists, "Substation already exists and was skipped")
+
+        rows = df.loc[valid, SUBSTATION_COLUMNS].to_dict("records")
+        if rows:
+            session.execute(insert(Substation), rows)
+            # Core inserts skip the flush hook; count the new substations in the same transaction
+            apply_delta(session.connection(), coverage_delta(row["coverage_status"] for row in rows))
+        session.commit()
+        imported += len(rows)
+    return imported
+
+
+def import_inspections(stream, filename, report, user_id=None, session=None, chunk_size=CHUNK_SIZE):
+    """Import inspection history chunk by chunk; returns the number of rows inserted"""
+    session = session or db.session
+    imported = 0
+    for first_row, df in iter_chunks(stream, filename, chunk_size):
+        if "substation" not in df.columns and "substation_name" in df.columns:
+            df = df.rename(columns={"substation_name": "substation"})
+        _require_columns(df, INSPECTION_COLUMNS)
+        row_numbers = pd.Series(range(first_row, first_row + len(df)), index=df.index)
+        for column in ["substation", "inspection_status"] + INSPECTION_OPTIONAL_COLUMNS:
+            df[column] = _text(df, column)
+
+        inspection_date = _dates(df["inspection_date"])
+        testing_date = _dates(df["testing_date"].where(df["testing_date"] != ""))
+        testing_status = df["testing_status"].where(df["testing_status"] != "", "N/A")
+
+        ids_by_name = _substation_ids(session, df["substation"].unique().tolist())
+        substation_id = df["substation"].map(ids_by_name)
+
+        unknown_substation = substation_id.isna()
+        bad_inspection_date = inspection_date.isna()
+        bad_testing_date = df["testing_date"].ne("") & testing_date.isna()
+        bad_inspection_status = ~df["inspection_status"].isin(INSPECTION_STATUSES)
+        bad_testing_status = ~testing_status.isin(TESTING_STATUSES)
+        valid = ~(unknown_substation | bad_inspection_date | bad_testing_date
+                  | bad_inspection_status | bad_testing_status)
+
+        _report(report, row_numbers, df, "substation", unknown_substation, "Unknown substation")
+        _report(report, row_numbers, df, "inspection_date", bad_inspection_date, "Invalid or missing date")
+        _report(report, row_numbers, df, "testing_date", bad_testing_date, "Invalid date")
+        _report(report, row_numbers, df, "inspection_status", bad_inspection_status,
+                f"Inspection status must be one of: {', '.join(sorted(INSPECTION_STATUSES))}")
+        _report(report, row_numbers, df, "testing_status", bad_testing_status,
+                f"Testing status must be one of: {', '.join(sorted(TESTING_STATUSES))}")
+
+        if valid.any():
+            batch = pd.DataFrame({
+                "substation_id": substation_id[valid].astype(int),
+                "inspection_date": inspection_date[valid].dt.date,
+                "testing_date": testing_date[valid].dt.date,
+                "inspection_status": df.loc[valid, "inspection_status"],
+                "testing_status": testing_status[valid],
+                "notes": df.loc[valid, "notes"]
+            })
+            batch["testing_date"] = batch["testing_date"].astype(object).where(testing_date[valid].notna(), None)
+            batch["notes"] = batch["notes"].where(batch["notes"] != "", None)
+            batch["user_id"] = user_id
+            rows = batch.to_dict("records")
+            session.execute(insert(InspectionTest), rows)
+            # Core inserts skip the flush hook; refresh latest status for this chunk
+            refresh_substation_status(session.connection(), batch["substation_id"].unique().tolist())
+            imported += len(rows)
+        session.commit()
+    return imported
@@ -0,0 +1,167 @@
+# src/utils/inspection_archive.py
+from datetime import date
+from sqlalchemy import Column, MetaData, Table, delete, func, insert, inspect, select, text
+from src.extensions import db
+from src.models.substation import InspectionTest, SubstationStatus
+
+ARCHIVE_TABLE = "inspection_test_archive"
+HISTORY_VIEW = "inspection_history"
+# Calendar years, counting the current one, that archive runs leave in the hot table
+DEFAULT_HOT_YEARS = 2
+
+HOT = InspectionTest.__table__
+COLUMNS = [c.name for c in HOT.columns]
+
+# Query-side descriptions of the archive and the hot + archive view; ensure_archive creates them
+_metadata = MetaData()
+archive_table = Table(ARCHIVE_TABLE, _metadata, *[Column(c.name, c.type) for c in HOT.columns])
+history_view = Table(HISTORY_VIEW, _metadata, *[Column(c.name, c.type) for c in HOT.columns])
+
+_ARCHIVE_COLUMNS = """
+        id INTEGER NOT NULL,
+        substation_id INTEGER NOT NULL REFERENCES substation (id) ON DELETE CASCADE,
+        inspection_date DATE NOT NULL,
+        testing_date DATE,
+        inspection_status VARCHAR(20) NOT NULL,
+        testing_status VARCHAR(20),
+        notes TEXT,
+        created_at {timestamp},
+        user_id INTEGER REFERENCES "user" (id)"""
+
+_ARCHIVE_INDEXES = [
+    f"CREATE INDEX ix_{ARCHIVE_TABLE}_substation_id ON {ARCHIVE_TABLE} (substation_id)",
+    # Serve the archived_through() max() lookups and date-bounded history reads
+    f"CREATE INDEX ix_{ARCHIVE_TABLE}_inspection_date ON {ARCHIVE_TABLE} (inspection_date)",
+    f"CREATE INDEX ix_{ARCHIVE_TABLE}_testing_date ON {ARCHIVE_TABLE} (testing_date)"
+]
+
+_VIEW_SELECT = (f"SELECT {', '.join(COLUMNS)} FROM {HOT.name} "
+                f"UNION ALL SELECT {', '.join(COLUMNS)} FROM {ARCHIVE_TABLE}")
+
+# A plain table beside the hot one; the view stitches them back together. SQLite gives a new
+# row max(id) + 1, so once the newest hot rows are deleted an archived id can come round
+# again: ids are indexed here, not unique.
+SQLITE_DDL = [
+    f"CREATE TABLE {ARCHIVE_TABLE} ({_ARCHIVE_COLUMNS.format(timestamp='DATETIME')}\n    )",
+    f"CREATE INDEX ix_{ARCHIVE_TABLE}_id ON {ARCHIVE_TABLE} (id)",
+    *_ARCHIVE_INDEXES,
+    f"CREATE VIEW {HISTORY_VIEW} AS {_VIEW_SELECT}"
+]
+
+# Declaratively partitioned by inspection year; archive_year() adds each year's partition as it fills it.
+# The partition key has to be part of the primary key.
+POSTGRES_DDL = [
+    f"CREATE TABLE {ARCHIVE_TABLE} ({_ARCHIVE_COLUMNS.format(timestamp='TIMESTAMP WITHOUT TIME ZONE')},\n"
+    "        PRIMARY KEY (id, inspection_date)\n    ) PARTITION BY RANGE (inspection_date)",
+    *_ARCHIVE_INDEXES,
+    f"CREATE VIEW {HISTORY_VIEW} AS {_VIEW_SELECT}"
+]
+
+
+def ensure_archive(engine=None):
+    """Create the archive table and the history view if missing; returns True when created"""
+    engine = engine or db.engine
+    if inspect(engine).has_table(ARCHIVE_TABLE):
+        return False
+    with engine.begin() as connection:
+        for statement in POSTGRES_DDL if engine.dialect.name == "postgresql" else SQLITE_DDL:
+            connection.execute(text(statement))
+    return True
+
+
+def _ensure_partition(connection, year):
+    connection.execute(text(
+        f"CREATE TABLE IF NOT EXISTS {ARCHIVE_TABLE}_y{int(year)} PARTITION OF {ARCHIVE_TABLE} "
+        f"FOR VALUES FROM ('{int(year):04d}-01-01') TO ('{int(year) + 1:04d}-01-01')"
+    ))
+
+
+def archived_through(session=None):
+    """Latest inspection or testing date held in the archive, or None while it is empty"""
+    session = session or db.session
+    # Two scalar subqueries so each max() is a single index lookup
+    row = session.execute(select(
+        select(func.max(archive_table.c.inspection_date)).scalar_subquery(),
+        select(func.max(archive_table.c.testing_date)).scalar_subquery()
+    )).one()
+    dates = [value for value in row if value is not None]
+    return max(dates) if dates else None
+
+
+def inspection_source(since=None, session=None):
+    """Table to read inspections dated `since` onwards from.
+
+    The hot table when the archive holds nothing that recent, otherwise the
+    history view. Without `since` the whole history is wanted, so always the view.
+    """
+    if since is not None:
+        boundary = archived_through(session)
+        if boundary is None or since > boundary:
+            return HOT
+    return history_view
+
+
+def hot_cutoff(hot_years=DEFAULT_HOT_YEARS, today=None):
+    """First day kept hot: January 1st of the oldest of the last `hot_years` calendar years"""
+    today = today or date.today()
+    return date(today.year - max(hot_years, 1) + 1, 1, 1)
+
+
+def _closed_rows(start, end, cutoff):
+    """Hot inspections dated in [start, end) that may move to the archive"""
+    latest = select(SubstationStatus.latest_inspection_id)\
+        .where(SubstationStatus.latest_inspection_id.isnot(None))
+    return select(*[HOT.c[name] for name in COLUMNS]).where(
+        HOT.c.inspection_date >= start,
+        HOT.c.inspection_date < end,
+        # Tested after the cutoff means the record is still open
+        func.coalesce(HOT.c.testing_date, HOT.c.inspection_date) < cutoff,
+        HOT.c.id.notin_(latest)
+    )
+
+
+def archive_year(year, cutoff, session=None, dry_run=False):
+    """Move one year's closed inspections out of the hot table; returns how many moved"""
+    session = session or db.session
+    start, end = date(year, 1, 1), min(date(year + 1, 1, 1), cutoff)
+    rows = _closed_rows(start, end, cutoff).subquery()
+    if dry_run:
+        return session.execute(select(func.count()).select_from(rows)).scalar()
+    if session.get_bind().dialect.name == "postgresql":
+        _ensure_partition(session.connection(), year)
+    moved = session.execute(insert(archive_table).from_select(COLUMNS, select(rows))).rowcount
+    # Only rows that are both still closed and now in the archive; on PostgreSQL a row
+    # committed by another writer between the two statements fails the second test
+    archived = select(archive_table.c.id).where(archive_table.c.inspection_date >= start,
+                                                archive_table.c.inspection_date < end)
+    session.execute(delete(HOT).where(HOT.c.id.in_(select(rows.c.id)), HOT.c.id.in_(archived)))
+    session.commit()
+    return moved
+
+
+def archive_closed_years(hot_years=DEFAULT_HOT_YEARS, session=None, dry_run=False, progress=None):
+    """Archive every closed year before the hot window, one transaction per year.
+
+    Each substation's latest inspection stays hot whatever its age, so the
+    latest-inspection screens never read the archive. Returns {year: rows moved}.
+    """
+    session = session or db.session
+    progress = progress or (lambda year, moved: None)
+    cutoff = hot_cutoff(hot_years)
+    oldest = session.execute(select(func.min(HOT.c.inspection_date))).scalar()
+    moved = {}
+    if oldest is None or oldest >= cutoff:
+        return moved
+    for year in range(oldest.year, cutoff.year):
+        moved[year] = archive_year(year, cutoff, session, dry_run)
+        progress(year, moved[year])
+    return moved
+
+
+def purge_archived(session=None, substation_id=None):
+    """Delete archived inspections of one substation, or all of them, in the caller's transaction"""
+    session = session or db.session
+    stmt = delete(archive_table)
+    if substation_id is not None:
+        stmt = stmt.where(archive_table.c.substation_id == substation_id)
+    return session.execute(stmt).rowcount
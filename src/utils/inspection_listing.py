@@ -0,0 +1,191 @@
+# src/utils/inspection_listing.py
+import base64
+import json
+from datetime import date, datetime
+from sqlalchemy import select, and_, or_
+from src.extensions import db
+from src.models.substation import Substation, InspectionTest, SubstationStatus
+from src.models.user import User
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 500
+
+SORT_COLUMNS = {
+    "name": Substation.name,
+    "coverage_status": Substation.coverage_status,
+    "latest_inspection_date": SubstationStatus.latest_inspection_date
+}
+# Sorts whose column is NULL for some rows (substations never inspected). They are paged
+# on the raw column so its index serves the seek, with the NULL rows last in either
+# direction, ordered by id, once the dated rows run out.
+NULLABLE_SORTS = {"latest_inspection_date"}
+# Tie-breaker per sort. The status table's key equals Substation.id on every dated row, and
+# SQLite stores it in the date index, so the seek and order come straight off that index.
+TIE_COLUMNS = {"latest_inspection_date": SubstationStatus.substation_id}
+
+
+class ListingError(ValueError):
+    """Raised for malformed listing parameters"""
+
+
+def _parse_date(value, field):
+    if not value:
+        return None
+    try:
+        return datetime.strptime(value, "%Y-%m-%d").date()
+    except ValueError:
+        raise ListingError(f"{field} must be YYYY-MM-DD")
+
+
+def encode_cursor(sort_value, row_id):
+    if isinstance(sort_value, date):
+        sort_value = sort_value.isoformat()
+    raw = json.dumps([sort_value, row_id]).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor, sort):
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        sort_value, row_id = json.loads(base64.urlsafe_b64decode(padded))
+        if sort_value is None and sort not in NULLABLE_SORTS:
+            raise ValueError("only a nullable sort may seek from a missing value")
+        if sort == "latest_inspection_date" and sort_value is not None:
+            sort_value = date.fromisoformat(sort_value)
+        return sort_value, int(row_id)
+    except (ValueError, TypeError):
+        raise ListingError("Invalid cursor")
+
+
+class InspectionListing:
+    """Filters, sort order and keyset position for one page of the inspections listing"""
+
+    def __init__(self, tested=None, coverage_status=None, date_from=None, date_to=None,
+                 sort="name", direction="asc", limit=DEFAULT_PAGE_SIZE, cursor=None):
+        if sort not in SORT_COLUMNS:
+            raise ListingError(f"sort must be one of {', '.join(SORT_COLUMNS)}")
+        if direction not in ("asc", "desc"):
+            raise ListingError("direction must be asc or desc")
+        if tested not in (None, "tested", "not_tested"):
+            raise ListingError("tested must be tested or not_tested")
+        self.tested = tested
+        self.coverage_status = coverage_status
+        self.date_from = date_from
+        self.date_to = date_to
+        self.sort = sort
+        self.direction = direction
+        self.limit = max(1, min(int(limit), MAX_PAGE_SIZE))
+        self.cursor = decode_cursor(cursor, sort) if cursor else None
+
+    @classmethod
+    def from_args(cls, args, **overrides):
+        """Build a listing from request.args (or any mapping)"""
+        try:
+            limit = int(args.get("limit", DEFAULT_PAGE_SIZE))
+        except ValueError:
+            raise ListingError("limit must be an integer")
+        params = dict(
+            tested=args.get("tested") or None,
+            coverage_status=args.get("coverage_status") or None,
+            date_from=_parse_date(args.get("date_from"), "date_from"),
+            date_to=_parse_date(args.get("date_to"), "date_to"),
+            sort=args.get("sort", "name"),
+            direction=args.get("direction", "asc"),
+            limit=limit,
+            cursor=args.get("cursor") or None
+        )
+        params.update(overrides)
+        return cls(**params)
+
+    def _select(self, sort_column):
+        stmt = select(
+            Substation.id,
+            Substation.name,
+            Substation.coverage_status,
+            Substation.created_at,
+            SubstationStatus.latest_inspection_id,
+            SubstationStatus.latest_inspection_date,
+            SubstationStatus.inspection_status,
+            SubstationStatus.testing_status,
+            InspectionTest.notes,
+            User.username,
+            sort_column.label("sort_value")
+        ).select_from(Substation)\
+         .outerjoin(SubstationStatus, SubstationStatus.substation_id == Substation.id)\
+         .outerjoin(InspectionTest, InspectionTest.id == SubstationStatus.latest_inspection_id)\
+         .outerjoin(User, User.id == InspectionTest.user_id)
+
+        if self.tested == "tested":
+            stmt = stmt.where(SubstationStatus.testing_status == "Tested")
+        elif self.tested == "not_tested":
+            stmt = stmt.where(or_(SubstationStatus.testing_status.is_(None),
+                                  SubstationStatus.testing_status != "Tested"))
+        if self.coverage_status:
+            stmt = stmt.where(Substation.coverage_status == self.coverage_status)
+        if self.date_from:
+            stmt = stmt.where(SubstationStatus.latest_inspection_date >= self.date_from)
+        if self.date_to:
+            stmt = stmt.where(SubstationStatus.latest_inspection_date <= self.date_to)
+        return stmt
+
+    def _seek(self, stmt, columns, after, limit):
+        """Order by `columns` in the listing's direction, starting past the key `after` if given"""
+        ascending = self.direction == "asc"
+        if after is not None:
+            # Row-value comparison spelt out: (a, b) > (x, y) as a > x OR (a = x AND b > y)
+            clause = None
+            for column, value in reversed(list(zip(columns, after))):
+                beyond = column > value if ascending else column < value
+                clause = beyond if clause is None else or_(beyond, and_(column == value, clause))
+            stmt = stmt.where(clause)
+        return stmt.order_by(*[c.asc() if ascending else c.desc() for c in columns]).limit(limit)
+
+    def query(self):
+        """The page's statement; on a nullable sort, only the rows where the sort column is set"""
+        sort_column = SORT_COLUMNS[self.sort]
+        tie = TIE_COLUMNS.get(self.sort, Substation.id)
+        stmt = self._select(sort_column)
+        if self.sort in NULLABLE_SORTS:
+            stmt = stmt.where(sort_column.isnot(None))
+        # Seek past the last row of the previous page on (sort column, id);
+        # fetch one extra row to learn whether another page exists
+        return self._seek(stmt, [sort_column, tie], self.cursor, self.limit + 1)
+
+    def null_query(self, limit):
+        """Rows of a nullable sort without a value, by id, past the cursor if it is already among them"""
+        sort_column = SORT_COLUMNS[self.sort]
+        stmt = self._select(sort_column).where(sort_column.is_(None))
+        after = (self.cursor[1],) if self.cursor and self.cursor[0] is None else None
+        return self._seek(stmt, [Substation.id], after, limit)
+
+    def fetch(self, session=None):
+        """Return one page as {'items', 'next_cursor', 'has_more'}"""
+        session = session or db.session
+        rows = []
+        if not (self.cursor and self.cursor[0] is None):
+            rows = session.execute(self.query()).all()
+        if self.sort in NULLABLE_SORTS and len(rows) <= self.limit:
+            rows += session.execute(self.null_query(self.limit + 1 - len(rows))).all()
+        has_more = len(rows) > self.limit
+        rows = rows[:self.limit]
+        next_cursor = encode_cursor(rows[-1].sort_value, rows[-1].id) if has_more else None
+        return {
+            "items": [_row_to_dict(row) for row in rows],
+            "next_cursor": next_cursor,
+            "has_more": has_more
+        }
+
+
+def _row_to_dict(row):
+    return {
+        "id": row.id,
+        "name": row.name,
+        "coverage_status": row.coverage_status,
+        "latest_inspection_id": row.latest_inspection_id,
+        "latest_inspection_date": row.latest_inspection_date.strftime('%Y-%m-%d') if row.latest_inspection_date else 'N/A',
+        "inspection_status": row.inspection_status or 'Not Inspected',
+        "testing_status": row.testing_status or 'N/A',
+        "notes": row.notes or '',
+        "user_recorded": row.username or 'N/A',
+        "created_at": row.created_at.strftime('%Y-%m-%d %H:%M:%S') if row.created_at else 'N/A'
+    }
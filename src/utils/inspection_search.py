@@ -0,0 +1,356 @@
+# src/utils/inspection_search.py
+import re
+from datetime import date
+from markupsafe import Markup, escape
+from sqlalchemy import inspect, text
+from src.extensions import db
+from src.models.substation import INSPECTION_STATUSES, TESTING_STATUSES
+from src.utils.inspection_listing import _parse_date, ListingError
+from src.utils.inspection_archive import ARCHIVE_TABLE
+
+SEARCH_TABLE = "inspection_search"
+DEFAULT_PAGE_SIZE = 20
+MAX_PAGE_SIZE = 100
+# Highlight delimiters the database wraps around matches; swapped for <mark> after escaping the text
+MARK_START, MARK_END = "\x02", "\x03"
+
+# Archived inspections are indexed too, under their negated id so they never clash with a hot one
+# (an archived id can come round again in the hot table on SQLite). Moving a row to the archive
+# indexes its archived copy and drops the hot entry.
+
+# FTS5 table with its own copy of the text (SQLite 3.40 has no contentless-delete tables),
+# kept in sync by triggers so bulk inserts and imports are indexed too. Substation names
+# rank above notes.
+_SQLITE_RENAME = f"""CREATE TRIGGER {SEARCH_TABLE}_rename AFTER UPDATE OF name ON substation BEGIN
+        UPDATE {SEARCH_TABLE} SET substation_name = NEW.name
+        WHERE rowid IN (SELECT id FROM inspection_test WHERE substation_id = NEW.id);
+        UPDATE {SEARCH_TABLE} SET substation_name = NEW.name
+        WHERE rowid IN (SELECT -id FROM {ARCHIVE_TABLE} WHERE substation_id = NEW.id);
+    END"""
+_SQLITE_ARCHIVE_TRIGGERS = [
+    # OR REPLACE: two archived rows can share an id, see inspection_archive
+    f"""CREATE TRIGGER {SEARCH_TABLE}_archive_insert AFTER INSERT ON {ARCHIVE_TABLE} BEGIN
+        INSERT OR REPLACE INTO {SEARCH_TABLE} (rowid, notes, substation_name)
+        SELECT -NEW.id, NEW.notes, name FROM substation WHERE id = NEW.substation_id;
+    END""",
+    f"""CREATE TRIGGER {SEARCH_TABLE}_archive_delete AFTER DELETE ON {ARCHIVE_TABLE} BEGIN
+        DELETE FROM {SEARCH_TABLE} WHERE rowid = -OLD.id;
+    END"""
+]
+SQLITE_DDL = [
+    f"CREATE VIRTUAL TABLE {SEARCH_TABLE} USING fts5(notes, substation_name, tokenize = 'porter unicode61')",
+    f"INSERT INTO {SEARCH_TABLE} ({SEARCH_TABLE}, rank) VALUES ('rank', 'bm25(1.0, 2.0)')",
+    f"""CREATE TRIGGER {SEARCH_TABLE}_insert AFTER INSERT ON inspection_test BEGIN
+        INSERT INTO {SEARCH_TABLE} (rowid, notes, substation_name)
+        SELECT NEW.id, NEW.notes, name FROM substation WHERE id = NEW.substation_id;
+    END""",
+    f"""CREATE TRIGGER {SEARCH_TABLE}_update AFTER UPDATE OF notes, substation_id ON inspection_test BEGIN
+        DELETE FROM {SEARCH_TABLE} WHERE rowid = OLD.id;
+        INSERT INTO {SEARCH_TABLE} (rowid, notes, substation_name)
+        SELECT NEW.id, NEW.notes, name FROM substation WHERE id = NEW.substation_id;
+    END""",
+    f"""CREATE TRIGGER {SEARCH_TABLE}_delete AFTER DELETE ON inspection_test BEGIN
+        DELETE FROM {SEARCH_TABLE} WHERE rowid = OLD.id;
+    END""",
+    _SQLITE_RENAME,
+    *_SQLITE_ARCHIVE_TRIGGERS
+]
+# Indexes created before archived rows were searchable lack the archive triggers
+SQLITE_UPGRADE = [f"DROP TRIGGER IF EXISTS {SEARCH_TABLE}_rename", _SQLITE_RENAME, *_SQLITE_ARCHIVE_TRIGGERS]
+
+# tsvector side table with a GIN index; rows follow inspection_test and the archive through triggers.
+# The sync and forget functions take the sign to apply to the id as their trigger argument.
+_POSTGRES_FUNCTIONS = [
+    """CREATE OR REPLACE FUNCTION inspection_search_document(notes TEXT, name TEXT) RETURNS TSVECTOR
+        LANGUAGE sql IMMUTABLE AS $$
+        SELECT setweight(to_tsvector('english', coalesce(name, '')), 'A') ||
+               setweight(to_tsvector('english', coalesce(notes, '')), 'B')
+    $$""",
+    f"""CREATE OR REPLACE FUNCTION inspection_search_sync() RETURNS TRIGGER LANGUAGE plpgsql AS $$
+    BEGIN
+        INSERT INTO {SEARCH_TABLE} (inspection_id, document)
+        SELECT TG_ARGV[0]::integer * NEW.id, inspection_search_document(NEW.notes, s.name)
+        FROM substation s WHERE s.id = NEW.substation_id
+        ON CONFLICT (inspection_id) DO UPDATE SET document = EXCLUDED.document;
+        RETURN NULL;
+    END $$""",
+    f"""CREATE OR REPLACE FUNCTION inspection_search_forget() RETURNS TRIGGER LANGUAGE plpgsql AS $$
+    BEGIN
+        DELETE FROM {SEARCH_TABLE} WHERE inspection_id = TG_ARGV[0]::integer * OLD.id;
+        RETURN NULL;
+    END $$""",
+    f"""CREATE OR REPLACE FUNCTION inspection_search_rename() RETURNS TRIGGER LANGUAGE plpgsql AS $$
+    BEGIN
+        UPDATE {SEARCH_TABLE} AS s SET document = inspection_search_document(t.notes, NEW.name)
+        FROM inspection_test t WHERE t.substation_id = NEW.id AND s.inspection_id = t.id;
+        UPDATE {SEARCH_TABLE} AS s SET document = inspection_search_document(a.notes, NEW.name)
+        FROM {ARCHIVE_TABLE} a WHERE a.substation_id = NEW.id AND s.inspection_id = -a.id;
+        RETURN NULL;
+    END $$"""
+]
+_POSTGRES_TRIGGERS = [
+    """CREATE TRIGGER inspection_search_sync AFTER INSERT OR UPDATE OF notes, substation_id ON inspection_test
+        FOR EACH ROW EXECUTE FUNCTION inspection_search_sync(1)""",
+    """CREATE TRIGGER inspection_search_forget AFTER DELETE ON inspection_test
+        FOR EACH ROW EXECUTE FUNCTION inspection_search_forget(1)""",
+    f"""CREATE TRIGGER inspection_search_archive_sync AFTER INSERT ON {ARCHIVE_TABLE}
+        FOR EACH ROW EXECUTE FUNCTION inspection_search_sync(-1)""",
+    f"""CREATE TRIGGER inspection_search_archive_forget AFTER DELETE ON {ARCHIVE_TABLE}
+        FOR EACH ROW EXECUTE FUNCTION inspection_search_forget(-1)"""
+]
+_POSTGRES_RENAME_TRIGGER = """CREATE TRIGGER inspection_search_rename AFTER UPDATE OF name ON substation
+        FOR EACH ROW WHEN (OLD.name IS DISTINCT FROM NEW.name) EXECUTE FUNCTION inspection_search_rename()"""
+POSTGRES_DDL = [
+    f"""CREATE TABLE {SEARCH_TABLE} (
+        inspection_id INTEGER PRIMARY KEY,
+        document TSVECTOR NOT NULL
+    )""",
+    f"CREATE INDEX ix_{SEARCH_TABLE}_document ON {SEARCH_TABLE} USING gin (document)",
+    *_POSTGRES_FUNCTIONS,
+    *_POSTGRES_TRIGGERS,
+    _POSTGRES_RENAME_TRIGGER
+]
+# Older side tables referenced inspection_test, whose ON DELETE CASCADE dropped rows as they were archived
+POSTGRES_UPGRADE = [
+    f"ALTER TABLE {SEARCH_TABLE} DROP CONSTRAINT IF EXISTS {SEARCH_TABLE}_inspection_id_fkey",
+    *_POSTGRES_FUNCTIONS,
+    "DROP TRIGGER IF EXISTS inspection_search_sync ON inspection_test",
+    *_POSTGRES_TRIGGERS
+]
+UPGRADE = {"sqlite": SQLITE_UPGRADE, "postgresql": POSTGRES_UPGRADE}
+# Present once the index covers the archive
+ARCHIVE_TRIGGER = {"sqlite": f"{SEARCH_TABLE}_archive_insert", "postgresql": "inspection_search_archive_sync"}
+TRIGGER_EXISTS = {
+    "sqlite": "SELECT 1 FROM sqlite_master WHERE type = 'trigger' AND name = :name",
+    "postgresql": "SELECT 1 FROM pg_trigger WHERE tgname = :name"
+}
+
+REBUILD = {
+    "sqlite": [
+        f"DELETE FROM {SEARCH_TABLE}",
+        f"""INSERT INTO {SEARCH_TABLE} (rowid, notes, substation_name)
+            SELECT t.id, t.notes, s.name FROM inspection_test t JOIN substation s ON s.id = t.substation_id""",
+        f"""INSERT OR REPLACE INTO {SEARCH_TABLE} (rowid, notes, substation_name)
+            SELECT -a.id, a.notes, s.name FROM {ARCHIVE_TABLE} a JOIN substation s ON s.id = a.substation_id""",
+        # Merge the segments left by the bulk insert into one b-tree
+        f"INSERT INTO {SEARCH_TABLE} ({SEARCH_TABLE}) VALUES ('optimize')"
+    ],
+    "postgresql": [
+        f"TRUNCATE {SEARCH_TABLE}",
+        f"""INSERT INTO {SEARCH_TABLE} (inspection_id, document)
+            SELECT t.id, inspection_search_document(t.notes, s.name)
+            FROM inspection_test t JOIN substation s ON s.id = t.substation_id""",
+        f"""INSERT INTO {SEARCH_TABLE} (inspection_id, document)
+            SELECT -a.id, inspection_search_document(a.notes, s.name)
+            FROM {ARCHIVE_TABLE} a JOIN substation s ON s.id = a.substation_id"""
+    ]
+}
+
+# Hot (h) or archived (a) row behind each index entry, by the sign of `key`, and the columns read from it
+_SOURCES = ("LEFT JOIN inspection_test h ON {key} > 0 AND h.id = {key} "
+            f"LEFT JOIN {ARCHIVE_TABLE} a ON {{key}} < 0 AND a.id = -{{key}}")
+
+
+def _column(name):
+    return f"coalesce(h.{name}, a.{name})"
+
+
+class SearchError(ValueError):
+    """Raised for malformed search parameters"""
+
+
+def backend(engine=None):
+    """'sqlite' or 'postgresql' when the database has an indexed search, else None"""
+    name = (engine or db.engine).dialect.name
+    return name if name in REBUILD else None
+
+
+def rebuild_search_index(engine=None):
+    """Re-index every inspection from scratch; returns the number of indexed rows"""
+    engine = engine or db.engine
+    dialect = backend(engine)
+    if dialect is None:
+        return 0
+    with engine.begin() as connection:
+        for statement in REBUILD[dialect]:
+            connection.execute(text(statement))
+        return connection.execute(text(f"SELECT count(*) FROM {SEARCH_TABLE}")).scalar()
+
+
+def ensure_search_index(engine=None):
+    """Create the search table and its triggers if missing, then index existing rows.
+
+    An index from before archived inspections were searchable gets the archive
+    triggers and is rebuilt. Returns the number of rows indexed, or None when the
+    index was already current (or the database has no full-text support).
+    Needs the archive table, so runs after ensure_archive().
+    """
+    engine = engine or db.engine
+    dialect = backend(engine)
+    if dialect is None:
+        return None
+    if inspect(engine).has_table(SEARCH_TABLE):
+        with engine.connect() as connection:
+            if connection.execute(text(TRIGGER_EXISTS[dialect]), {"name": ARCHIVE_TRIGGER[dialect]}).first():
+                return None
+        statements = UPGRADE[dialect]
+    else:
+        statements = SQLITE_DDL if dialect == "sqlite" else POSTGRES_DDL
+    with engine.begin() as connection:
+        for statement in statements:
+            connection.execute(text(statement))
+    return rebuild_search_index(engine)
+
+
+def _words(terms):
+    """(word, is_prefix) for each word of user input; the last word, and any ending in *, match as prefixes"""
+    words = re.findall(r"\w+\*?", terms, flags=re.UNICODE)
+    return [(word.rstrip("*"), word.endswith("*") or i == len(words) - 1) for i, word in enumerate(words)]
+
+
+def fts5_query(terms):
+    """User input as an FTS5 query: every word must match, the last one as a prefix (as typed so far)"""
+    return " ".join(f'"{word}"' + ("*" if prefix else "") for word, prefix in _words(terms))
+
+
+def ts_query(terms):
+    """The same query as to_tsquery syntax for PostgreSQL"""
+    return " & ".join(word + (":*" if prefix else "") for word, prefix in _words(terms))
+
+
+def highlight(fragment):
+    """Escape stored text and turn the database's match delimiters into <mark> tags"""
+    if not fragment:
+        return Markup("")
+    return Markup(str(escape(fragment)).replace(MARK_START, "<mark>").replace(MARK_END, "</mark>"))
+
+
+class InspectionSearch:
+    """One page of ranked full-text matches over inspection notes and substation names"""
+
+    def __init__(self, query, date_from=None, date_to=None, inspection_status=None, testing_status=None,
+                 page=1, per_page=DEFAULT_PAGE_SIZE):
+        self.query = (query or "").strip()
+        if inspection_status and inspection_status not in INSPECTION_STATUSES:
+            raise SearchError(f"inspection_status must be one of {', '.join(INSPECTION_STATUSES)}")
+        if testing_status and testing_status not in TESTING_STATUSES:
+            raise SearchError(f"testing_status must be one of {', '.join(TESTING_STATUSES)}")
+        self.date_from = date_from
+        self.date_to = date_to
+        self.inspection_status = inspection_status or None
+        self.testing_status = testing_status or None
+        self.page = max(1, page)
+        self.per_page = max(1, min(per_page, MAX_PAGE_SIZE))
+
+    @classmethod
+    def from_args(cls, args):
+        try:
+            page = int(args.get("page", 1))
+            per_page = int(args.get("per_page", DEFAULT_PAGE_SIZE))
+            date_from = _parse_date(args.get("date_from"), "date_from")
+            date_to = _parse_date(args.get("date_to"), "date_to")
+        except ListingError as e:
+            raise SearchError(str(e))
+        except ValueError:
+            raise SearchError("page and per_page must be integers")
+        return cls(args.get("q"), date_from=date_from, date_to=date_to,
+                   inspection_status=args.get("inspection_status"),
+                   testing_status=args.get("testing_status"),
+                   page=page, per_page=per_page)
+
+    def _filters(self, params):
+        clauses = []
+        if self.date_from:
+            clauses.append(f"{_column('inspection_date')} >= :date_from")
+            params["date_from"] = self.date_from
+        if self.date_to:
+            clauses.append(f"{_column('inspection_date')} <= :date_to")
+            params["date_to"] = self.date_to
+        if self.inspection_status:
+            clauses.append(f"{_column('inspection_status')} = :inspection_status")
+            params["inspection_status"] = self.inspection_status
+        if self.testing_status:
+            clauses.append(f"{_column('testing_status')} = :testing_status")
+            params["testing_status"] = self.testing_status
+        return "".join(f" AND {clause}" for clause in clauses)
+
+    def _sqlite(self, session, params):
+        params["match"] = fts5_query(self.query)
+        if not params["match"]:
+            return []
+        # ORDER BY rank lets FTS5 order the matches itself, so snippets are only built for this page
+        return session.execute(text(f"""
+            SELECT {_column('id')} AS id, {_column('substation_id')} AS substation_id, s.name,
+                   {_column('inspection_date')} AS inspection_date,
+                   {_column('inspection_status')} AS inspection_status,
+                   {_column('testing_status')} AS testing_status,
+                   snippet({SEARCH_TABLE}, 0, :mark_start, :mark_end, '…', 16) AS notes,
+                   highlight({SEARCH_TABLE}, 1, :mark_start, :mark_end) AS substation_name,
+                   -rank AS score, {SEARCH_TABLE}.rowid < 0 AS archived
+            FROM {SEARCH_TABLE}
+            {_SOURCES.format(key=f"{SEARCH_TABLE}.rowid")}
+            JOIN substation s ON s.id = {_column('substation_id')}
+            WHERE {SEARCH_TABLE} MATCH :match{self._filters(params)}
+            ORDER BY rank, {SEARCH_TABLE}.rowid
+            LIMIT :limit OFFSET :offset
+        """), params).all()
+
+    def _postgresql(self, session, params):
+        params["query"] = ts_query(self.query)
+        if not params["query"]:
+            return []
+        params["headline"] = (f"StartSel={MARK_START}, StopSel={MARK_END}, MaxWords=24, MinWords=8, "
+                              f"MaxFragments=2, FragmentDelimiter=\" … \"")
+        # Rank and page first; ts_headline re-parses the text, so only this page pays for it
+        return session.execute(text(f"""
+            WITH q AS (SELECT to_tsquery('english', :query) AS query),
+            hits AS (
+                SELECT f.inspection_id, ts_rank_cd(f.document, q.query) AS score
+                FROM {SEARCH_TABLE} f
+                {_SOURCES.format(key="f.inspection_id")}, q
+                WHERE f.document @@ q.query{self._filters(params)}
+                ORDER BY score DESC, f.inspection_id
+                LIMIT :limit OFFSET :offset
+            )
+            SELECT {_column('id')} AS id, {_column('substation_id')} AS substation_id, s.name,
+                   {_column('inspection_date')} AS inspection_date,
+                   {_column('inspection_status')} AS inspection_status,
+                   {_column('testing_status')} AS testing_status,
+                   ts_headline('english', coalesce({_column('notes')}, ''), q.query, :headline) AS notes,
+                   ts_headline('english', s.name, q.query,
+                               'HighlightAll=true, StartSel=' || :mark_start || ', StopSel=' || :mark_end)
+                       AS substation_name,
+                   hits.score, hits.inspection_id < 0 AS archived
+            FROM hits
+            {_SOURCES.format(key="hits.inspection_id")}
+            JOIN substation s ON s.id = {_column('substation_id')}, q
+            ORDER BY hits.score DESC, hits.inspection_id
+        """), params).all()
+
+    def fetch(self, session=None):
+        """{"items", "page", "per_page", "has_more"}; one extra row is read to tell whether a next page exists"""
+        session = session or db.session
+        dialect = backend()
+        if dialect is None:
+            raise SearchError("Full-text search needs SQLite (FTS5) or PostgreSQL")
+        if not self.query:
+            return {"items": [], "page": self.page, "per_page": self.per_page, "has_more": False}
+        params = {"limit": self.per_page + 1, "offset": (self.page - 1) * self.per_page,
+                  "mark_start": MARK_START, "mark_end": MARK_END}
+        rows = self._sqlite(session, params) if dialect == "sqlite" else self._postgresql(session, params)
+        items = [{
+            "id": row.id,
+            "substation_id": row.substation_id,
+            "substation": row.name,
+            "substation_highlight": highlight(row.substation_name),
+            # Raw SQLite rows carry dates as ISO strings
+            "inspection_date": (date.fromisoformat(row.inspection_date)
+                                if isinstance(row.inspection_date, str) else row.inspection_date),
+            "inspection_status": row.inspection_status,
+            "testing_status": row.testing_status,
+            "snippet": highlight(row.notes),
+            "score": float(row.score),
+            # Archived records can be searched but no longer edited
+            "archived": bool(row.archived)
+        } for row in rows[:self.per_page]]
+        return {"items": items, "page": self.page, "per_page": self.per_page, "has_more": len(rows) > self.per_page}
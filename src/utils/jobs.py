@@ -0,0 +1,298 @@
+# src/utils/jobs.py
+import os
+import socket
+import threading
+import time
+import traceback
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from sqlalchemy import update, select, func
+from sqlalchemy.exc import OperationalError
+from src.extensions import db
+from src.models.job import Job, JobStatus
+
+# kind -> callable(context, **params) returning a JSON-serialisable result
+JOB_TYPES = {}
+
+
+def job_type(kind):
+    """Register a function as the handler for a job kind"""
+    def register(fn):
+        JOB_TYPES[kind] = fn
+        return fn
+    return register
+
+
+class JobError(ValueError):
+    """Raised for unknown job kinds or actions a job's state does not allow"""
+
+
+class JobCancelled(Exception):
+    """Raised inside a running job when cancellation has been requested"""
+
+
+def _holder_id():
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+class JobContext:
+    """Handed to job functions so they can report progress and notice cancellation"""
+
+    def __init__(self, job_id):
+        self.job_id = job_id
+
+    def progress(self, fraction, message=None):
+        """Record progress and raise JobCancelled if the job has been cancelled.
+
+        Written on its own connection so progress is visible to pollers before the
+        job's own transaction commits.
+        """
+        values = {"progress": max(0.0, min(float(fraction), 1.0)), "heartbeat_at": datetime.utcnow()}
+        if message:
+            values["message"] = message[:255]
+        try:
+            with db.engine.begin() as connection:
+                connection.execute(update(Job).where(Job.id == self.job_id).values(values))
+        except OperationalError:
+            pass  # SQLite is busy with another writer; progress is best-effort
+        self.check_cancelled()
+
+    def check_cancelled(self):
+        """Raise JobCancelled if cancellation has been requested; a read, so a busy writer cannot skip it"""
+        with db.engine.connect() as connection:
+            cancel_requested = connection.execute(
+                select(Job.cancel_requested).where(Job.id == self.job_id)
+            ).scalar()
+        if cancel_requested:
+            raise JobCancelled()
+
+
+class JobRunner:
+    """Persisted job queue executed on a per-process thread pool.
+
+    Jobs are rows in the job table; a worker claims one with a conditional UPDATE
+    (queued -> running), so a job only ever runs once even if several processes
+    see it. Cancellation is cooperative: running jobs stop at their next
+    progress() call and their open transaction is rolled back.
+
+    A heartbeat thread in each process stamps every job it holds, queued or
+    running, every heartbeat_interval seconds, however long a stage runs
+    between progress() calls. A job whose stamp is older than stale_after lost
+    its worker: the scheduler's sweep fails it, and cancel/retry accept it.
+    """
+
+    def __init__(self, app=None):
+        self.app = None
+        self.max_workers = 2
+        self.stale_after = 600
+        self.heartbeat_interval = 60
+        self._executor = None
+        self._held = set()
+        self._held_lock = threading.Lock()
+        self._heartbeat_pid = None
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.app = app
+        self.max_workers = app.config.get("JOB_WORKERS", 2)
+        self.stale_after = app.config.get("JOB_STALE_SECONDS", 600)
+        self.heartbeat_interval = app.config.get("JOB_HEARTBEAT_SECONDS", 60)
+        app.extensions["job_runner"] = self
+
+    def _pool(self):
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="job")
+        return self._executor
+
+    def _submit(self, job_id):
+        with self._held_lock:
+            self._held.add(job_id)
+            if self._heartbeat_pid != os.getpid():
+                self._heartbeat_pid = os.getpid()
+                threading.Thread(target=self._heartbeat_loop, name="job-heartbeat", daemon=True).start()
+        self._pool().submit(self._run, job_id)
+
+    def _heartbeat_loop(self):
+        pid = os.getpid()
+        while self._heartbeat_pid == pid:
+            time.sleep(self.heartbeat_interval)
+            with self._held_lock:
+                held = list(self._held)
+            if not held:
+                continue
+            try:
+                with self.app.app_context(), db.engine.begin() as connection:
+                    connection.execute(
+                        update(Job).where(Job.id.in_(held), Job.status.in_(JobStatus.ACTIVE))
+                        .values(heartbeat_at=datetime.utcnow())
+                    )
+            except Exception as e:
+                self.app.logger.warning(f"Job heartbeat failed: {e}")
+
+    def _stale(self, now=None):
+        """Clause matching active jobs whose worker has stopped stamping them"""
+        cutoff = (now or datetime.utcnow()) - timedelta(seconds=self.stale_after)
+        return Job.status.in_(JobStatus.ACTIVE) & (func.coalesce(Job.heartbeat_at, Job.created_at) < cutoff)
+
+    def is_stale(self, job, now=None):
+        if job.status not in JobStatus.ACTIVE:
+            return False
+        cutoff = (now or datetime.utcnow()) - timedelta(seconds=self.stale_after)
+        return (job.heartbeat_at or job.created_at) < cutoff
+
+    # -- queue -------------------------------------------------------------
+
+    def enqueue(self, kind, params=None, user_id=None):
+        """Persist a new job and hand it to the pool; returns the Job"""
+        if kind not in JOB_TYPES:
+            raise JobError(f"Unknown job type '{kind}'")
+        job = Job(kind=kind, params=params or {}, created_by=user_id, heartbeat_at=datetime.utcnow())
+        db.session.add(job)
+        db.session.commit()
+        self._submit(job.id)
+        return job
+
+    def cancel(self, job_id):
+        """Cancel a queued job outright, or ask a running one to stop; a stale job is cancelled outright"""
+        job = db.session.get(Job, job_id)
+        if job is None:
+            raise JobError(f"Job {job_id} not found")
+        if job.status not in JobStatus.ACTIVE:
+            raise JobError(f"Job {job_id} has already finished")
+        # No worker is left to notice a cancellation request
+        db.session.execute(
+            update(Job).where(Job.id == job_id, self._stale())
+            .values(status=JobStatus.CANCELLED, finished_at=datetime.utcnow(),
+                    message="Cancelled after its worker stopped")
+            .execution_options(synchronize_session=False)
+        )
+        db.session.execute(
+            update(Job).where(Job.id == job_id, Job.status == JobStatus.QUEUED)
+            .values(status=JobStatus.CANCELLED, finished_at=datetime.utcnow(), message="Cancelled before starting")
+            .execution_options(synchronize_session=False)
+        )
+        db.session.execute(
+            update(Job).where(Job.id == job_id, Job.status == JobStatus.RUNNING)
+            .values(cancel_requested=True, message="Cancellation requested")
+            .execution_options(synchronize_session=False)
+        )
+        db.session.commit()
+        db.session.refresh(job)
+        return job
+
+    def retry(self, job_id):
+        """Re-queue a failed, cancelled or stale job with the same parameters"""
+        result = db.session.execute(
+            update(Job)
+            .where(Job.id == job_id, Job.status.in_([JobStatus.FAILED, JobStatus.CANCELLED]) | self._stale())
+            .values(status=JobStatus.QUEUED, progress=0.0, message="Queued for retry", error=None,
+                    cancel_requested=False, finished_at=None, heartbeat_at=datetime.utcnow())
+            .execution_options(synchronize_session=False)
+        )
+        db.session.commit()
+        if result.rowcount != 1:
+            raise JobError(f"Job {job_id} can only be retried after it fails, is cancelled or loses its worker")
+        self._submit(job_id)
+        job = db.session.get(Job, job_id)
+        db.session.refresh(job)
+        return job
+
+    def fail_stale(self):
+        """Fail jobs whose worker died (no heartbeat within stale_after) so they can be retried"""
+        result = db.session.execute(
+            update(Job)
+            .where(self._stale())
+            .values(status=JobStatus.FAILED, finished_at=datetime.utcnow(),
+                    message="Worker stopped before the job finished")
+            .execution_options(synchronize_session=False)
+        )
+        db.session.commit()
+        return result.rowcount
+
+    # -- execution ---------------------------------------------------------
+
+    def _run(self, job_id):
+        with self.app.app_context():
+            try:
+                self._execute(job_id)
+            except Exception as e:
+                self.app.logger.exception(f"Job {job_id} could not be recorded: {e}")
+            finally:
+                with self._held_lock:
+                    self._held.discard(job_id)
+                db.session.remove()
+
+    def _execute(self, job_id):
+        now = datetime.utcnow()
+        claimed = db.session.execute(
+            update(Job)
+            .where(Job.id == job_id, Job.status == JobStatus.QUEUED)
+            .values(status=JobStatus.RUNNING, worker=_holder_id(), started_at=now, heartbeat_at=now,
+                    attempts=Job.attempts + 1, message="Started")
+            .execution_options(synchronize_session=False)
+        ).rowcount
+        db.session.commit()
+        if not claimed:
+            return  # Cancelled while queued, or another worker got there first
+
+        job = db.session.get(Job, job_id)
+        handler, params = JOB_TYPES.get(job.kind), dict(job.params or {})
+        try:
+            if handler is None:
+                raise JobError(f"Unknown job type '{job.kind}'")
+            result = handler(JobContext(job_id), **params)
+        except JobCancelled:
+            db.session.rollback()
+            self._finish(job_id, JobStatus.CANCELLED, message="Cancelled")
+        except Exception as e:
+            db.session.rollback()
+            self._finish(job_id, JobStatus.FAILED, message=str(e)[:255], error=traceback.format_exc())
+        else:
+            self._finish(job_id, JobStatus.SUCCEEDED, message="Completed", progress=1.0, result=result)
+
+    def _finish(self, job_id, status, **values):
+        db.session.execute(
+            update(Job).where(Job.id == job_id)
+            .values(status=status, finished_at=datetime.utcnow(), **values)
+            .execution_options(synchronize_session=False)
+        )
+        db.session.commit()
+
+
+runner = JobRunner()
+
+
+# -- job types ---------------------------------------------------------------
+
+@job_type("recalculate_metrics")
+def recalculate_metrics(context, years=5):
+    """Store today's metric, then rebuild daily/monthly/yearly history.
+
+    Today's row is committed before the rebuild starts, so a job cancelled later
+    keeps it; nothing is written if it is cancelled before then.
+    """
+    from src.utils.metric_calculator import MetricCalculator
+
+    context.progress(0.0, "Storing today's metric")
+    MetricCalculator.store_daily_metric()
+    written = MetricCalculator.process_historical_metrics(
+        years, progress=lambda fraction, message: context.progress(0.1 + 0.9 * fraction, message)
+    )
+    return {"written": written}
+
+
+@job_type("monthly_metrics")
+def monthly_metrics(context, year, month):
+    from src.utils.metric_calculator import MetricCalculator
+
+    context.progress(0.0, f"Averaging daily metrics for {year}-{month:02d}")
+    return {"stored": MetricCalculator.store_monthly_metric(year, month)}
+
+
+@job_type("yearly_metrics")
+def yearly_metrics(context, year):
+    from src.utils.metric_calculator import MetricCalculator
+
+    context.progress(0.0, f"Averaging monthly metrics for {year}")
+    return {"stored": MetricCalculator.store_yearly_metric(year)}
@@ -0,0 +1,161 @@
+# src/utils/metric_backfill.py
+from datetime import date, datetime, time, timedelta
+import numpy as np
+import pandas as pd
+from sqlalchemy import select, func
+from src.extensions import db
+from src.models.substation import Substation, InspectionTest
+from src.utils.inspection_archive import history_view
+from src.utils.metric_writer import METRIC_COLUMNS, metric_row, upsert_metrics
+
+COVERAGE_WEIGHTS = {"Fully Covered": 1.0, "Partially Covered": 0.5}
+
+
+class History:
+    """Everything needed to reconstruct any day's metrics, pulled in three aggregate queries.
+
+    Coverage status has no history of its own, so each substation's current status
+    is applied from the day it was created.
+    """
+
+    def __init__(self, created, coverage_weight, first_inspected, first_tested):
+        self.created = created
+        self.coverage_weight = coverage_weight
+        self.first_inspected = first_inspected
+        self.first_tested = first_tested
+
+    @classmethod
+    def load(cls, session=None, until=None, archived=True):
+        """Load history, optionally ignoring anything after the day `until`.
+
+        First inspections usually lie in archived years, so the archive is read
+        too unless `archived` is False.
+        """
+        session = session or db.session
+        rows = history_view if archived else InspectionTest.__table__
+        substations = select(Substation.created_at, Substation.coverage_status)
+        first_inspected = select(func.min(rows.c.inspection_date))\
+            .where(rows.c.inspection_status == "Inspected")
+        tested_on = func.coalesce(rows.c.testing_date, rows.c.inspection_date)
+        first_tested = select(func.min(tested_on)).where(rows.c.testing_status == "Tested")
+        if until is not None:
+            # Later events cannot affect any day up to `until`
+            substations = substations.where(
+                (Substation.created_at < datetime.combine(until + timedelta(days=1), time.min)) | Substation.created_at.is_(None)
+            )
+            first_inspected = first_inspected.where(rows.c.inspection_date <= until)
+            first_tested = first_tested.where(tested_on <= until)
+
+        substations = session.execute(substations).all()
+        first_inspected = session.execute(
+            first_inspected.group_by(rows.c.substation_id)
+        ).scalars().all()
+        first_tested = session.execute(
+            first_tested.group_by(rows.c.substation_id)
+        ).scalars().all()
+
+        # Substations without a creation timestamp count as existing from the start
+        created = pd.to_datetime(pd.Series([row[0] for row in substations], dtype="object")).dt.normalize()
+        created = created.fillna(pd.Timestamp("1900-01-01"))
+        weight = pd.Series([COVERAGE_WEIGHTS.get(row[1], 0.0) for row in substations], dtype="float64")
+        return cls(
+            created=created.to_numpy(dtype="datetime64[D]"),
+            coverage_weight=weight.to_numpy(),
+            first_inspected=pd.to_datetime(pd.Series(first_inspected, dtype="object")).to_numpy(dtype="datetime64[D]"),
+            first_tested=pd.to_datetime(pd.Series(first_tested, dtype="object")).to_numpy(dtype="datetime64[D]")
+        )
+
+
+def _cumulative(event_days, start, n_days, weights=None):
+    """Running total of events on or before each day of [start, start + n_days)"""
+    offsets = (event_days - np.datetime64(start, "D")).astype(np.int64)
+    if weights is None:
+        weights = np.ones(len(offsets))
+    before = weights[offsets < 0].sum()
+    in_range = (offsets >= 0) & (offsets < n_days)
+    per_day = np.bincount(offsets[in_range], weights=weights[in_range], minlength=n_days)
+    return before + np.cumsum(per_day)
+
+
+def compute_daily_metrics(history, start, end):
+    """Point-in-time daily metrics for every day in [start, end], as a DataFrame indexed by date.
+
+    Days with no substations are dropped, matching store_daily_metric.
+    """
+    days = pd.date_range(start, end, freq="D")
+    n_days = len(days)
+    if n_days == 0:
+        return pd.DataFrame(columns=METRIC_COLUMNS + ['total_substations'])
+
+    total = _cumulative(history.created, start, n_days)
+    covered = _cumulative(history.created, start, n_days, history.coverage_weight)
+    inspected = _cumulative(history.first_inspected, start, n_days)
+    tested = _cumulative(history.first_tested, start, n_days)
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        coverage_ratio = covered / total * 100
+        inspection_compliance = inspected / total * 100
+        testing_compliance = tested / total * 100
+    effective = (coverage_ratio + inspection_compliance + testing_compliance) / 3
+
+    frame = pd.DataFrame({
+        'total_substations': total.astype(np.int64),
+        'reliability_score': effective,
+        'testing_compliance': testing_compliance,
+        'inspection_compliance': inspection_compliance,
+        'coverage_ratio': coverage_ratio,
+        'effective_reliability': effective
+    }, index=days)
+    return frame[frame['total_substations'] > 0]
+
+
+def rollup(daily):
+    """Monthly means of daily rows, and yearly means of those monthly rows"""
+    monthly = daily[METRIC_COLUMNS].resample("MS").mean().dropna(how="all")
+    yearly = monthly.resample("YS").mean().dropna(how="all")
+    return monthly, yearly
+
+
+def metric_rows(frame, period_type):
+    """Writer rows for each dated row of a metrics frame"""
+    records = frame[METRIC_COLUMNS].astype(float).to_dict("records")
+    return [metric_row(ts.date(), period_type, values) for ts, values in zip(frame.index, records)]
+
+
+def backfill_rows(history, start, end, with_rollups=True):
+    """Writer rows for [start, end], plus the row count per period type.
+
+    Daily metrics are computed from January of the start year so the monthly and
+    yearly rollups always see whole periods.
+    """
+    full = compute_daily_metrics(history, date(start.year, 1, 1), end)
+    daily = full[full.index >= pd.Timestamp(start)]
+    rows = metric_rows(daily, 'daily')
+    written = {'daily': len(rows)}
+    if with_rollups:
+        monthly, yearly = rollup(full)
+        first_month = pd.Timestamp(date(start.year, start.month, 1))
+        monthly_rows = metric_rows(monthly[monthly.index >= first_month], 'monthly')
+        yearly_rows = metric_rows(yearly, 'yearly')
+        written['monthly'] = len(monthly_rows)
+        written['yearly'] = len(yearly_rows)
+        rows += monthly_rows + yearly_rows
+    return rows, written
+
+
+def backfill(start, end, session=None, with_rollups=True, progress=None):
+    """Rebuild daily (and optionally monthly/yearly) metrics for [start, end] from inspection history.
+
+    `progress(fraction, message)` is called between stages, before anything is
+    written. Returns a dict of row counts written per period type.
+    """
+    session = session or db.session
+    progress = progress or (lambda fraction, message: None)
+    progress(0.0, "Loading inspection history")
+    history = History.load(session)
+    progress(0.3, "Computing daily metrics")
+    rows, written = backfill_rows(history, start, end, with_rollups)
+    progress(0.6, f"Writing {len(rows)} metric rows")
+    # Every period type lands in one transaction
+    upsert_metrics(rows, session)
+    return written
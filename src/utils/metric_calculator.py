@@ -3,80 +3,37 @@ from datetime import datetime, date, timedelta
 from calendar import monthrange
 from sqlalchemy import func, extract
 from src.extensions import db
-from src.models.substation import Substation, InspectionTest, ReliabilityMetric
+from src.models.substation import Substation, ReliabilityMetric
+from src.utils.metric_snapshot import take_snapshot
+from src.utils.metric_counters import read_counters
+from src.utils import metric_backfill
+from src.utils.sql_dates import dialect_name, month_bucket
+from src.utils.metric_writer import upsert_metrics, metric_row
+from src.utils.inspection_archive import inspection_source
 
 class MetricCalculator:
     
     @staticmethod
-    def calculate_current_metrics():
+    def snapshot():
+        """Current dashboard numbers from the running totals, recounting if they are not seeded yet"""
+        return read_counters() or take_snapshot()
+
+    @staticmethod
+    def calculate_current_metrics(snapshot=None):
         """Calculate current reliability metrics"""
-        total_substations = Substation.query.count()
-        
-        if total_substations == 0:
-            return {
-                'total_substations': 0,
-                'coverage_ratio': 0,
-                'inspection_compliance': 0,
-                'testing_compliance': 0,
-                'effective_reliability': 0
-            }
-        
-        fully_covered = Substation.query.filter_by(coverage_status="Fully Covered").count()
-        partially_covered = Substation.query.filter_by(coverage_status="Partially Covered").count()
-        
-        inspected_substations_count = db.session.query(func.count(func.distinct(InspectionTest.substation_id))).filter(InspectionTest.inspection_status == "Inspected").scalar()
-        tested_substations_count = db.session.query(func.count(func.distinct(InspectionTest.substation_id))).filter(InspectionTest.testing_status == "Tested").scalar()
-        
-        coverage_ratio = (fully_covered + partially_covered * 0.5) / total_substations * 100
-        inspection_compliance = inspected_substations_count / total_substations * 100
-        testing_compliance = tested_substations_count / total_substations * 100
-        
-        # Original formula: (coverage + inspection + testing) / 3
-        effective_reliability = (coverage_ratio + inspection_compliance + testing_compliance) / 3
-        
-        return {
-            'total_substations': total_substations,
-            'coverage_ratio': coverage_ratio,
-            'inspection_compliance': inspection_compliance,
-            'testing_compliance': testing_compliance,
-            'effective_reliability': effective_reliability
-        }
+        if snapshot is None:
+            snapshot = MetricCalculator.snapshot()
+        return snapshot.to_metrics()
     
     @staticmethod
-    def store_daily_metric():
+    def store_daily_metric(snapshot=None):
         """Store today's reliability metric"""
-        metrics = MetricCalculator.calculate_current_metrics()
+        metrics = MetricCalculator.calculate_current_metrics(snapshot)
         
         if metrics['total_substations'] > 0:
-            today = date.today()
-            
-            # Check if today's metric already exists
-            existing_metric = ReliabilityMetric.query.filter_by(
-                date=today, 
-                period_type='daily'
-            ).first()
-            
-            if existing_metric:
-                # Update existing metric
-                existing_metric.reliability_score = metrics['effective_reliability']
-                existing_metric.testing_compliance = metrics['testing_compliance']
-                existing_metric.inspection_compliance = metrics['inspection_compliance']
-                existing_metric.coverage_ratio = metrics['coverage_ratio']
-                existing_metric.effective_reliability = metrics['effective_reliability']
-            else:
-                # Create new metric
-                new_metric = ReliabilityMetric(
-                    date=today,
-                    period_type='daily',
-                    reliability_score=metrics['effective_reliability'],
-                    testing_compliance=metrics['testing_compliance'],
-                    inspection_compliance=metrics['inspection_compliance'],
-                    coverage_ratio=metrics['coverage_ratio'],
-                    effective_reliability=metrics['effective_reliability']
-                )
-                db.session.add(new_metric)
-            
-            db.session.commit()
+            # The daily reliability score is the effective reliability
+            values = dict(metrics, reliability_score=metrics['effective_reliability'])
+            upsert_metrics([metric_row(date.today(), 'daily', values)])
             return True
         return False
     
@@ -119,33 +76,7 @@ class MetricCalculator:
         monthly_data = MetricCalculator.calculate_monthly_metrics(year, month)
         
         if monthly_data:
-            # Check if monthly metric already exists
-            existing_metric = ReliabilityMetric.query.filter_by(
-                date=monthly_data['date'],
-                period_type='monthly'
-            ).first()
-            
-            if existing_metric:
-                # Update existing metric
-                existing_metric.reliability_score = monthly_data['reliability_score']
-                existing_metric.testing_compliance = monthly_data['testing_compliance']
-                existing_metric.inspection_compliance = monthly_data['inspection_compliance']
-                existing_metric.coverage_ratio = monthly_data['coverage_ratio']
-                existing_metric.effective_reliability = monthly_data['effective_reliability']
-            else:
-                # Create new metric
-                new_metric = ReliabilityMetric(
-                    date=monthly_data['date'],
-                    period_type='monthly',
-                    reliability_score=monthly_data['reliability_score'],
-                    testing_compliance=monthly_data['testing_compliance'],
-                    inspection_compliance=monthly_data['inspection_compliance'],
-                    coverage_ratio=monthly_data['coverage_ratio'],
-                    effective_reliability=monthly_data['effective_reliability']
-                )
-                db.session.add(new_metric)
-            
-            db.session.commit()
+            upsert_metrics([metric_row(monthly_data['date'], 'monthly', monthly_data)])
             return True
         return False
     
@@ -188,98 +119,101 @@ class MetricCalculator:
         yearly_data = MetricCalculator.calculate_yearly_metrics(year)
         
         if yearly_data:
-            # Check if yearly metric already exists
-            existing_metric = ReliabilityMetric.query.filter_by(
-                date=yearly_data['date'],
-                period_type='yearly'
-            ).first()
-            
-            if existing_metric:
-                # Update existing metric
-                existing_metric.reliability_score = yearly_data['reliability_score']
-                existing_metric.testing_compliance = yearly_data['testing_compliance']
-                existing_metric.inspection_compliance = yearly_data['inspection_compliance']
-                existing_metric.coverage_ratio = yearly_data['coverage_ratio']
-                existing_metric.effective_reliability = yearly_data['effective_reliability']
-            else:
-                # Create new metric
-                new_metric = ReliabilityMetric(
-                    date=yearly_data['date'],
-                    period_type='yearly',
-                    reliability_score=yearly_data['reliability_score'],
-                    testing_compliance=yearly_data['testing_compliance'],
-                    inspection_compliance=yearly_data['inspection_compliance'],
-                    coverage_ratio=yearly_data['coverage_ratio'],
-                    effective_reliability=yearly_data['effective_reliability']
-                )
-                db.session.add(new_metric)
-            
-            db.session.commit()
+            upsert_metrics([metric_row(yearly_data['date'], 'yearly', yearly_data)])
             return True
         return False
     
     @staticmethod
-    def process_historical_metrics():
-        """Process and store historical monthly and yearly metrics"""
+    def backfill_metrics(start_date, end_date, with_rollups=True, progress=None):
+        """Rebuild stored metrics for a date range directly from inspection history"""
+        return metric_backfill.backfill(start_date, end_date, with_rollups=with_rollups, progress=progress)
+    
+    @staticmethod
+    def process_historical_metrics(years=5, progress=None):
+        """Process and store historical daily, monthly and yearly metrics"""
         today = date.today()
         
-        # Process monthly metrics for the last 12 months
-        for i in range(12):
-            target_date = today - timedelta(days=30 * i)
-            MetricCalculator.store_monthly_metric(target_date.year, target_date.month)
-        
-        # Process yearly metrics for the last 5 years
-        for i in range(5):
-            target_year = today.year - i
-            MetricCalculator.store_yearly_metric(target_year)
+        # Reconstruct every day of the last `years` calendar years, then roll up
+        # whole calendar months and years from those daily rows
+        written = MetricCalculator.backfill_metrics(date(today.year - years + 1, 1, 1), today, progress=progress)
         
-        print("Historical metrics processing completed!")
+        print(f"Historical metrics processing completed! {written}")
+        return written
+    
+    @staticmethod
+    def get_monthly_compliance_series(start_year, start_month, end_year, end_month):
+        """Inspection and testing compliance for every month in a range, column-oriented for Chart.js.
+
+        One grouped query per measure: distinct inspected substations per month,
+        distinct tested substations per month, and substations created per month
+        (accumulated into the "total at end of month" denominator). Ranges that
+        reach back into archived years read the history view, others only the hot table.
+        """
+        first_day = date(start_year, start_month, 1)
+        last_day = date(end_year, end_month, monthrange(end_year, end_month)[1])
+        labels = [f"{year:04d}-{month:02d}" for year, month in _iter_months(first_day, last_day)]
+        dialect = dialect_name()
+        rows = inspection_source(first_day)
+
+        inspected_bucket = month_bucket(rows.c.inspection_date, dialect)
+        inspected = dict(db.session.query(
+            inspected_bucket, func.count(func.distinct(rows.c.substation_id))
+        ).filter(
+            rows.c.inspection_date >= first_day,
+            rows.c.inspection_date <= last_day,
+            rows.c.inspection_status == "Inspected"
+        ).group_by(inspected_bucket).all())
+
+        tested_bucket = month_bucket(rows.c.testing_date, dialect)
+        tested = dict(db.session.query(
+            tested_bucket, func.count(func.distinct(rows.c.substation_id))
+        ).filter(
+            rows.c.testing_date >= first_day,
+            rows.c.testing_date <= last_day,
+            rows.c.testing_status == "Tested"
+        ).group_by(tested_bucket).all())
+
+        # Substations existing at the end of each month: cumulative count over created_at
+        created_bucket = month_bucket(Substation.created_at, dialect)
+        created = db.session.query(created_bucket, func.count(Substation.id)).filter(
+            Substation.created_at < datetime.combine(last_day + timedelta(days=1), datetime.min.time())
+        ).group_by(created_bucket).all()
+        created_by_month = dict(created)
+        running_total = sum(count for month, count in created if month < labels[0])
+
+        totals, inspection_compliance, testing_compliance = [], [], []
+        for label in labels:
+            running_total += created_by_month.get(label, 0)
+            totals.append(running_total)
+            if running_total == 0:
+                inspection_compliance.append(0)
+                testing_compliance.append(0)
+            else:
+                inspection_compliance.append(inspected.get(label, 0) / running_total * 100)
+                testing_compliance.append(tested.get(label, 0) / running_total * 100)
+
+        return {
+            'labels': labels,
+            'total_substations': totals,
+            'inspection_compliance': inspection_compliance,
+            'testing_compliance': testing_compliance
+        }
     
     @staticmethod
     def get_monthly_inspection_compliance(year, month):
         """Calculate monthly inspection compliance for a specific month"""
-        # Get the first and last day of the month
-        first_day = date(year, month, 1)
-        last_day = date(year, month, monthrange(year, month)[1])
-        
-        # Count substations inspected in this month
-        inspected_in_month = db.session.query(func.count(func.distinct(InspectionTest.substation_id))).filter(
-            InspectionTest.inspection_date >= first_day,
-            InspectionTest.inspection_date <= last_day,
-            InspectionTest.inspection_status == "Inspected"
-        ).scalar()
-        
-        # Total substations at the end of the month
-        total_substations = Substation.query.filter(
-            Substation.created_at <= datetime.combine(last_day, datetime.min.time())
-        ).count()
-        
-        if total_substations == 0:
-            return 0
-        
-        return (inspected_in_month / total_substations) * 100
+        series = MetricCalculator.get_monthly_compliance_series(year, month, year, month)
+        return series['inspection_compliance'][0]
     
     @staticmethod
     def get_monthly_testing_compliance(year, month):
         """Calculate monthly testing compliance for a specific month"""
-        # Get the first and last day of the month
-        first_day = date(year, month, 1)
-        last_day = date(year, month, monthrange(year, month)[1])
-        
-        # Count substations tested in this month
-        tested_in_month = db.session.query(func.count(func.distinct(InspectionTest.substation_id))).filter(
-            InspectionTest.testing_date >= first_day,
-            InspectionTest.testing_date <= last_day,
-            InspectionTest.testing_status == "Tested"
-        ).scalar()
-        
-        # Total substations at the end of the month
-        total_substations = Substation.query.filter(
-            Substation.created_at <= datetime.combine(last_day, datetime.min.time())
-        ).count()
-        
-        if total_substations == 0:
-            return 0
-        
-        return (tested_in_month / total_substations) * 100
+        series = MetricCalculator.get_monthly_compliance_series(year, month, year, month)
+        return series['testing_compliance'][0]
+
 
+def _iter_months(first_day, last_day):
+    year, month = first_day.year, first_day.month
+    while (year, month) <= (last_day.year, last_day.month):
+        yield year, month
+        year, month = (year + 1, 1) if month == 12 else (year, month + 1)
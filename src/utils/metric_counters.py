@@ -0,0 +1,166 @@
+# src/utils/metric_counters.py
+from datetime import datetime
+from sqlalchemy import event, func, case, select, update, insert, inspect
+from src.extensions import db
+from src.models.substation import Substation, SubstationStatus, MetricAggregate
+from src.utils.metric_snapshot import MetricsSnapshot, take_snapshot
+
+AGGREGATE_ID = 1
+COVERAGE_COUNTERS = {"Fully Covered": "fully_covered", "Partially Covered": "partially_covered"}
+# Counters derived from SubstationStatus rows
+STATUS_COUNTERS = [
+    "inspected_substations",
+    "tested_substations",
+    "total_inspection_records",
+    "inspected_records",
+    "inspection_status_records",
+    "tested_records",
+    "testing_status_records"
+]
+COUNTERS = ["total_substations", "fully_covered", "partially_covered"] + STATUS_COUNTERS
+
+
+def _count_if(condition):
+    return func.coalesce(func.sum(case((condition, 1), else_=0)), 0)
+
+
+def status_totals(connection, substation_ids):
+    """Contribution of the given substations' SubstationStatus rows to each status counter"""
+    row = connection.execute(select(
+        _count_if(SubstationStatus.ever_inspected == True),  # noqa: E712
+        _count_if(SubstationStatus.ever_tested == True),  # noqa: E712
+        func.count(SubstationStatus.substation_id),
+        _count_if(SubstationStatus.inspection_status == "Inspected"),
+        func.count(SubstationStatus.inspection_status),
+        _count_if(SubstationStatus.testing_status == "Tested"),
+        func.count(SubstationStatus.testing_status)
+    ).where(SubstationStatus.substation_id.in_(substation_ids))).one()
+    return dict(zip(STATUS_COUNTERS, row))
+
+
+def coverage_delta(statuses, sign=1):
+    """Counter changes for substations with the given coverage statuses being added (or removed, sign=-1)"""
+    delta = {"total_substations": 0}
+    for status in statuses:
+        delta["total_substations"] += sign
+        column = COVERAGE_COUNTERS.get(status)
+        if column:
+            delta[column] = delta.get(column, 0) + sign
+    return delta
+
+
+def subtract(after, before):
+    return {key: after[key] - before[key] for key in after}
+
+
+def apply_delta(connection, delta):
+    """Add `delta` to the aggregate row inside the caller's transaction.
+
+    Until the row has been seeded by recount_counters this is a no-op, and
+    readers fall back to a full recount.
+    """
+    delta = {key: value for key, value in delta.items() if value}
+    if not delta:
+        return
+    table = MetricAggregate.__table__
+    connection.execute(
+        update(table)
+        .where(table.c.id == AGGREGATE_ID)
+        .values({key: table.c[key] + value for key, value in delta.items()})
+    )
+
+
+def _store(connection, snapshot, verified_at=None):
+    table = MetricAggregate.__table__
+    values = {key: getattr(snapshot, key) for key in COUNTERS}
+    if verified_at:
+        values["verified_at"] = verified_at
+    result = connection.execute(update(table).where(table.c.id == AGGREGATE_ID).values(values))
+    if result.rowcount == 0:
+        connection.execute(insert(table).values(id=AGGREGATE_ID, **values))
+
+
+def reset_counters(session=None):
+    """Zero the running totals in the caller's transaction, e.g. after every row was bulk-deleted"""
+    session = session or db.session
+    _store(session.connection(), MetricsSnapshot(), verified_at=datetime.utcnow())
+
+
+def read_counters(session=None):
+    """Current metrics snapshot from the aggregate row, or None if it has not been seeded"""
+    session = session or db.session
+    row = session.execute(
+        select(*[MetricAggregate.__table__.c[key] for key in COUNTERS])
+        .where(MetricAggregate.id == AGGREGATE_ID)
+    ).one_or_none()
+    if row is None:
+        return None
+    return MetricsSnapshot(**dict(zip(COUNTERS, row)))
+
+
+def recount_counters(session=None):
+    """Overwrite the aggregate row with a full recount and commit"""
+    session = session or db.session
+    snapshot = take_snapshot(session)
+    _store(session.connection(), snapshot, verified_at=datetime.utcnow())
+    session.commit()
+    return snapshot
+
+
+def verify_counters(session=None, fix=True):
+    """Compare the running totals with a full recount; returns {counter: (stored, actual)} for any drift.
+
+    With `fix`, drifted counters are overwritten in the same transaction as the
+    recount so concurrent writers cannot slip in between.
+    """
+    session = session or db.session
+    stored = read_counters(session)
+    actual = take_snapshot(session)
+    drift = {}
+    for key in COUNTERS:
+        stored_value = getattr(stored, key) if stored else None
+        if stored_value != getattr(actual, key):
+            drift[key] = (stored_value, getattr(actual, key))
+    if fix:
+        _store(session.connection(), actual, verified_at=datetime.utcnow())
+        session.commit()
+    else:
+        session.rollback()
+    return drift
+
+
+def _substation_delta(session):
+    """Counter changes from Substation rows inserted, deleted or re-classified in this flush"""
+    delta = {}
+
+    def add(changes):
+        for key, value in changes.items():
+            delta[key] = delta.get(key, 0) + value
+
+    for obj in session.new:
+        if isinstance(obj, Substation):
+            add(coverage_delta([obj.coverage_status]))
+    for obj in session.deleted:
+        if isinstance(obj, Substation):
+            history = inspect(obj).attrs.coverage_status.history
+            add(coverage_delta(history.deleted or history.unchanged or [obj.coverage_status], sign=-1))
+    for obj in session.dirty:
+        if isinstance(obj, Substation):
+            history = inspect(obj).attrs.coverage_status.history
+            if history.added and history.deleted:
+                add(coverage_delta(history.deleted, sign=-1))
+                add(coverage_delta(history.added))
+    return delta
+
+
+@event.listens_for(Substation.coverage_status, "set", active_history=True)
+def _load_previous_coverage(target, value, oldvalue, initiator):
+    """No-op; active_history loads the old value of an expired attribute so the flush can subtract it"""
+
+
+@event.listens_for(db.session, "after_flush")
+def _count_after_flush(session, flush_context):
+    """Keep coverage counters in step with ORM inserts, edits and deletes of Substation"""
+    delta = _substation_delta(session)
+    if any(delta.values()):
+        apply_delta(session.connection(), delta)
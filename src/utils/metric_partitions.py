@@ -0,0 +1,143 @@
+# src/utils/metric_partitions.py
+import math
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from dataclasses import dataclass, field
+from datetime import date
+import pandas as pd
+from sqlalchemy import create_engine, select
+from sqlalchemy.orm import Session
+from sqlalchemy.pool import NullPool
+from src.models.substation import ReliabilityMetric
+from src.models.user import User  # noqa: F401  Spawned workers need every mapped class to configure mappers
+from src.utils.metric_backfill import History, backfill_rows, metric_rows, rollup
+from src.utils.metric_writer import METRIC_COLUMNS
+
+# Stored and recomputed values closer than this count as equal when verifying
+TOLERANCE = 1e-6
+
+
+@dataclass
+class PartitionResult:
+    """Outcome of one year's partition, computed in a worker process"""
+    start: date
+    end: date
+    rows: list = field(default_factory=list)
+    written: dict = field(default_factory=dict)
+    mismatches: list = field(default_factory=list)
+    timings: dict = field(default_factory=dict)
+
+    @property
+    def label(self):
+        return f"{self.start.isoformat()}..{self.end.isoformat()}"
+
+
+def year_partitions(start, end):
+    """Split [start, end] into calendar-year ranges"""
+    return [
+        (max(start, date(year, 1, 1)), min(end, date(year, 12, 31)))
+        for year in range(start.year, end.year + 1)
+    ]
+
+
+def _session(database_url):
+    # Each worker process gets its own engine; nothing is shared with the parent's pool
+    engine = create_engine(database_url, poolclass=NullPool)
+    return engine, Session(engine)
+
+
+def _stored_rows(session, start, end, period_types):
+    frame = pd.DataFrame(session.execute(
+        select(ReliabilityMetric.date, ReliabilityMetric.period_type,
+               *[getattr(ReliabilityMetric, c) for c in METRIC_COLUMNS])
+        .where(ReliabilityMetric.date >= start, ReliabilityMetric.date <= end,
+               ReliabilityMetric.period_type.in_(period_types))
+    ).all(), columns=['date', 'period_type'] + METRIC_COLUMNS)
+    frame['date'] = pd.to_datetime(frame['date'])
+    return frame
+
+
+def compute_backfill(database_url, start, end, with_rollups=True):
+    """Recompute one partition from inspection history (runs in a worker process)"""
+    engine, session = _session(database_url)
+    try:
+        began = time.perf_counter()
+        history = History.load(session, until=end)
+        loaded = time.perf_counter()
+        rows, written = backfill_rows(history, start, end, with_rollups)
+        finished = time.perf_counter()
+    finally:
+        session.close()
+        engine.dispose()
+    return PartitionResult(start, end, rows=rows, written=written,
+                           timings={'load': loaded - began, 'compute': finished - loaded})
+
+
+def compute_rollup(database_url, start, end):
+    """Recompute monthly and yearly rows for one partition from its stored daily rows"""
+    engine, session = _session(database_url)
+    try:
+        began = time.perf_counter()
+        # Whole year of daily rows, so the yearly mean sees every month
+        daily = _stored_rows(session, date(start.year, 1, 1), date(end.year, 12, 31), ['daily'])
+        loaded = time.perf_counter()
+        daily = daily.set_index('date').sort_index()
+        monthly, yearly = rollup(daily)
+        monthly = monthly[(monthly.index >= pd.Timestamp(date(start.year, start.month, 1))) &
+                          (monthly.index <= pd.Timestamp(end))]
+        rows = metric_rows(monthly, 'monthly') + metric_rows(yearly, 'yearly')
+        finished = time.perf_counter()
+    finally:
+        session.close()
+        engine.dispose()
+    return PartitionResult(start, end, rows=rows, written={'monthly': len(monthly), 'yearly': len(yearly)},
+                           timings={'load': loaded - began, 'compute': finished - loaded})
+
+
+def compute_verify(database_url, start, end, with_rollups=True):
+    """Compare stored rows for one partition with a fresh recomputation"""
+    result = compute_backfill(database_url, start, end, with_rollups)
+    engine, session = _session(database_url)
+    try:
+        began = time.perf_counter()
+        stored = _stored_rows(session, start, end, list(result.written))
+        stored = {(ts.date(), period): values for ts, period, values in zip(
+            stored['date'], stored['period_type'], stored[METRIC_COLUMNS].to_dict('records'))}
+    finally:
+        session.close()
+        engine.dispose()
+
+    for row in result.rows:
+        key = (row['date'], row['period_type'])
+        values = stored.get(key)
+        if values is None:
+            result.mismatches.append((key, 'missing'))
+            continue
+        for column in METRIC_COLUMNS:
+            expected, actual = row[column], values[column]
+            if actual is None or math.isnan(actual) or abs(actual - expected) > TOLERANCE:
+                result.mismatches.append((key, f"{column}: stored {actual}, expected {expected}"))
+                break
+    result.rows = []
+    result.timings['compare'] = time.perf_counter() - began
+    return result
+
+
+def run_partitions(fn, database_url, partitions, workers=None, **kwargs):
+    """Run `fn(database_url, start, end, **kwargs)` for every partition, yielding results as they finish.
+
+    With one worker (or one partition) everything runs in this process.
+    """
+    workers = workers or os.cpu_count() or 1
+    if workers == 1 or len(partitions) == 1:
+        for start, end in partitions:
+            yield fn(database_url, start, end, **kwargs)
+        return
+    # spawn, not fork: children must not inherit the parent's open database connections
+    context = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(max_workers=min(workers, len(partitions)), mp_context=context) as pool:
+        futures = [pool.submit(fn, database_url, start, end, **kwargs) for start, end in partitions]
+        for future in as_completed(futures):
+            yield future.result()
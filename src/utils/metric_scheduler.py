@@ -0,0 +1,160 @@
+# src/utils/metric_scheduler.py
+import os
+import socket
+import threading
+from datetime import datetime, timedelta
+from sqlalchemy import update, or_
+from sqlalchemy.exc import IntegrityError
+from src.extensions import db
+from src.models.scheduler import SchedulerLease
+
+DAILY_SNAPSHOT_LEASE = "daily_metric_snapshot"
+COUNTER_VERIFY_LEASE = "metric_counter_verify"
+STALE_JOB_LEASE = "stale_job_sweep"
+
+
+def _holder_id():
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+def _next_midnight(now):
+    return datetime.combine(now.date() + timedelta(days=1), datetime.min.time())
+
+
+def claim_lease(name, interval, now=None):
+    """Atomically claim a lease if it has not run within `interval` seconds or since midnight.
+
+    The claim is a single conditional UPDATE, so when several gunicorn workers race
+    only one of them sees a matched row. The caller must commit (or roll back) the
+    session; rolling back releases the claim.
+    """
+    now = now or datetime.now()
+    if db.session.get(SchedulerLease, name) is None:
+        try:
+            db.session.add(SchedulerLease(name=name))
+            db.session.commit()
+        except IntegrityError:
+            db.session.rollback()  # Another worker created it first
+
+    start_of_day = datetime.combine(now.date(), datetime.min.time())
+    result = db.session.execute(
+        update(SchedulerLease)
+        .where(SchedulerLease.name == name)
+        .where(or_(
+            SchedulerLease.last_run_at.is_(None),
+            SchedulerLease.last_run_at <= now - timedelta(seconds=interval),
+            SchedulerLease.last_run_at < start_of_day
+        ))
+        .values(holder=_holder_id(), last_run_at=now)
+        .execution_options(synchronize_session=False)
+    )
+    return result.rowcount == 1
+
+
+def run_daily_snapshot(interval):
+    """Store today's daily metric unless another worker already did within the interval"""
+    from src.utils.metric_calculator import MetricCalculator
+
+    try:
+        if not claim_lease(DAILY_SNAPSHOT_LEASE, interval):
+            db.session.rollback()
+            return False
+        # store_daily_metric commits the claim and the metric row together
+        if not MetricCalculator.store_daily_metric():
+            db.session.commit()
+        return True
+    except Exception:
+        db.session.rollback()
+        raise
+
+
+def run_counter_verification(interval):
+    """Reconcile the running metric counters against a full recount, at most once per interval"""
+    from src.utils.metric_counters import verify_counters
+
+    try:
+        if not claim_lease(COUNTER_VERIFY_LEASE, interval):
+            db.session.rollback()
+            return None
+        # verify_counters commits the claim together with any correction
+        return verify_counters()
+    except Exception:
+        db.session.rollback()
+        raise
+
+
+def run_stale_job_sweep(interval):
+    """Fail background jobs orphaned by a stopped worker, at most once per interval"""
+    from src.utils.jobs import runner
+
+    try:
+        if not claim_lease(STALE_JOB_LEASE, interval):
+            db.session.rollback()
+            return None
+        # fail_stale commits the claim together with the failed jobs
+        return runner.fail_stale()
+    except Exception:
+        db.session.rollback()
+        raise
+
+
+class MetricSnapshotScheduler(threading.Thread):
+    """Background thread that snapshots today's metrics every `interval` seconds and at day rollover.
+
+    It also reconciles the running metric counters every `verify_interval` seconds
+    and fails orphaned background jobs every `sweep_interval` seconds.
+    """
+
+    def __init__(self, app, interval, verify_interval=0, sweep_interval=0):
+        super().__init__(name="metric-snapshot-scheduler", daemon=True)
+        self.app = app
+        self.interval = interval
+        self.verify_interval = verify_interval
+        self.sweep_interval = sweep_interval
+        self._stop_event = threading.Event()
+
+    def stop(self):
+        self._stop_event.set()
+
+    def seconds_until_next_run(self, now=None):
+        now = now or datetime.now()
+        next_run = min(now + timedelta(seconds=self.interval), _next_midnight(now))
+        if self.sweep_interval > 0:
+            # Extra wake-ups are cheap: the snapshot's own lease keeps it to once per interval
+            next_run = min(next_run, now + timedelta(seconds=self.sweep_interval))
+        return max((next_run - now).total_seconds(), 1)
+
+    def run(self):
+        while not self._stop_event.is_set():
+            with self.app.app_context():
+                try:
+                    run_daily_snapshot(self.interval)
+                except Exception as e:
+                    self.app.logger.warning(f"Daily metric snapshot failed: {e}")
+                if self.verify_interval > 0:
+                    try:
+                        drift = run_counter_verification(self.verify_interval)
+                        if drift:
+                            self.app.logger.warning(f"Corrected drifted metric counters: {drift}")
+                    except Exception as e:
+                        self.app.logger.warning(f"Metric counter verification failed: {e}")
+                if self.sweep_interval > 0:
+                    try:
+                        stale = run_stale_job_sweep(self.sweep_interval)
+                        if stale:
+                            self.app.logger.warning(f"Marked {stale} interrupted background jobs as failed")
+                    except Exception as e:
+                        self.app.logger.warning(f"Stale job sweep failed: {e}")
+            self._stop_event.wait(self.seconds_until_next_run())
+
+
+def start_metric_scheduler(app):
+    """Start the snapshot thread for this worker process if enabled in config"""
+    interval = app.config.get("METRIC_SNAPSHOT_INTERVAL", 0)
+    if not app.config.get("METRIC_SCHEDULER_ENABLED") or interval <= 0:
+        return None
+    scheduler = MetricSnapshotScheduler(app, interval, app.config.get("METRIC_VERIFY_INTERVAL", 0),
+                                        app.config.get("JOB_SWEEP_INTERVAL", 0))
+    scheduler.start()
+    app.extensions["metric_scheduler"] = scheduler
+    return scheduler
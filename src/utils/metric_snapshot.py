@@ -0,0 +1,137 @@
+# src/utils/metric_snapshot.py
+from dataclasses import dataclass, asdict
+from sqlalchemy import func, case, select
+from src.extensions import db
+from src.models.substation import Substation, SubstationStatus
+
+
+@dataclass(frozen=True)
+class MetricsSnapshot:
+    """Every number the dashboard and the metric writers need, taken in one pass.
+
+    The *_records fields count each substation's latest inspection record only.
+    """
+    total_substations: int = 0
+    fully_covered: int = 0
+    partially_covered: int = 0
+    inspected_substations: int = 0
+    tested_substations: int = 0
+    total_inspection_records: int = 0
+    inspected_records: int = 0
+    inspection_status_records: int = 0
+    tested_records: int = 0
+    testing_status_records: int = 0
+
+    @property
+    def not_covered(self):
+        return self.total_substations - self.fully_covered - self.partially_covered
+
+    @property
+    def coverage_ratio(self):
+        if self.total_substations == 0:
+            return 0
+        return (self.fully_covered + self.partially_covered * 0.5) / self.total_substations * 100
+
+    @property
+    def inspection_compliance(self):
+        if self.total_substations == 0:
+            return 0
+        return self.inspected_substations / self.total_substations * 100
+
+    @property
+    def testing_compliance(self):
+        if self.total_substations == 0:
+            return 0
+        return self.tested_substations / self.total_substations * 100
+
+    @property
+    def effective_reliability(self):
+        if self.total_substations == 0:
+            return 0
+        # Original formula: (coverage + inspection + testing) / 3
+        return (self.coverage_ratio + self.inspection_compliance + self.testing_compliance) / 3
+
+    def coverage_chart(self):
+        """Coverage distribution in the shape dashboard.html expects"""
+        return {
+            "labels": ["Fully Covered", "Partially Covered", "Not Covered"],
+            "data": [self.fully_covered, self.partially_covered, self.not_covered]
+        }
+
+    def inspection_chart(self):
+        """(labels, values) for the simplified Inspected / Not Inspected pie"""
+        return _pie([
+            ("Inspected", self.inspected_records),
+            ("Not Inspected", self.total_inspection_records - self.inspected_records)
+        ])
+
+    def testing_chart(self):
+        """(labels, values) for the simplified Tested / Not Tested pie"""
+        return _pie([
+            ("Tested", self.tested_records),
+            ("Not Tested", self.total_inspection_records - self.tested_records)
+        ])
+
+    def to_metrics(self):
+        """Dict shape historically returned by MetricCalculator.calculate_current_metrics"""
+        return {
+            'total_substations': self.total_substations,
+            'coverage_ratio': self.coverage_ratio,
+            'inspection_compliance': self.inspection_compliance,
+            'testing_compliance': self.testing_compliance,
+            'effective_reliability': self.effective_reliability
+        }
+
+    def to_dict(self):
+        return asdict(self)
+
+
+def _pie(pairs):
+    # Empty slices are dropped, matching the old GROUP BY which only returned present groups
+    pairs = [(label, count) for label, count in pairs if count]
+    return [label for label, _ in pairs], [count for _, count in pairs]
+
+
+def _count_if(condition):
+    return func.coalesce(func.sum(case((condition, 1), else_=0)), 0)
+
+
+def take_snapshot(session=None):
+    """Compute a MetricsSnapshot with one aggregate statement per table.
+
+    Everything comes from Substation joined to SubstationStatus: the pie-chart
+    record counts from each substation's latest inspection, and the inspected/tested
+    substation counts from its ever_* flags, which also cover archived inspections.
+    """
+    session = session or db.session
+
+    substation_row = session.execute(select(
+        func.count(Substation.id),
+        _count_if(Substation.coverage_status == "Fully Covered"),
+        _count_if(Substation.coverage_status == "Partially Covered"),
+        func.count(SubstationStatus.substation_id),
+        _count_if(SubstationStatus.inspection_status == "Inspected"),
+        func.count(SubstationStatus.inspection_status),
+        _count_if(SubstationStatus.testing_status == "Tested"),
+        func.count(SubstationStatus.testing_status),
+        _count_if(SubstationStatus.ever_inspected == True),  # noqa: E712
+        _count_if(SubstationStatus.ever_tested == True)  # noqa: E712
+    ).select_from(Substation).outerjoin(
+        SubstationStatus, SubstationStatus.substation_id == Substation.id
+    )).one()
+
+    if substation_row[0] == 0:
+        return MetricsSnapshot()
+
+    return MetricsSnapshot(
+        total_substations=substation_row[0],
+        fully_covered=substation_row[1],
+        partially_covered=substation_row[2],
+        inspected_substations=substation_row[8],
+        tested_substations=substation_row[9],
+        total_inspection_records=substation_row[3],
+        inspected_records=substation_row[4],
+        inspection_status_records=substation_row[5],
+        tested_records=substation_row[6],
+        testing_status_records=substation_row[7]
+    )
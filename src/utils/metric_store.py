@@ -0,0 +1,326 @@
+# src/utils/metric_store.py
+import threading
+import time
+import warnings
+from datetime import date
+import numpy as np
+from src.utils.cache import METRICS, METRIC_HISTORY
+
+PERIOD_TYPES = ("daily", "monthly", "yearly")
+_EPOCH = date(1970, 1, 1).toordinal()
+
+
+def to_day(value):
+    """Day number (days since 1970-01-01, the int64 view of datetime64[D]) of a date"""
+    return value.toordinal() - _EPOCH
+
+
+def from_day(day):
+    return date.fromordinal(int(day) + _EPOCH)
+
+
+class MetricSeries:
+    """Read-only view of one period type: sorted day numbers and an (n, metrics) float64 array"""
+    __slots__ = ("period_type", "columns", "days", "values")
+
+    def __init__(self, period_type, columns, days, values):
+        self.period_type = period_type
+        self.columns = columns
+        self.days = days
+        self.values = values
+
+    def __len__(self):
+        return len(self.days)
+
+    def between(self, start=None, end=None):
+        """Rows dated within [start, end], located by binary search (no copy)"""
+        lo = 0 if start is None else int(np.searchsorted(self.days, to_day(start), side="left"))
+        hi = len(self.days) if end is None else int(np.searchsorted(self.days, to_day(end), side="right"))
+        return MetricSeries(self.period_type, self.columns, self.days[lo:hi], self.values[lo:hi])
+
+    def column(self, name):
+        return self.values[:, self.columns.index(name)]
+
+    def select(self, names):
+        """The same rows restricted to the named metric columns"""
+        index = [self.columns.index(name) for name in names]
+        return MetricSeries(self.period_type, tuple(names), self.days, self.values[:, index])
+
+    def take(self, indices):
+        """The rows at `indices`, in that order"""
+        return MetricSeries(self.period_type, self.columns, self.days[indices], self.values[indices])
+
+    def dates(self):
+        return [d.isoformat() for d in self.days.astype("datetime64[D]").astype(date)]
+
+
+class _Buffer:
+    """Over-allocated arrays behind one period type, so appending the newest rows is amortised O(1)"""
+
+    def __init__(self, width, days=(), values=None):
+        self.days = np.asarray(days, dtype=np.int64)
+        self.values = np.asarray(values if values is not None else np.empty((0, width)), dtype=np.float64)
+        self.size = len(self.days)
+
+    def view(self, period_type, columns):
+        return MetricSeries(period_type, columns, self.days[:self.size], self.values[:self.size])
+
+    def upsert(self, days, values):
+        """Merge rows sorted by day: overwrite matching days, append newer ones, insert any others"""
+        current = self.days[:self.size]
+        position = np.searchsorted(current, days)
+        found = position < self.size
+        found[found] = current[position[found]] == days[found]
+        self.values[position[found]] = values[found]
+        days, values = days[~found], values[~found]
+        if not len(days):
+            return
+        if self.size and days[0] < current[-1]:
+            # A past day that was never stored: rare enough to re-sort
+            merged = np.concatenate([current, days])
+            order = np.argsort(merged, kind="stable")
+            self.days = merged[order]
+            self.values = np.concatenate([self.values[:self.size], values])[order]
+            self.size = len(self.days)
+            return
+        needed = self.size + len(days)
+        if needed > len(self.days):
+            capacity = max(needed, 2 * len(self.days), 64)
+            grown_days = np.empty(capacity, dtype=np.int64)
+            grown_values = np.empty((capacity, self.values.shape[1]), dtype=np.float64)
+            grown_days[:self.size] = current
+            grown_values[:self.size] = self.values[:self.size]
+            self.days, self.values = grown_days, grown_values
+        self.days[self.size:needed] = days
+        self.values[self.size:needed] = values
+        self.size = needed
+
+
+class MetricStore:
+    """Every ReliabilityMetric row held per period type as NumPy arrays in this worker process.
+
+    Loaded once, then kept current from the shared data-version counters: a
+    METRICS bump fetches only rows from each series' last day on and appends
+    them, a METRIC_HISTORY bump (a past period rewritten) reloads. Readers get
+    MetricSeries views and never query the database. A TTL reload is the safety
+    net for writes made outside the ORM, and the only refresh when the view
+    cache is disabled.
+    """
+
+    def __init__(self, app=None):
+        self.ttl = 300
+        self.columns = ()
+        self._buffers = {}
+        self._versions = None
+        self._loaded_at = 0.0
+        self._lock = threading.Lock()
+        self._stats = {"loads": 0, "appends": 0}
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.ttl = app.config.get("METRIC_STORE_TTL", 300)
+        app.extensions["metric_store"] = self
+
+    def series(self, period_type):
+        """MetricSeries of every stored row of `period_type`, oldest first"""
+        if period_type not in PERIOD_TYPES:
+            raise ValueError(f"period must be one of {', '.join(PERIOD_TYPES)}")
+        with self._lock:
+            self._sync()
+            return self._buffers[period_type].view(period_type, self.columns)
+
+    def stats(self):
+        with self._lock:
+            rows = {period: buffer.size for period, buffer in self._buffers.items()}
+            return dict(self._stats, rows=rows, loaded_at=self._loaded_at)
+
+    def invalidate(self):
+        with self._lock:
+            self._versions = None
+            self._buffers = {}
+
+    # -- refresh -----------------------------------------------------------
+
+    def _sync(self):
+        from src.extensions import cache
+
+        versions = cache.versions([METRICS, METRIC_HISTORY]) if cache.enabled else None
+        expired = time.time() - self._loaded_at >= self.ttl
+        if not self._buffers or expired or (versions and versions[1] != self._versions[1]):
+            self._load()
+        elif versions and versions[0] != self._versions[0]:
+            self._append_tail()
+        self._versions = versions
+
+    def _rows(self, where=None):
+        from sqlalchemy import select, func
+        from src.extensions import db
+        from src.models.substation import ReliabilityMetric
+        from src.utils.metric_writer import METRIC_COLUMNS
+
+        self.columns = tuple(METRIC_COLUMNS)
+        stmt = select(ReliabilityMetric.period_type, ReliabilityMetric.date,
+                      *[getattr(ReliabilityMetric, c) for c in METRIC_COLUMNS])
+        if where is not None:
+            stmt = stmt.where(where)
+        counts = select(ReliabilityMetric.period_type, func.count()).group_by(ReliabilityMetric.period_type)
+        # The primary, not a lagging replica: the version counters describe the primary
+        with db.engine.connect() as connection:
+            rows = connection.execute(stmt.order_by(ReliabilityMetric.period_type, ReliabilityMetric.date)).all()
+            totals = dict(connection.execute(counts).all())
+        grouped = {}
+        for period_type in PERIOD_TYPES:
+            selected = [row for row in rows if row[0] == period_type]
+            days = np.array([to_day(row[1]) for row in selected], dtype=np.int64)
+            values = np.array([row[2:] for row in selected], dtype=np.float64).reshape(len(selected), len(self.columns))
+            grouped[period_type] = (days, values)
+        return grouped, totals
+
+    def _load(self):
+        grouped, _ = self._rows()
+        self._buffers = {period: _Buffer(len(self.columns), days, values)
+                         for period, (days, values) in grouped.items()}
+        self._loaded_at = time.time()
+        self._stats["loads"] += 1
+
+    def _append_tail(self):
+        from sqlalchemy import and_, or_
+        from src.models.substation import ReliabilityMetric
+
+        # Each series' last stored day is re-read, as today's row is upserted in place
+        conditions = []
+        for period, buffer in self._buffers.items():
+            condition = ReliabilityMetric.period_type == period
+            if buffer.size:
+                condition = and_(condition, ReliabilityMetric.date >= from_day(buffer.days[buffer.size - 1]))
+            conditions.append(condition)
+        grouped, totals = self._rows(or_(*conditions))
+        for period, (days, values) in grouped.items():
+            self._buffers[period].upsert(days, values)
+        # Rows deleted (or back-dated inserts missed) since the load: start over
+        if any(self._buffers[period].size != totals.get(period, 0) for period in PERIOD_TYPES):
+            self._load()
+            return
+        self._stats["appends"] += 1
+
+
+# -- vectorised analytics over (n, metrics) arrays -----------------------------
+
+def on_calendar(series):
+    """(days, values, present) spread over every calendar day from first to last, NaN on missing days"""
+    if not len(series):
+        return series.days, series.values, np.zeros(0, dtype=bool)
+    days = np.arange(series.days[0], series.days[-1] + 1, dtype=np.int64)
+    values = np.full((len(days), series.values.shape[1]), np.nan)
+    offsets = series.days - series.days[0]
+    values[offsets] = series.values
+    present = np.zeros(len(days), dtype=bool)
+    present[offsets] = True
+    return days, values, present
+
+
+def rolling_mean(values, window):
+    """Mean of each row and the `window - 1` before it, skipping NaN; partial windows at the start"""
+    valid = ~np.isnan(values)
+    sums = np.cumsum(np.where(valid, values, 0.0), axis=0)
+    counts = np.cumsum(valid, axis=0)
+    sums[window:] = sums[window:] - sums[:-window]
+    counts[window:] = counts[window:] - counts[:-window]
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return np.where(counts > 0, sums / counts, np.nan)
+
+
+def _windows(values, window):
+    if not len(values):
+        return np.empty((0, values.shape[1], window))
+    padded = np.concatenate([np.full((window - 1, values.shape[1]), np.nan), values])
+    return np.lib.stride_tricks.sliding_window_view(padded, window, axis=0)
+
+
+def rolling_min(values, window):
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore", RuntimeWarning)  # all-NaN windows stay NaN
+        return np.nanmin(_windows(values, window), axis=-1)
+
+
+def rolling_max(values, window):
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore", RuntimeWarning)
+        return np.nanmax(_windows(values, window), axis=-1)
+
+
+def delta(values, lag):
+    """Change from `lag` rows earlier (week over week on a calendar-spread daily series)"""
+    shifted = np.full(values.shape, np.nan)
+    if lag < len(values):
+        shifted[lag:] = values[:-lag] if lag else values
+    return values - shifted
+
+
+def linear_trend(days, values):
+    """Least-squares slope (per day) and intercept of each column against day number, NaN-aware"""
+    valid = ~np.isnan(values)
+    x = np.where(valid, days[:, None].astype(np.float64), 0.0)
+    y = np.where(valid, values, 0.0)
+    n = valid.sum(axis=0)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        mean_x = x.sum(axis=0) / n
+        mean_y = y.sum(axis=0) / n
+        dx = np.where(valid, x - mean_x, 0.0)
+        slope = (dx * (y - mean_y)).sum(axis=0) / (dx * dx).sum(axis=0)
+    return slope, mean_y - slope * mean_x
+
+
+def percentiles(values, q=(5, 50, 95)):
+    """Per-column percentiles, shape (len(q), metrics)"""
+    if not len(values):
+        return np.full((len(q), values.shape[1]), np.nan)
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore", RuntimeWarning)
+        return np.nanpercentile(values, q, axis=0)
+
+
+def group_means(keys, values):
+    """(unique keys, NaN-aware mean of the rows per key) for keys sorted ascending"""
+    if not len(keys):
+        return keys, np.empty((0, values.shape[1]))
+    unique, starts = np.unique(keys, return_index=True)
+    valid = ~np.isnan(values)
+    sums = np.add.reduceat(np.where(valid, values, 0.0), starts, axis=0)
+    counts = np.add.reduceat(valid.astype(np.int64), starts, axis=0)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return unique, np.where(counts > 0, sums / counts, np.nan)
+
+
+def lttb(days, values, budget):
+    """Indices of at most `budget` rows chosen by Largest-Triangle-Three-Buckets.
+
+    The first and last rows are always kept. The rows between them are split
+    into `budget - 2` equal buckets and one row is kept per bucket: the one
+    forming the largest triangle with the row kept before it and the mean of
+    the next bucket. Areas are summed over the metric columns (NaN counts as
+    zero), so every column shares one set of dates.
+    """
+    n = len(days)
+    if budget >= n or n < 3:
+        return np.arange(n)
+    x = days.astype(np.float64)
+    edges = np.linspace(1, n - 1, budget - 1).astype(np.int64)
+    # Mean point of every bucket up front; the last "next bucket" is the final row
+    _, means = group_means(np.repeat(np.arange(budget - 2), np.diff(edges)), values[1:n - 1])
+    mean_x = np.add.reduceat(x[1:n - 1], edges[:-1] - 1) / np.diff(edges)
+    means = np.vstack([means, values[n - 1:]])
+    mean_x = np.append(mean_x, x[n - 1])
+
+    keep = np.empty(budget, dtype=np.int64)
+    keep[0], keep[-1] = 0, n - 1
+    previous = 0
+    for bucket in range(budget - 2):
+        lo, hi = edges[bucket], edges[bucket + 1]
+        ax, ay = x[previous], values[previous]
+        cx, cy = mean_x[bucket + 1], means[bucket + 1]
+        area = np.abs((ax - cx) * (values[lo:hi] - ay) - (ax - x[lo:hi, None]) * (cy - ay))
+        previous = lo + int(np.argmax(np.nansum(area, axis=1)))
+        keep[bucket + 1] = previous
+    return keep
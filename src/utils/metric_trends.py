@@ -0,0 +1,213 @@
+# src/utils/metric_trends.py
+from datetime import date, datetime, timedelta
+import numpy as np
+from src.extensions import metric_store
+from src.utils.metric_store import (PERIOD_TYPES, on_calendar, rolling_mean, rolling_min,
+                                    rolling_max, delta, linear_trend, percentiles, group_means, lttb)
+
+# Most aggregated first: a stored rollup row wins over averaging finer rows
+PERIOD_PREFERENCE = {
+    'monthly': ['monthly', 'daily'],
+    'yearly': ['yearly', 'monthly', 'daily']
+}
+
+AVERAGE_KEYS = {
+    'reliability_score': 'avg_reliability',
+    'testing_compliance': 'avg_testing_compliance',
+    'inspection_compliance': 'avg_inspection_compliance',
+    'coverage_ratio': 'avg_coverage_ratio',
+    'effective_reliability': 'avg_effective_reliability'
+}
+
+# Rolling window and delta lag, in rows of each series (days for daily, after spreading over the calendar)
+DEFAULT_WINDOW = {'daily': 7, 'monthly': 3, 'yearly': 2}
+DEFAULT_LAG = {'daily': 7, 'monthly': 1, 'yearly': 1}
+MAX_WINDOW = 366
+# Point budget bounds for downsampled chart series (about one point per horizontal pixel)
+MIN_POINTS = 3
+MAX_POINTS = 5000
+PERCENTILES = (5, 50, 95)
+
+
+def _as_float(value):
+    return None if np.isnan(value) else float(value)
+
+
+def _floats(values):
+    return [None if missing else v for v, missing in zip(values.tolist(), np.isnan(values).tolist())]
+
+
+def _averages_dict(columns, row):
+    return {AVERAGE_KEYS[column]: _as_float(value) for column, value in zip(columns, row)}
+
+
+def weekly_trend(weeks=12, today=None, store=None):
+    """Averages of daily rows per ISO week (Monday start) for the last `weeks` weeks"""
+    store = store or metric_store
+    today = today or date.today()
+    first_monday = today - timedelta(days=today.weekday()) - timedelta(weeks=weeks - 1)
+    series = store.series('daily').between(first_monday, today)
+    # Day 0 (1970-01-01) was a Thursday
+    mondays = series.days - (series.days + 3) % 7
+    starts, means = group_means(mondays, series.values)
+
+    trend = []
+    for monday, row in zip(starts, means):
+        week_start = date.fromordinal(int(monday) + date(1970, 1, 1).toordinal())
+        iso_year, iso_week, _ = week_start.isocalendar()
+        entry = {'week': f"{iso_year}-W{iso_week:02d}", 'date': week_start.isoformat()}
+        entry.update(_averages_dict(series.columns, row))
+        trend.append(entry)
+    return trend
+
+
+def _preferred_trend(granularity, label_key, unit, first_day, today, store):
+    """Group every period type that can answer `granularity`, keeping the best per bucket"""
+    best = {}
+    for period_type in PERIOD_PREFERENCE[granularity]:
+        series = store.series(period_type).between(first_day, today)
+        buckets = series.days.astype("datetime64[D]").astype(unit)
+        labels, means = group_means(buckets, series.values)
+        for label, row in zip(labels, means):
+            best.setdefault(str(label), (period_type, series.columns, row))
+
+    trend = []
+    for label in sorted(best):
+        source, columns, row = best[label]
+        entry = {label_key: label, 'source': source}
+        entry.update(_averages_dict(columns, row))
+        trend.append(entry)
+    return trend
+
+
+def monthly_trend(months=12, today=None, store=None):
+    """Stored monthly rows for the last `months` months, averaging daily rows where none exist"""
+    store = store or metric_store
+    today = today or date.today()
+    index = today.year * 12 + today.month - 1 - (months - 1)
+    first_day = date(index // 12, index % 12 + 1, 1)
+    return _preferred_trend('monthly', 'month', "datetime64[M]", first_day, today, store)
+
+
+def yearly_trend(years=5, today=None, store=None):
+    """Stored yearly rows for the last `years` years, falling back to monthly then daily rows"""
+    store = store or metric_store
+    today = today or date.today()
+    first_day = date(today.year - years + 1, 1, 1)
+    return _preferred_trend('yearly', 'year', "datetime64[Y]", first_day, today, store)
+
+
+class SeriesError(ValueError):
+    """Raised for malformed series parameters"""
+
+
+def _parse_date(value, field):
+    if not value:
+        return None
+    try:
+        return datetime.strptime(value, "%Y-%m-%d").date()
+    except ValueError:
+        raise SeriesError(f"{field} must be YYYY-MM-DD")
+
+
+def _parse_int(value, field, default, low, high):
+    if value in (None, ""):
+        return default
+    try:
+        number = int(value)
+    except ValueError:
+        raise SeriesError(f"{field} must be a whole number")
+    if not low <= number <= high:
+        raise SeriesError(f"{field} must be between {low} and {high}")
+    return number
+
+
+class MetricSeriesRequest:
+    """One period's stored metrics over a date range, with rolling analytics, served from the metric store"""
+
+    def __init__(self, period='daily', start=None, end=None, window=None, lag=None, metrics=None, points=None):
+        if period not in PERIOD_TYPES:
+            raise SeriesError(f"period must be one of {', '.join(PERIOD_TYPES)}")
+        if start and end and start > end:
+            raise SeriesError("start must not be after end")
+        metrics = list(metrics or AVERAGE_KEYS)
+        unknown = [m for m in metrics if m not in AVERAGE_KEYS]
+        if unknown:
+            raise SeriesError(f"metrics must be among {', '.join(AVERAGE_KEYS)}")
+        self.period = period
+        self.start = start
+        self.end = end
+        self.window = window or DEFAULT_WINDOW[period]
+        self.lag = lag or DEFAULT_LAG[period]
+        self.metrics = metrics
+        self.points = points
+
+    @classmethod
+    def from_args(cls, args):
+        period = args.get('period', 'daily')
+        metrics = [m for m in args.get('metrics', '').split(',') if m]
+        return cls(
+            period=period,
+            start=_parse_date(args.get('start'), 'start'),
+            end=_parse_date(args.get('end'), 'end'),
+            window=_parse_int(args.get('window'), 'window', None, 1, MAX_WINDOW),
+            lag=_parse_int(args.get('lag'), 'lag', None, 1, MAX_WINDOW),
+            metrics=metrics,
+            points=_parse_int(args.get('points'), 'points', None, MIN_POINTS, MAX_POINTS)
+        )
+
+    def fetch(self, store=None):
+        """Chart payload: dates, then per metric its values, rolling mean/min/max, delta, trend and percentiles.
+
+        With a `points` budget the rows are downsampled by LTTB after the
+        analytics run, so rolling values, trend and percentiles still reflect
+        every stored row; the first and last rows of the range are always kept.
+        """
+        store = store or metric_store
+        series = store.series(self.period).between(self.start, self.end).select(self.metrics)
+        values, present = series.values, np.ones(len(series), dtype=bool)
+        if self.period == 'daily':
+            # Windows and lags count calendar days, whatever days are missing
+            _, values, present = on_calendar(series)
+
+        derived = {
+            'rolling_mean': rolling_mean(values, self.window)[present],
+            'rolling_min': rolling_min(values, self.window)[present],
+            'rolling_max': rolling_max(values, self.window)[present],
+            'delta': delta(values, self.lag)[present]
+        }
+        slope, intercept = linear_trend(series.days.astype(np.float64), series.values)
+        spread = percentiles(series.values, PERCENTILES)
+
+        total = len(series)
+        if self.points:
+            keep = lttb(series.days, series.values, self.points)
+            derived = {key: array[keep] for key, array in derived.items()}
+            sampled = series.take(keep)
+        else:
+            sampled = series
+
+        metrics = {}
+        for i, name in enumerate(self.metrics):
+            entry = {'values': _floats(sampled.values[:, i])}
+            entry.update({key: _floats(array[:, i]) for key, array in derived.items()})
+            entry['trend'] = {
+                'slope_per_day': _as_float(slope[i]),
+                'start': _as_float(intercept[i] + slope[i] * series.days[0]) if len(series) else None,
+                'end': _as_float(intercept[i] + slope[i] * series.days[-1]) if len(series) else None
+            }
+            entry['percentiles'] = {f"p{q}": _as_float(spread[j, i]) for j, q in enumerate(PERCENTILES)}
+            metrics[name] = entry
+
+        dates = sampled.dates()
+        return {
+            'period': self.period,
+            'start': dates[0] if dates else None,
+            'end': dates[-1] if dates else None,
+            'window': self.window,
+            'lag': self.lag,
+            'rows': total,
+            'points': len(dates),
+            'dates': dates,
+            'metrics': metrics
+        }
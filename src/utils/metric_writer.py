@@ -0,0 +1,94 @@
+# src/utils/metric_writer.py
+from datetime import date
+from sqlalchemy import select
+from src.extensions import db
+from src.models.substation import ReliabilityMetric
+from src.utils.cache import METRIC_HISTORY, mark_changed
+
+METRIC_COLUMNS = [
+    'reliability_score',
+    'testing_compliance',
+    'inspection_compliance',
+    'coverage_ratio',
+    'effective_reliability'
+]
+
+# Rows per INSERT statement; 7 bound values each stays far below SQLite's parameter limit
+BATCH_SIZE = 500
+
+
+def metric_row(day, period_type, values):
+    """Build a writer row from a metrics dict (extra keys such as 'date' are ignored)"""
+    row = {'date': day, 'period_type': period_type}
+    for column in METRIC_COLUMNS:
+        row[column] = float(values[column]) if values[column] is not None else None
+    return row
+
+
+def current_period_start(period_type, today=None):
+    """Date of the row for the period containing `today`; rows before it belong to closed periods"""
+    today = today or date.today()
+    if period_type == 'monthly':
+        return date(today.year, today.month, 1)
+    if period_type == 'yearly':
+        return date(today.year, 1, 1)
+    return today
+
+
+def _upsert_statement(dialect, rows):
+    if dialect == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+    elif dialect == "sqlite":
+        from sqlalchemy.dialects.sqlite import insert
+    elif dialect in ("mysql", "mariadb"):
+        from sqlalchemy.dialects.mysql import insert
+        stmt = insert(ReliabilityMetric).values(rows)
+        return stmt.on_duplicate_key_update({c: stmt.inserted[c] for c in METRIC_COLUMNS})
+    else:
+        return None
+    stmt = insert(ReliabilityMetric).values(rows)
+    return stmt.on_conflict_do_update(
+        index_elements=['date', 'period_type'],
+        set_={c: stmt.excluded[c] for c in METRIC_COLUMNS}
+    )
+
+
+def _fallback_upsert(session, rows):
+    """Row-at-a-time upsert for dialects without INSERT ... ON CONFLICT"""
+    for row in rows:
+        existing = session.execute(select(ReliabilityMetric).filter_by(
+            date=row['date'], period_type=row['period_type']
+        )).scalar_one_or_none()
+        if existing:
+            for column in METRIC_COLUMNS:
+                setattr(existing, column, row[column])
+        else:
+            session.add(ReliabilityMetric(**row))
+    session.flush()
+
+
+def upsert_metrics(rows, session=None, commit=True):
+    """Insert or update many ReliabilityMetric rows keyed on (date, period_type).
+
+    Emits one INSERT ... ON CONFLICT (date, period_type) DO UPDATE per batch on
+    PostgreSQL and SQLite (ON DUPLICATE KEY UPDATE on MySQL), all inside a single
+    transaction. Returns the number of rows written.
+    """
+    session = session or db.session
+    rows = list(rows)
+    if not rows:
+        return 0
+    # In-process metric stores append current-period rows, but reload on a rewrite of the past
+    if any(row['date'] < current_period_start(row['period_type']) for row in rows):
+        mark_changed(session, METRIC_HISTORY)
+    dialect = session.get_bind().dialect.name
+    for start in range(0, len(rows), BATCH_SIZE):
+        batch = rows[start:start + BATCH_SIZE]
+        stmt = _upsert_statement(dialect, batch)
+        if stmt is None:
+            _fallback_upsert(session, batch)
+        else:
+            session.execute(stmt)
+    if commit:
+        session.commit()
+    return len(rows)
@@ -0,0 +1,384 @@
+# src/utils/prometheus.py
+import atexit
+import glob
+import json
+import math
+import os
+import threading
+import time
+import uuid
+from bisect import bisect_left
+from flask import request
+from sqlalchemy import event
+
+REQUEST_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+CHECKOUT_BUCKETS = (0.0001, 0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0)
+
+# name -> (type, help, histogram buckets or gauge aggregation across live workers)
+METRICS = {
+    "http_requests_total": ("counter", "Requests served, by endpoint, method and status.", None),
+    "http_request_duration_seconds": ("histogram", "Request latency by endpoint and method.", REQUEST_BUCKETS),
+    "http_requests_in_flight": ("gauge", "Requests being served right now.", "sum"),
+    "db_pool_checkout_seconds": ("histogram", "Time spent waiting for a pooled database connection.",
+                                 CHECKOUT_BUCKETS),
+    "db_pool_connections_checked_out": ("gauge", "Database connections currently checked out.", "sum"),
+    "db_pool_capacity": ("gauge", "Connections the pools can hand out (pool size plus overflow).", "sum"),
+    "db_pool_saturation": ("gauge", "Highest share of a worker's pool capacity in use.", "max"),
+    "view_cache_lookups_total": ("counter", "View cache lookups by result.", None),
+    "view_cache_invalidations_total": ("counter", "View cache version bumps.", None),
+    "view_cache_hit_ratio": ("gauge", "Share of view cache lookups served from either tier.", "sum"),
+}
+
+
+def _labels(labels):
+    return tuple(sorted(labels.items()))
+
+
+def _render_labels(labels, extra=()):
+    pairs = list(labels) + list(extra)
+    if not pairs:
+        return ""
+    escaped = (str(v).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"') for _, v in pairs)
+    return "{" + ",".join(f'{k}="{v}"' for (k, _), v in zip(pairs, escaped)) + "}"
+
+
+def _number(value):
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+def _alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+class PrometheusMetrics:
+    """Dependency-free Prometheus metrics shared by every gunicorn worker on the host.
+
+    Each worker keeps its counters, histograms and gauges in memory and a
+    background thread writes them to its own JSON file in PROMETHEUS_MULTIPROC_DIR
+    about once a second. A scrape, served by whichever worker receives it, adds
+    up the files: counters and histograms of every worker that ever wrote one
+    (so totals survive worker restarts), gauges of live workers only. Clear the
+    directory when the whole service is redeployed.
+    """
+
+    def __init__(self, app=None):
+        self.enabled = False
+        self.directory = None
+        self.flush_interval = 1.0
+        self._lock = threading.Lock()
+        self._counters = {}
+        self._histograms = {}
+        self._gauges = {}
+        self._pid = None
+        self._path = None
+        self._dirty = False
+        self._collectors = []
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.enabled = app.config.get("PROMETHEUS_ENABLED", True)
+        self.directory = app.config.get("PROMETHEUS_MULTIPROC_DIR") or os.path.join(app.instance_path, "prometheus")
+        self.flush_interval = app.config.get("PROMETHEUS_FLUSH_SECONDS", 1.0)
+        app.extensions["prometheus"] = self
+        if not self.enabled:
+            return
+        os.makedirs(self.directory, exist_ok=True)
+        app.before_request(self._start_request)
+        app.after_request(self._record_status)
+        # Teardown runs after streamed bodies are sent, so exports are timed in full
+        app.teardown_request(self._end_request)
+        from src.extensions import db, cache
+        with app.app_context():
+            # The default bind is keyed None; the replica (if any) by its bind key
+            for key, engine in db.engines.items():
+                _instrument_engine(self, engine, key or "primary")
+
+        @self.collector
+        def _cache_usage(metrics):
+            stats = cache.stats()
+            for result in ("local_hits", "shared_hits", "misses"):
+                metrics.set_counter("view_cache_lookups_total", {"result": result}, stats[result])
+            metrics.set_counter("view_cache_invalidations_total", {}, stats["invalidations"])
+
+        atexit.register(self.flush)
+
+    # -- recording ---------------------------------------------------------
+
+    def inc(self, name, labels=None, amount=1.0):
+        key = (name, _labels(labels or {}))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0.0) + amount
+            self._dirty = True
+
+    def set_counter(self, name, labels, value):
+        """Mirror a counter this process already keeps elsewhere"""
+        key = (name, _labels(labels))
+        with self._lock:
+            if self._counters.get(key) != float(value):
+                self._counters[key] = float(value)
+                self._dirty = True
+
+    def observe(self, name, value, labels=None):
+        buckets = METRICS[name][2]
+        key = (name, _labels(labels or {}))
+        with self._lock:
+            state = self._histograms.get(key)
+            if state is None:
+                state = self._histograms[key] = [[0] * (len(buckets) + 1), 0.0, 0]
+            state[0][bisect_left(buckets, value)] += 1
+            state[1] += value
+            state[2] += 1
+            self._dirty = True
+
+    def set_gauge(self, name, value, labels=None):
+        key = (name, _labels(labels or {}))
+        with self._lock:
+            if self._gauges.get(key) != float(value):
+                self._gauges[key] = float(value)
+                self._dirty = True
+
+    def add_gauge(self, name, amount, labels=None):
+        key = (name, _labels(labels or {}))
+        with self._lock:
+            self._gauges[key] = self._gauges.get(key, 0.0) + amount
+            self._dirty = True
+
+    def collector(self, fn):
+        """Register `fn(metrics)` to refresh process-local values before each flush"""
+        self._collectors.append(fn)
+        return fn
+
+    # -- request hooks -----------------------------------------------------
+
+    def _start_request(self):
+        self._ensure_worker()
+        request.environ["prometheus.began"] = time.perf_counter()
+        self.add_gauge("http_requests_in_flight", 1)
+
+    def _record_status(self, response):
+        request.environ["prometheus.status"] = response.status_code
+        return response
+
+    def _end_request(self, exc=None):
+        began = request.environ.pop("prometheus.began", None)
+        if began is None:
+            return
+        self.add_gauge("http_requests_in_flight", -1)
+        # Unmatched URLs share one label so scanners cannot blow up the series count
+        endpoint = request.url_rule.endpoint if request.url_rule else "unmatched"
+        labels = {"endpoint": endpoint, "method": request.method}
+        self.observe("http_request_duration_seconds", time.perf_counter() - began, labels)
+        status = 500 if exc is not None else request.environ.get("prometheus.status", 0)
+        self.inc("http_requests_total", dict(labels, status=str(status)))
+
+    # -- per-process files -------------------------------------------------
+
+    def _ensure_worker(self):
+        # Workers forked from a preloading master must not share the master's file or thread
+        pid = os.getpid()
+        if self._pid == pid:
+            return
+        with self._lock:
+            if self._pid == pid:
+                return
+            self._pid = pid
+            self._path = os.path.join(self.directory, f"{pid}_{uuid.uuid4().hex[:8]}.json")
+            self._counters.clear()
+            self._histograms.clear()
+            self._gauges.clear()
+            thread = threading.Thread(target=self._flush_loop, name="prometheus-flush", daemon=True)
+            thread.start()
+
+    def _flush_loop(self):
+        pid = self._pid
+        while self._pid == pid:
+            time.sleep(self.flush_interval)
+            self.flush()
+
+    def _refresh(self):
+        for fn in self._collectors:
+            try:
+                fn(self)
+            except Exception:
+                pass  # A failing collector must not stop the others or the flush
+
+    def _state(self):
+        with self._lock:
+            return {
+                "pid": os.getpid(),
+                "counters": [[name, list(labels), value] for (name, labels), value in self._counters.items()],
+                "histograms": [[name, list(labels), state[0], state[1], state[2]]
+                               for (name, labels), state in self._histograms.items()],
+                "gauges": [[name, list(labels), value] for (name, labels), value in self._gauges.items()]
+            }
+
+    def flush(self):
+        """Write this worker's values to its file (atomically, so readers never see half a file)"""
+        if self._path is None or self._pid != os.getpid():
+            return
+        self._refresh()
+        if not self._dirty:
+            return
+        self._dirty = False
+        state = self._state()
+        temporary = f"{self._path}.tmp"
+        with open(temporary, "w") as f:
+            json.dump(state, f)
+        os.replace(temporary, self._path)
+
+    # -- exposition --------------------------------------------------------
+
+    def _merged(self):
+        self._ensure_worker()
+        self._refresh()
+        states = [self._state()]
+        for path in glob.glob(os.path.join(self.directory, "*.json")):
+            if path == self._path:
+                continue  # This worker's in-memory values are fresher than its file
+            try:
+                with open(path) as f:
+                    states.append(json.load(f))
+            except (OSError, ValueError):
+                continue
+
+        counters, histograms, gauges = {}, {}, {}
+        for state in states:
+            live = state["pid"] == os.getpid() or _alive(state["pid"])
+            for name, labels, value in state["counters"]:
+                key = (name, tuple(map(tuple, labels)))
+                counters[key] = counters.get(key, 0.0) + value
+            for name, labels, buckets, total, count in state["histograms"]:
+                key = (name, tuple(map(tuple, labels)))
+                merged = histograms.setdefault(key, [[0] * len(buckets), 0.0, 0])
+                merged[0] = [a + b for a, b in zip(merged[0], buckets)]
+                merged[1] += total
+                merged[2] += count
+            if not live:
+                continue
+            for name, labels, value in state["gauges"]:
+                key = (name, tuple(map(tuple, labels)))
+                if METRICS.get(name, (None, None, "sum"))[2] == "max":
+                    gauges[key] = max(gauges.get(key, value), value)
+                else:
+                    gauges[key] = gauges.get(key, 0.0) + value
+
+        lookups = {dict(labels)["result"]: value for (name, labels), value in counters.items()
+                   if name == "view_cache_lookups_total"}
+        if sum(lookups.values()):
+            hits = lookups.get("local_hits", 0) + lookups.get("shared_hits", 0)
+            gauges[("view_cache_hit_ratio", ())] = hits / sum(lookups.values())
+        return counters, histograms, gauges
+
+    def render(self, extra_gauges=()):
+        """Text exposition format 0.0.4 of every worker's metrics plus `extra_gauges`.
+
+        `extra_gauges` is a list of (name, help, [(labels dict, value)]) computed
+        by the scraping worker, e.g. from the database.
+        """
+        counters, histograms, gauges = self._merged()
+        lines = []
+
+        def header(name, kind, help_text):
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {kind}")
+
+        for name, (kind, help_text, option) in METRICS.items():
+            if kind == "counter":
+                series = sorted((labels, value) for (n, labels), value in counters.items() if n == name)
+            elif kind == "gauge":
+                series = sorted((labels, value) for (n, labels), value in gauges.items() if n == name)
+            else:
+                series = sorted((labels, state) for (n, labels), state in histograms.items() if n == name)
+            if not series:
+                continue
+            header(name, kind, help_text)
+            for labels, value in series:
+                if kind != "histogram":
+                    lines.append(f"{name}{_render_labels(labels)} {_number(value)}")
+                    continue
+                buckets, total, count = value
+                cumulative = 0
+                for bound, observed in zip(list(option) + [math.inf], buckets):
+                    cumulative += observed
+                    lines.append(f"{name}_bucket{_render_labels(labels, [('le', _number(bound))])} {cumulative}")
+                lines.append(f"{name}_sum{_render_labels(labels)} {_number(total)}")
+                lines.append(f"{name}_count{_render_labels(labels)} {count}")
+
+        for name, help_text, series in extra_gauges:
+            header(name, "gauge", help_text)
+            for labels, value in series:
+                lines.append(f"{name}{_render_labels(_labels(labels))} {_number(value)}")
+        return "\n".join(lines) + "\n"
+
+
+_instrumented = set()
+
+
+def _instrument_engine(metrics, engine, bind):
+    """Time pool checkouts and report pool usage for `engine`, labelled with its `bind`"""
+    if id(engine) in _instrumented:
+        return
+    _instrumented.add(id(engine))
+    labels = {"bind": bind}
+
+    def wrap(pool):
+        connect = pool.connect
+
+        def timed_connect():
+            began = time.perf_counter()
+            try:
+                return connect()
+            finally:
+                metrics.observe("db_pool_checkout_seconds", time.perf_counter() - began, labels)
+
+        pool.connect = timed_connect
+
+    wrap(engine.pool)
+
+    @event.listens_for(engine, "engine_disposed")
+    def _rewrap(engine):
+        # dispose() swaps in a fresh pool
+        wrap(engine.pool)
+
+    @metrics.collector
+    def _pool_usage(metrics):
+        pool = engine.pool
+        if not hasattr(pool, "checkedout"):
+            return  # NullPool and SingletonThreadPool keep no counts
+        checked_out = pool.checkedout()
+        capacity = pool.size() + max(getattr(pool, "_max_overflow", 0), 0)
+        metrics.set_gauge("db_pool_connections_checked_out", checked_out, labels)
+        metrics.set_gauge("db_pool_capacity", capacity, labels)
+        metrics.set_gauge("db_pool_saturation", checked_out / capacity if capacity else 0.0, labels)
+
+
+def reliability_gauges(snapshot):
+    """Extra gauges for `render` from a MetricsSnapshot"""
+    return [
+        ("reliability_percent", "Current reliability and compliance percentages.", [
+            ({"kind": "effective"}, snapshot.effective_reliability),
+            ({"kind": "coverage"}, snapshot.coverage_ratio),
+            ({"kind": "inspection_compliance"}, snapshot.inspection_compliance),
+            ({"kind": "testing_compliance"}, snapshot.testing_compliance)
+        ]),
+        ("substations", "Substations by coverage status.", [
+            ({"coverage": "fully_covered"}, snapshot.fully_covered),
+            ({"coverage": "partially_covered"}, snapshot.partially_covered),
+            ({"coverage": "not_covered"}, snapshot.not_covered)
+        ]),
+        ("substations_inspected", "Substations with at least one passed inspection.", [
+            ({}, snapshot.inspected_substations)
+        ]),
+        ("substations_tested", "Substations with at least one passed test.", [
+            ({}, snapshot.tested_substations)
+        ])
+    ]
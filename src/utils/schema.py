@@ -0,0 +1,167 @@
+# src/utils/schema.py
+from sqlalchemy import inspect, text
+from src.extensions import db
+from src.models.substation import ReliabilityMetric, SubstationStatus, Substation, InspectionTest
+
+METRIC_TABLE = ReliabilityMetric.__tablename__
+COMPOSITE_CONSTRAINT = '_date_period_type_uc'
+
+
+def _unique_column_sets(inspector):
+    """(kind, name, columns) for every unique constraint and standalone unique index on the metric table"""
+    uniques = [('constraint', uc['name'], uc['column_names'])
+               for uc in inspector.get_unique_constraints(METRIC_TABLE)]
+    # PostgreSQL also reports the index backing each constraint; skip those
+    uniques += [('index', ix['name'], ix['column_names'])
+                for ix in inspector.get_indexes(METRIC_TABLE)
+                if ix.get('unique') and 'duplicates_constraint' not in ix]
+    return uniques
+
+
+def _rebuild_sqlite_table(connection, inspector):
+    """SQLite cannot drop a constraint, so copy the rows into a freshly created table"""
+    old_columns = [c['name'] for c in inspector.get_columns(METRIC_TABLE)]
+    new_columns = [c.name for c in ReliabilityMetric.__table__.columns if c.name in old_columns]
+    selected = list(new_columns)
+    # Tables from before period_type existed only ever held daily rows
+    if 'period_type' not in old_columns:
+        new_columns.append('period_type')
+        selected.append("'daily'")
+    old_indexes = [ix['name'] for ix in inspector.get_indexes(METRIC_TABLE) if ix['name']]
+    connection.execute(text(f"ALTER TABLE {METRIC_TABLE} RENAME TO {METRIC_TABLE}_old"))
+    # Index names are global in SQLite; free them for the new table
+    for name in old_indexes:
+        connection.execute(text(f'DROP INDEX IF EXISTS "{name}"'))
+    ReliabilityMetric.__table__.create(connection)
+    connection.execute(text(
+        f"INSERT INTO {METRIC_TABLE} ({', '.join(new_columns)}) "
+        f"SELECT {', '.join(selected)} FROM {METRIC_TABLE}_old"
+    ))
+    connection.execute(text(f"DROP TABLE {METRIC_TABLE}_old"))
+
+
+def upgrade_metric_constraints(engine=None):
+    """Replace a legacy UNIQUE(date) on reliability_metric with UNIQUE(date, period_type).
+
+    Databases created before period_type existed keep the single-column constraint,
+    which rejects monthly and yearly rows and breaks the ON CONFLICT upsert.
+    Returns True when the table was changed.
+    """
+    engine = engine or db.engine
+    inspector = inspect(engine)
+    if not inspector.has_table(METRIC_TABLE):
+        return False
+
+    uniques = _unique_column_sets(inspector)
+    legacy = [(kind, name) for kind, name, cols in uniques if cols == ['date']]
+    has_period_type = any(c['name'] == 'period_type' for c in inspector.get_columns(METRIC_TABLE))
+    has_composite = any(sorted(cols) == ['date', 'period_type'] for kind, name, cols in uniques)
+    if not legacy and has_composite and has_period_type:
+        return False
+
+    with engine.begin() as connection:
+        if engine.dialect.name == 'sqlite':
+            _rebuild_sqlite_table(connection, inspector)
+            return True
+        for kind, name in legacy:
+            if kind == 'index':
+                connection.execute(text(f'DROP INDEX "{name}"'))
+            else:
+                connection.execute(text(f'ALTER TABLE {METRIC_TABLE} DROP CONSTRAINT "{name}"'))
+        if not has_composite:
+            connection.execute(text(
+                f"ALTER TABLE {METRIC_TABLE} ADD CONSTRAINT {COMPOSITE_CONSTRAINT} UNIQUE (date, period_type)"
+            ))
+    return True
+
+
+def upgrade_substation_status(engine=None):
+    """Recreate the derived SubstationStatus table if it predates any of the model's columns.
+
+    Its rows are rebuilt from InspectionTest afterwards, so nothing is lost.
+    Returns True when the table was recreated (and is now empty).
+    """
+    engine = engine or db.engine
+    inspector = inspect(engine)
+    table = SubstationStatus.__table__
+    if not inspector.has_table(table.name):
+        return False
+    existing = {c['name'] for c in inspector.get_columns(table.name)}
+    if all(c.name in existing for c in table.columns):
+        return False
+    with engine.begin() as connection:
+        table.drop(connection)
+        table.create(connection)
+    return True
+
+
+def _index_names(engine, inspector, table_name):
+    if engine.dialect.name == 'sqlite':
+        # The SQLite inspector skips expression indexes such as lower(name)
+        with engine.connect() as connection:
+            return set(connection.execute(text(
+                "SELECT name FROM sqlite_master WHERE type = 'index' AND tbl_name = :table"
+            ), {"table": table_name}).scalars())
+    return {ix['name'] for ix in inspector.get_indexes(table_name)}
+
+
+def _create_missing_indexes(engine, table, existing):
+    """Create the model's indexes on `table` that are not in `existing`; returns their names"""
+    created = []
+    for index in table.indexes:
+        if index.name not in existing:
+            with engine.begin() as connection:
+                index.create(connection)
+            created.append(index.name)
+    return created
+
+
+def upgrade_inspection_indexes(engine=None):
+    """Add the (substation_id, inspection_date, id) index to inspection tables created before it.
+
+    Without it every latest-status refresh, which runs on each inspection write,
+    scans the whole table. Returns the names of the indexes created.
+    """
+    engine = engine or db.engine
+    inspector = inspect(engine)
+    table = InspectionTest.__table__
+    if not inspector.has_table(table.name):
+        return []
+    return _create_missing_indexes(engine, table, _index_names(engine, inspector, table.name))
+
+
+def upgrade_substation_search_indexes(engine=None):
+    """Add the lower(name) index to substation tables created before it, plus PostgreSQL's own indexes.
+
+    On PostgreSQL a text_pattern_ops index serves the picker's LIKE prefix
+    matches (the plain index sorts by the database collation, which LIKE cannot
+    range-scan), and a trigram index its substring matches; the latter needs the
+    pg_trgm extension and is skipped when the database user may not create it.
+    Returns the names of the indexes created.
+    """
+    engine = engine or db.engine
+    inspector = inspect(engine)
+    table = Substation.__table__
+    if not inspector.has_table(table.name):
+        return []
+    existing = _index_names(engine, inspector, table.name)
+    created = _create_missing_indexes(engine, table, existing)
+
+    if engine.dialect.name == 'postgresql' and 'ix_substation_name_pattern' not in existing:
+        with engine.begin() as connection:
+            connection.execute(text(
+                "CREATE INDEX ix_substation_name_pattern ON substation (lower(name) text_pattern_ops)"
+            ))
+        created.append('ix_substation_name_pattern')
+
+    if engine.dialect.name == 'postgresql' and 'ix_substation_name_trgm' not in existing:
+        try:
+            with engine.begin() as connection:
+                connection.execute(text("CREATE EXTENSION IF NOT EXISTS pg_trgm"))
+                connection.execute(text(
+                    "CREATE INDEX ix_substation_name_trgm ON substation USING gin (lower(name) gin_trgm_ops)"
+                ))
+            created.append('ix_substation_name_trgm')
+        except Exception as e:
+            print(f"Trigram index on substation names skipped: {e}")
+    return created
@@ -0,0 +1,36 @@
+# src/utils/sql_dates.py
+from sqlalchemy import func, cast, Date
+from src.extensions import db
+
+
+def dialect_name(session=None):
+    session = session or db.session
+    return session.get_bind().dialect.name
+
+
+def month_bucket(column, dialect):
+    """'YYYY-MM' label for a date/datetime column on the given SQL dialect"""
+    if dialect == "postgresql":
+        return func.to_char(column, "YYYY-MM")
+    if dialect in ("mysql", "mariadb"):
+        return func.date_format(column, "%Y-%m")
+    return func.strftime("%Y-%m", column)
+
+
+def year_bucket(column, dialect):
+    """'YYYY' label for a date/datetime column on the given SQL dialect"""
+    if dialect == "postgresql":
+        return func.to_char(column, "YYYY")
+    if dialect in ("mysql", "mariadb"):
+        return func.date_format(column, "%Y")
+    return func.strftime("%Y", column)
+
+
+def week_start_bucket(column, dialect):
+    """Monday of the ISO week containing a date column, on the given SQL dialect"""
+    if dialect == "postgresql":
+        return cast(func.date_trunc("week", column), Date)
+    if dialect in ("mysql", "mariadb"):
+        return func.subdate(column, func.weekday(column))
+    # SQLite: forward to Sunday (or stay on it), then back six days to Monday
+    return func.date(column, "weekday 0", "-6 days")
@@ -0,0 +1,256 @@
+# src/utils/sql_profiler.py
+import logging
+import random
+import re
+import threading
+import time
+from collections import deque
+from contextvars import ContextVar
+from functools import lru_cache
+from flask import request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+logger = logging.getLogger(__name__)
+
+# Expanded IN lists render one placeholder per value; collapse them so `IN (?, ?)` and `IN (?, ?, ?)` share a shape
+_PLACEHOLDER_LIST = re.compile(r"\(\s*(?:\?|%s|%\(\w+\)s|:\w+)(?:\s*,\s*(?:\?|%s|%\(\w+\)s|:\w+))+\s*\)")
+_WHITESPACE = re.compile(r"\s+")
+_PARAMETER_CHARS = 300
+
+
+@lru_cache(maxsize=2048)
+def statement_shape(statement):
+    """Statement text with whitespace normalised and placeholder lists collapsed"""
+    shape = _WHITESPACE.sub(" ", statement).strip()
+    return _PLACEHOLDER_LIST.sub("(?, ...)", shape)
+
+
+class RequestProfile:
+    """Statements executed while serving one request"""
+    __slots__ = ("method", "path", "endpoint", "started_at", "status", "duration", "queries", "db_time",
+                 "shapes", "slowest", "n_plus_one", "_began", "_keep")
+
+    def __init__(self, method, path, endpoint, keep=5):
+        self.method = method
+        self.path = path
+        self.endpoint = endpoint
+        self.started_at = time.time()
+        self.status = None
+        self.duration = 0.0
+        self.queries = 0
+        self.db_time = 0.0
+        self.shapes = {}  # shape -> [count, seconds]
+        self.slowest = []  # (seconds, statement, parameters), slowest first
+        self.n_plus_one = []
+        self._began = time.perf_counter()
+        self._keep = keep
+
+    def record(self, statement, parameters, elapsed):
+        self.queries += 1
+        self.db_time += elapsed
+        shape = statement_shape(statement)
+        totals = self.shapes.get(shape)
+        if totals is None:
+            self.shapes[shape] = [1, elapsed]
+        else:
+            totals[0] += 1
+            totals[1] += elapsed
+        if len(self.slowest) < self._keep or elapsed > self.slowest[-1][0]:
+            # Parameters are only rendered for the few statements kept
+            self.slowest.append((elapsed, shape, repr(parameters)[:_PARAMETER_CHARS]))
+            self.slowest.sort(key=lambda item: item[0], reverse=True)
+            del self.slowest[self._keep:]
+
+    def finish(self, n_plus_one_threshold):
+        self.duration = time.perf_counter() - self._began
+        self.n_plus_one = sorted(
+            ((shape, count, seconds) for shape, (count, seconds) in self.shapes.items()
+             if count >= n_plus_one_threshold),
+            key=lambda item: item[1], reverse=True
+        )
+
+    def server_timing(self):
+        elapsed = time.perf_counter() - self._began
+        return (f'db;dur={self.db_time * 1000:.1f};desc="{self.queries} queries", '
+                f'app;dur={(elapsed - self.db_time) * 1000:.1f}')
+
+    def to_dict(self):
+        return {
+            "method": self.method,
+            "path": self.path,
+            "endpoint": self.endpoint,
+            "started_at": self.started_at,
+            "status": self.status,
+            "duration_ms": round(self.duration * 1000, 2),
+            "queries": self.queries,
+            "db_ms": round(self.db_time * 1000, 2),
+            "distinct_statements": len(self.shapes),
+            "slowest": [{"ms": round(seconds * 1000, 2), "statement": shape, "parameters": parameters}
+                        for seconds, shape, parameters in self.slowest],
+            "n_plus_one": [{"statement": shape, "count": count, "ms": round(seconds * 1000, 2)}
+                           for shape, count, seconds in self.n_plus_one]
+        }
+
+
+class SQLProfiler:
+    """Sampled per-request SQL instrumentation.
+
+    A sampled request records every statement it executes: query count, total
+    database time, its slowest statements with parameters, and statement shapes
+    repeated often enough to suggest an N+1 pattern. Sampled responses carry a
+    Server-Timing header, and the last profiles plus per-endpoint totals are
+    kept in memory for /admin/perf. Unsampled requests, background jobs and CLI
+    commands only pay for a context variable lookup per statement.
+
+    Database time covers statement execution only; fetching rows and loading
+    them into objects is counted as application time.
+    """
+
+    def __init__(self, app=None):
+        self.enabled = False
+        self.sample_rate = 0.05
+        self.slow_seconds = 0.1
+        self.n_plus_one_threshold = 10
+        self._current = ContextVar("sql_profile", default=None)
+        self._lock = threading.Lock()
+        self._recent = deque(maxlen=100)
+        self._endpoints = {}
+        self._stats = {"requests": 0, "sampled": 0, "slow_queries": 0, "n_plus_one": 0}
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.enabled = app.config.get("PROFILE_ENABLED", True)
+        self.sample_rate = app.config.get("PROFILE_SAMPLE_RATE", 0.05)
+        self.slow_seconds = app.config.get("PROFILE_SLOW_MS", 100) / 1000
+        self.n_plus_one_threshold = app.config.get("PROFILE_N_PLUS_ONE", 10)
+        self._recent = deque(maxlen=app.config.get("PROFILE_HISTORY", 100))
+        app.extensions["sql_profiler"] = self
+        if self.enabled:
+            _register_engine_events(self)
+            app.before_request(self._start)
+            app.after_request(self._add_header)
+            # Teardown runs after streamed bodies are drained, so export queries are counted too
+            app.teardown_request(self._finish)
+
+    # -- request hooks -----------------------------------------------------
+
+    def _sampled(self):
+        if request.args.get("profile") == "1":
+            from flask_login import current_user
+            if current_user.is_authenticated and current_user.is_admin():
+                return True
+        return random.random() < self.sample_rate
+
+    def _start(self):
+        with self._lock:
+            self._stats["requests"] += 1
+        if request.endpoint == "static" or not self._sampled():
+            return
+        self._current.set(RequestProfile(request.method, request.full_path.rstrip("?"), request.endpoint))
+
+    def _add_header(self, response):
+        profile = self._current.get()
+        if profile is not None:
+            profile.status = response.status_code
+            response.headers["Server-Timing"] = profile.server_timing()
+        return response
+
+    def _finish(self, exc=None):
+        profile = self._current.get()
+        if profile is None:
+            return
+        self._current.set(None)
+        if exc is not None:
+            profile.status = 500
+        profile.finish(self.n_plus_one_threshold)
+        for shape, count, seconds in profile.n_plus_one:
+            logger.warning("Possible N+1 on %s %s: %d executions (%.1f ms) of %s",
+                           profile.method, profile.path, count, seconds * 1000, shape)
+        self._store(profile)
+
+    # -- statement hooks ---------------------------------------------------
+
+    def before_execute(self, context):
+        if context is not None and self._current.get() is not None:
+            context._profile_began = time.perf_counter()
+
+    def after_execute(self, context, statement, parameters):
+        profile = self._current.get()
+        began = getattr(context, "_profile_began", None)
+        if profile is None or began is None:
+            return
+        elapsed = time.perf_counter() - began
+        profile.record(statement, parameters, elapsed)
+        if elapsed >= self.slow_seconds:
+            with self._lock:
+                self._stats["slow_queries"] += 1
+            logger.warning("Slow query (%.1f ms) on %s %s: %s %s", elapsed * 1000, profile.method, profile.path,
+                           statement_shape(statement), repr(parameters)[:_PARAMETER_CHARS])
+
+    # -- reporting ---------------------------------------------------------
+
+    def _store(self, profile):
+        with self._lock:
+            self._stats["sampled"] += 1
+            if profile.n_plus_one:
+                self._stats["n_plus_one"] += 1
+            self._recent.appendleft(profile)
+            totals = self._endpoints.setdefault(profile.endpoint or profile.path, {
+                "requests": 0, "queries": 0, "db_time": 0.0, "duration": 0.0, "max_queries": 0, "n_plus_one": 0
+            })
+            totals["requests"] += 1
+            totals["queries"] += profile.queries
+            totals["db_time"] += profile.db_time
+            totals["duration"] += profile.duration
+            totals["max_queries"] = max(totals["max_queries"], profile.queries)
+            totals["n_plus_one"] += bool(profile.n_plus_one)
+
+    def stats(self):
+        """Sampling counters, per-endpoint averages and recent profiles for this worker process"""
+        with self._lock:
+            stats = dict(self._stats)
+            recent = list(self._recent)
+            endpoints = {name: dict(totals) for name, totals in self._endpoints.items()}
+        stats["enabled"] = self.enabled
+        stats["sample_rate"] = self.sample_rate
+        stats["slow_ms"] = self.slow_seconds * 1000
+        stats["n_plus_one_threshold"] = self.n_plus_one_threshold
+        stats["endpoints"] = sorted((
+            {
+                "endpoint": name,
+                "requests": totals["requests"],
+                "avg_queries": round(totals["queries"] / totals["requests"], 1),
+                "max_queries": totals["max_queries"],
+                "avg_db_ms": round(totals["db_time"] * 1000 / totals["requests"], 2),
+                "avg_ms": round(totals["duration"] * 1000 / totals["requests"], 2),
+                "n_plus_one": totals["n_plus_one"]
+            } for name, totals in endpoints.items()
+        ), key=lambda row: row["avg_db_ms"] * row["requests"], reverse=True)
+        stats["recent"] = [profile.to_dict() for profile in recent]
+        return stats
+
+    def reset(self):
+        with self._lock:
+            self._recent.clear()
+            self._endpoints.clear()
+            self._stats = {"requests": 0, "sampled": 0, "slow_queries": 0, "n_plus_one": 0}
+
+
+_registered = []
+
+
+def _register_engine_events(profiler):
+    """Time statements on every engine; the hooks return immediately outside a sampled request"""
+    if profiler in _registered:
+        return
+    _registered.append(profiler)
+
+    @event.listens_for(Engine, "before_cursor_execute")
+    def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        profiler.before_execute(context)
+
+    @event.listens_for(Engine, "after_cursor_execute")
+    def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        profiler.after_execute(context, statement, parameters)
@@ -0,0 +1,61 @@
+# src/utils/substation_search.py
+from sqlalchemy import func, select
+from src.extensions import db
+from src.models.substation import Substation
+
+DEFAULT_LIMIT = 20
+MAX_LIMIT = 50
+# Substring matches only start at this many characters; a single letter matches most names
+MIN_SUBSTRING_CHARS = 2
+# Sorts after any character a name can contain, closing the prefix range (byte order only)
+_PREFIX_END = "\U0010ffff"
+
+_lower_name = func.lower(Substation.name)
+
+
+def _escape_like(term):
+    return term.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+
+def _prefix_clause(term, dialect):
+    """lower(name) starts with `term`.
+
+    SQLite compares text byte-wise, so a range over the lower(name) index is an
+    exact prefix test. Linguistic collations (PostgreSQL's default) ignore
+    punctuation and spaces when comparing, which lets "a-bx" fall inside the
+    range for "ab"; there LIKE is used instead, served on PostgreSQL by the
+    text_pattern_ops index.
+    """
+    if dialect == "sqlite":
+        return (_lower_name >= term) & (_lower_name < term + _PREFIX_END)
+    return _lower_name.like(f"{_escape_like(term)}%", escape="\\")
+
+
+def search_substations(term, limit=DEFAULT_LIMIT, session=None):
+    """[(id, name)] of substations whose name starts with `term`, then those merely containing it.
+
+    Matching is case-insensitive. Prefix matches are an index range scan (see
+    _prefix_clause); substring matches fill any remaining slots (served by the
+    trigram index on PostgreSQL).
+    """
+    session = session or db.session
+    term = (term or "").strip().lower()
+    limit = max(1, min(limit, MAX_LIMIT))
+
+    stmt = select(Substation.id, Substation.name).order_by(_lower_name, Substation.id).limit(limit)
+    if term:
+        stmt = stmt.where(_prefix_clause(term, session.get_bind().dialect.name))
+    rows = [tuple(row) for row in session.execute(stmt)]
+
+    if term and len(rows) < limit and len(term) >= MIN_SUBSTRING_CHARS:
+        found = [row[0] for row in rows]
+        substring = (
+            select(Substation.id, Substation.name)
+            .where(_lower_name.like(f"%{_escape_like(term)}%", escape="\\"))
+            .order_by(_lower_name, Substation.id)
+            .limit(limit - len(rows))
+        )
+        if found:
+            substring = substring.where(Substation.id.notin_(found))
+        rows += [tuple(row) for row in session.execute(substring)]
+    return rows
@@ -0,0 +1,138 @@
+# src/utils/substation_status.py
+from sqlalchemy import event, func, case, literal, select, union_all, delete, insert, inspect
+from src.extensions import db
+from src.models.substation import Substation, InspectionTest, SubstationStatus
+from src.utils.metric_counters import status_totals, subtract, apply_delta, recount_counters
+from src.utils.inspection_archive import archive_table
+
+# Keep IN lists well under SQLite's bound-parameter limit
+CHUNK_SIZE = 500
+
+STATUS_COLUMNS = [
+    SubstationStatus.substation_id,
+    SubstationStatus.latest_inspection_id,
+    SubstationStatus.latest_inspection_date,
+    SubstationStatus.inspection_status,
+    SubstationStatus.testing_status,
+    SubstationStatus.ever_inspected,
+    SubstationStatus.ever_tested
+]
+
+
+def chunked(values, size=CHUNK_SIZE):
+    values = list(values)
+    for i in range(0, len(values), size):
+        yield values[i:i + size]
+
+
+def _history(substation_ids=None):
+    """Hot and archived inspections side by side, with a `hot` column telling them apart"""
+    def source(table, hot):
+        stmt = select(
+            table.c.substation_id,
+            table.c.id,
+            table.c.inspection_date,
+            table.c.inspection_status,
+            table.c.testing_status,
+            literal(hot).label("hot")
+        )
+        if substation_ids is not None:
+            stmt = stmt.where(table.c.substation_id.in_(substation_ids))
+        return stmt
+    return union_all(source(InspectionTest.__table__, 1), source(archive_table, 0)).subquery()
+
+
+def _latest_inspections(substation_ids=None):
+    """SELECT of the newest inspection per substation (by date, then id).
+
+    Hot records come first; a substation whose hot records were all deleted falls
+    back to its newest archived one, without a latest_inspection_id since that
+    column points into the hot table. The ever_* flags look at both.
+    """
+    history = _history(substation_ids)
+    by_substation = {"partition_by": history.c.substation_id}
+    rank = func.row_number().over(
+        order_by=(history.c.hot.desc(), history.c.inspection_date.desc(), history.c.id.desc()),
+        **by_substation
+    ).label("rank")
+    ever_inspected = func.max(case((history.c.inspection_status == "Inspected", 1), else_=0)).over(**by_substation)
+    ever_tested = func.max(case((history.c.testing_status == "Tested", 1), else_=0)).over(**by_substation)
+    ranked = select(
+        history.c.substation_id,
+        history.c.id,
+        history.c.hot,
+        history.c.inspection_date,
+        history.c.inspection_status,
+        history.c.testing_status,
+        ever_inspected.label("ever_inspected"),
+        ever_tested.label("ever_tested"),
+        rank
+    ).subquery()
+    return select(
+        ranked.c.substation_id,
+        case((ranked.c.hot == 1, ranked.c.id), else_=None).label("latest_inspection_id"),
+        ranked.c.inspection_date,
+        ranked.c.inspection_status,
+        ranked.c.testing_status,
+        (ranked.c.ever_inspected == 1).label("ever_inspected"),
+        (ranked.c.ever_tested == 1).label("ever_tested")
+    ).where(ranked.c.rank == 1)
+
+
+def refresh_substation_status(connection, substation_ids):
+    """Recompute the SubstationStatus rows for the given substations on `connection`.
+
+    The metric counters are adjusted by the difference between the old and new
+    rows in the same transaction.
+    """
+    ids = sorted({i for i in substation_ids if i is not None})
+    table = SubstationStatus.__table__
+    for chunk in chunked(ids):
+        before = status_totals(connection, chunk)
+        connection.execute(delete(table).where(table.c.substation_id.in_(chunk)))
+        connection.execute(insert(table).from_select(
+            [c.key for c in STATUS_COLUMNS], _latest_inspections(chunk)
+        ))
+        apply_delta(connection, subtract(status_totals(connection, chunk), before))
+    return len(ids)
+
+
+def rebuild_substation_status(session=None):
+    """Rebuild the whole SubstationStatus table from the hot and archived inspections in one statement"""
+    session = session or db.session
+    table = SubstationStatus.__table__
+    session.execute(delete(table))
+    session.execute(insert(table).from_select(
+        [c.key for c in STATUS_COLUMNS], _latest_inspections()
+    ))
+    session.commit()
+    # A full rebuild bypasses the per-substation deltas, so recount the totals too
+    recount_counters(session)
+    return session.query(func.count(SubstationStatus.substation_id)).scalar()
+
+
+def _affected_substation_ids(session):
+    ids = set()
+    for obj in session.new:
+        if isinstance(obj, InspectionTest):
+            ids.add(obj.substation_id)
+    for obj in session.dirty:
+        if isinstance(obj, InspectionTest) and session.is_modified(obj):
+            history = inspect(obj).attrs.substation_id.history
+            ids.update(history.added or ())
+            ids.update(history.deleted or ())
+            ids.update(history.unchanged or ())
+    for obj in session.deleted:
+        if isinstance(obj, InspectionTest):
+            ids.add(obj.substation_id)
+        elif isinstance(obj, Substation):
+            ids.add(obj.id)
+    return ids
+
+
+@event.listens_for(db.session, "after_flush")
+def _refresh_after_flush(session, flush_context):
+    """Keep SubstationStatus in step with ORM inserts, edits and deletes of InspectionTest"""
+    ids = _affected_substation_ids(session)
+    if ids:
+        refresh_substation_status(session.connection(), ids)
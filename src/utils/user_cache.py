@@ -0,0 +1,53 @@
+# src/utils/user_cache.py
+from flask import current_app
+from src.extensions import cache, db
+from src.utils.cache import USERS
+from src.models.user import User, Role
+
+
+class Principal:
+    """The logged-in user as Flask-Login sees it: plain attributes, no ORM session"""
+    __slots__ = ("id", "username", "email", "role", "is_active")
+
+    is_authenticated = True
+    is_anonymous = False
+
+    def __init__(self, id, username, email, role, is_active):
+        self.id = id
+        self.username = username
+        self.email = email
+        self.role = role
+        self.is_active = is_active
+
+    @classmethod
+    def from_user(cls, user):
+        return cls(user.id, user.username, user.email, user.role, bool(user.is_active))
+
+    def get_id(self):
+        return str(self.id)
+
+    def is_admin(self):
+        return self.role == Role.ADMIN
+
+    def is_inspector(self):
+        return self.role == Role.INSPECTOR or self.role == Role.ADMIN
+
+    def __eq__(self, other):
+        return isinstance(other, (Principal, User)) and self.get_id() == other.get_id()
+
+    def __hash__(self):
+        return hash(self.id)
+
+    def __repr__(self):
+        return f'<Principal {self.username}>'
+
+
+def _fetch(user_id):
+    user = db.session.get(User, user_id)
+    return Principal.from_user(user) if user is not None else None
+
+
+def load_principal(user_id):
+    """Principal for `user_id` from the shared cache; any committed User write invalidates every entry"""
+    return cache.get_or_compute(f"user:{user_id}", lambda: _fetch(user_id), depends_on=(USERS,),
+                                ttl=current_app.config.get("USER_CACHE_TTL", 60))
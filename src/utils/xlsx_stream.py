@@ -0,0 +1,157 @@
+# src/utils/xlsx_stream.py
+import math
+import re
+import zipfile
+from datetime import date, datetime
+from decimal import Decimal
+from xml.sax.saxutils import escape, quoteattr
+from openpyxl.utils import get_column_letter
+
+MAIN_NS = "http://schemas.openxmlformats.org/spreadsheetml/2006/main"
+REL_NS = "http://schemas.openxmlformats.org/officeDocument/2006/relationships"
+PACKAGE_REL_NS = "http://schemas.openxmlformats.org/package/2006/relationships"
+XML_HEADER = '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+# Excel's limit on characters in one cell
+CELL_CHARS = 32767
+# Characters XML 1.0 cannot carry; openpyxl refuses them, here they are dropped
+_ILLEGAL = re.compile(r"[\x00-\x08\x0b\x0c\x0e-\x1f]")
+_EXCEL_EPOCH = datetime(1899, 12, 30)
+
+# Cell style indexes in STYLES: default, date, date and time (the formats openpyxl gives them)
+DATE_STYLE, DATETIME_STYLE = 1, 2
+STYLES = XML_HEADER + f"""<styleSheet xmlns="{MAIN_NS}">
+<numFmts count="2"><numFmt numFmtId="164" formatCode="yyyy-mm-dd"/><numFmt numFmtId="165" formatCode="yyyy-mm-dd h:mm:ss"/></numFmts>
+<fonts count="1"><font><sz val="11"/><name val="Calibri"/></font></fonts>
+<fills count="2"><fill><patternFill patternType="none"/></fill><fill><patternFill patternType="gray125"/></fill></fills>
+<borders count="1"><border><left/><right/><top/><bottom/><diagonal/></border></borders>
+<cellStyleXfs count="1"><xf numFmtId="0" fontId="0" fillId="0" borderId="0"/></cellStyleXfs>
+<cellXfs count="3"><xf numFmtId="0" fontId="0" fillId="0" borderId="0" xfId="0"/><xf numFmtId="164" fontId="0" fillId="0" borderId="0" xfId="0" applyNumberFormat="1"/><xf numFmtId="165" fontId="0" fillId="0" borderId="0" xfId="0" applyNumberFormat="1"/></cellXfs>
+<cellStyles count="1"><cellStyle name="Normal" xfId="0" builtinId="0"/></cellStyles>
+</styleSheet>"""
+
+
+class _Sink:
+    """Write-only file object collecting the zip's bytes until they are drained"""
+
+    def __init__(self):
+        self._chunks = []
+        self.size = 0
+
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        self.size += len(data)
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def drain(self):
+        data = b"".join(self._chunks)
+        self._chunks = []
+        self.size = 0
+        return data
+
+
+def _cell(ref, value):
+    if value is None:
+        return ""
+    if isinstance(value, bool):
+        return f'<c r="{ref}" t="b"><v>{int(value)}</v></c>'
+    if isinstance(value, (int, float, Decimal)):
+        if isinstance(value, float) and not math.isfinite(value):
+            return ""
+        return f'<c r="{ref}"><v>{value}</v></c>'
+    if isinstance(value, datetime):
+        serial = (value.replace(tzinfo=None) - _EXCEL_EPOCH).total_seconds() / 86400
+        return f'<c r="{ref}" s="{DATETIME_STYLE}"><v>{serial!r}</v></c>'
+    if isinstance(value, date):
+        return f'<c r="{ref}" s="{DATE_STYLE}"><v>{(value - _EXCEL_EPOCH.date()).days}</v></c>'
+    text = escape(_ILLEGAL.sub("", str(value))[:CELL_CHARS])
+    return f'<c r="{ref}" t="inlineStr"><is><t xml:space="preserve">{text}</t></is></c>'
+
+
+class XlsxStream:
+    """An .xlsx workbook written row by row into a zip that is never seeked.
+
+    Entries are written with data descriptors, so callers can drain() the bytes
+    produced so far and send them while later rows are still being read. Sheets
+    are written one after another; the parts listing them (workbook, relations,
+    content types) follow the last sheet, which Excel and openpyxl both accept.
+    Strings are stored inline rather than in a shared-string table, which would
+    have to be written before the sheets.
+    """
+
+    def __init__(self):
+        self._sink = _Sink()
+        self._zip = zipfile.ZipFile(self._sink, "w", compression=zipfile.ZIP_DEFLATED)
+        self._titles = []
+        self._entry = None
+        self._letters = []
+        self._row = 0
+
+    @property
+    def sheet_count(self):
+        return len(self._titles)
+
+    @property
+    def pending(self):
+        """Bytes written since the last drain()"""
+        return self._sink.size
+
+    def add_sheet(self, title, header=None):
+        self._end_sheet()
+        self._titles.append(title[:31])
+        self._entry = self._zip.open(f"xl/worksheets/sheet{len(self._titles)}.xml", "w", force_zip64=True)
+        self._entry.write(f'{XML_HEADER}<worksheet xmlns="{MAIN_NS}"><sheetData>'.encode())
+        self._row = 0
+        if header is not None:
+            self.append(header)
+
+    def append(self, values):
+        self._row += 1
+        if len(self._letters) < len(values):
+            self._letters = [get_column_letter(i + 1) for i in range(len(values))]
+        cells = "".join(_cell(f"{letter}{self._row}", value) for letter, value in zip(self._letters, values))
+        self._entry.write(f'<row r="{self._row}">{cells}</row>'.encode())
+
+    def drain(self):
+        return self._sink.drain()
+
+    def _end_sheet(self):
+        if self._entry is not None:
+            self._entry.write(b"</sheetData></worksheet>")
+            self._entry.close()
+            self._entry = None
+
+    def close(self):
+        """Finish the last sheet and write the workbook parts and the zip directory; returns the remaining bytes"""
+        self._end_sheet()
+        count = len(self._titles)
+        sheets = "".join(f'<sheet name={quoteattr(title)} sheetId="{i}" r:id="rId{i}"/>'
+                         for i, title in enumerate(self._titles, 1))
+        self._zip.writestr("xl/workbook.xml",
+                           f'{XML_HEADER}<workbook xmlns="{MAIN_NS}" xmlns:r="{REL_NS}"><sheets>{sheets}</sheets></workbook>')
+        relations = "".join(f'<Relationship Id="rId{i}" Type="{REL_NS}/worksheet" Target="worksheets/sheet{i}.xml"/>'
+                            for i in range(1, count + 1))
+        relations += f'<Relationship Id="rId{count + 1}" Type="{REL_NS}/styles" Target="styles.xml"/>'
+        self._zip.writestr("xl/_rels/workbook.xml.rels",
+                           f'{XML_HEADER}<Relationships xmlns="{PACKAGE_REL_NS}">{relations}</Relationships>')
+        self._zip.writestr("xl/styles.xml", STYLES)
+        self._zip.writestr("_rels/.rels",
+                           f'{XML_HEADER}<Relationships xmlns="{PACKAGE_REL_NS}"><Relationship Id="rId1" '
+                           f'Type="{REL_NS}/officeDocument" Target="xl/workbook.xml"/></Relationships>')
+        overrides = "".join(f'<Override PartName="/xl/worksheets/sheet{i}.xml" ContentType="application/'
+                            f'vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"/>'
+                            for i in range(1, count + 1))
+        self._zip.writestr("[Content_Types].xml", (
+            f'{XML_HEADER}<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+            '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+            '<Default Extension="xml" ContentType="application/xml"/>'
+            '<Override PartName="/xl/workbook.xml" '
+            'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>'
+            '<Override PartName="/xl/styles.xml" '
+            'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.styles+xml"/>'
+            f'{overrides}</Types>'
+        ))
+        self._zip.close()
+        return self._sink.drain()
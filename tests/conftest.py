@@ -0,0 +1,35 @@
+# tests/conftest.py
+import os
+import tempfile
+import pytest
+
+# src.main builds an app at import time; keep it away from the working directory's database
+_workdir = tempfile.mkdtemp(prefix="fire_fighting_tests_")
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(_workdir, 'import.db')}"
+os.environ["METRIC_SCHEDULER_ENABLED"] = "0"
+os.environ["CACHE_ENABLED"] = "0"
+os.environ["PROFILE_ENABLED"] = "0"
+os.environ["PROMETHEUS_ENABLED"] = "0"
+os.environ["CACHE_PATH"] = os.path.join(_workdir, "cache.sqlite3")
+
+
+@pytest.fixture
+def app(tmp_path, monkeypatch):
+    """A fresh app on its own SQLite file, with an application context pushed"""
+    monkeypatch.setenv("DATABASE_URL", f"sqlite:///{tmp_path / 'test.db'}")
+    from src.main import create_app
+    app = create_app()
+    app.config["TESTING"] = True
+    app.config["WTF_CSRF_ENABLED"] = False
+    with app.app_context():
+        yield app
+        from src.extensions import db
+        db.session.remove()
+        for engine in db.engines.values():
+            engine.dispose()
+
+
+@pytest.fixture
+def session(app):
+    from src.extensions import db
+    return db.session
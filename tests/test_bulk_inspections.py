@@ -0,0 +1,74 @@
+# tests/test_bulk_inspections.py
+from datetime import date
+from sqlalchemy import func, select
+from src.models.substation import Substation, InspectionTest, SubstationStatus
+from src.utils import bulk_inspections
+from src.utils.bulk_inspections import bulk_update_latest_inspections
+from src.utils.substation_status import chunked
+
+
+def _substations(session, count):
+    substations = [Substation(name=f"Substation {i}", coverage_status="Fully Covered") for i in range(count)]
+    session.add_all(substations)
+    session.commit()
+    return [substation.id for substation in substations]
+
+
+def _latest(session, substation_id):
+    return session.execute(
+        select(InspectionTest).where(InspectionTest.substation_id == substation_id)
+        .order_by(InspectionTest.inspection_date.desc(), InspectionTest.id.desc())
+    ).scalars().first()
+
+
+def test_updates_latest_record_and_creates_missing_ones(session):
+    inspected, fresh = _substations(session, 2)
+    old = InspectionTest(substation_id=inspected, inspection_date=date(2024, 1, 1),
+                         inspection_status="Inspected", testing_status="Tested")
+    latest = InspectionTest(substation_id=inspected, inspection_date=date(2024, 6, 1),
+                            inspection_status="Pending", testing_status="N/A")
+    session.add_all([old, latest])
+    session.commit()
+
+    assert bulk_update_latest_inspections([inspected, fresh, inspected], None, "Tested", user_id=1) == (1, 1)
+    session.commit()
+    session.expire_all()
+
+    # Only the latest record changes; the blank inspection status is left alone
+    assert (old.inspection_status, old.testing_status) == ("Inspected", "Tested")
+    assert (latest.inspection_status, latest.testing_status, latest.user_id) == ("Pending", "Tested", 1)
+
+    created = _latest(session, fresh)
+    assert (created.inspection_date, created.testing_date) == (date.today(), date.today())
+    assert (created.inspection_status, created.testing_status, created.notes) == ("Pending", "Tested", "Bulk updated")
+
+    status = session.get(SubstationStatus, fresh)
+    assert (status.latest_inspection_id, status.testing_status) == (created.id, "Tested")
+    assert session.get(SubstationStatus, inspected).testing_status == "Tested"
+
+
+def test_spans_several_chunks(session, monkeypatch):
+    monkeypatch.setattr(bulk_inspections, "chunked", lambda values: chunked(values, 3))
+    ids = _substations(session, 10)
+    session.add_all([InspectionTest(substation_id=sub_id, inspection_date=date(2024, 1, 1),
+                                    inspection_status="Pending", testing_status="N/A") for sub_id in ids[:4]])
+    session.commit()
+
+    assert bulk_update_latest_inspections(ids, "Inspected", None, user_id=1) == (4, 6)
+    session.commit()
+    assert session.scalar(select(func.count()).select_from(InspectionTest)) == 10
+    statuses = session.execute(select(SubstationStatus.inspection_status)).scalars().all()
+    assert statuses == ["Inspected"] * 10
+
+
+def test_bulk_update_route(app, session):
+    ids = _substations(session, 3)
+    client = app.test_client()
+    client.post("/login", data={"username": "admin", "password": "admin123"})
+    response = client.post("/inspections/bulk_update", data={
+        "selected_substation_ids": ",".join(map(str, ids)),
+        "new_inspection_status": "Inspected",
+        "new_testing_status": ""
+    })
+    assert response.status_code == 302
+    assert [_latest(session, sub_id).inspection_status for sub_id in ids] == ["Inspected"] * 3
@@ -0,0 +1,104 @@
+# tests/test_cache.py
+from datetime import date
+import pytest
+from sqlalchemy import update
+from src.extensions import cache
+from src.models.substation import Substation, ReliabilityMetric
+from src.utils.cache import INVENTORY, METRICS, METRIC_HISTORY, USERS, mark_changed
+from src.utils.metric_writer import METRIC_COLUMNS, metric_row, upsert_metrics
+
+
+@pytest.fixture(autouse=True)
+def cache_enabled(tmp_path, monkeypatch):
+    # Autouse fixtures run first, so the app below is built with the cache on
+    monkeypatch.setenv("CACHE_ENABLED", "1")
+    monkeypatch.setenv("CACHE_PATH", str(tmp_path / "cache.sqlite3"))
+    cache._lru.clear()
+    yield
+    cache._lru.clear()
+
+
+def _counter():
+    calls = []
+
+    def compute():
+        calls.append(1)
+        return len(calls)
+    return compute, calls
+
+
+def test_entries_are_reused_until_their_version_moves(session):
+    compute, calls = _counter()
+    assert cache.get_or_compute("key", compute) == 1
+    assert cache.get_or_compute("key", compute) == 1
+    # Other counters do not invalidate it
+    cache.bump(USERS)
+    assert cache.get_or_compute("key", compute) == 1
+    cache.bump(INVENTORY)
+    assert cache.get_or_compute("key", compute) == 2
+    assert len(calls) == 2
+
+
+def test_shared_tier_serves_other_workers(session):
+    compute, calls = _counter()
+    cache.get_or_compute("key", compute)
+    cache._lru.clear()  # as seen from another process on the host
+    assert cache.get_or_compute("key", compute) == 1
+    assert cache.stats()["shared_hits"] == 1
+    assert len(calls) == 1
+
+
+def test_ttl_expires_entries(session):
+    compute, calls = _counter()
+    cache.get_or_compute("key", compute, ttl=0)
+    assert cache.get_or_compute("key", compute, ttl=0) == 2
+
+
+def test_orm_commits_bump_their_model_version(session):
+    before = cache.versions([INVENTORY, METRICS])
+    session.add(Substation(name="Alpha", coverage_status="Fully Covered"))
+    session.commit()
+    assert cache.versions([INVENTORY, METRICS]) == (before[0] + 1, before[1])
+
+    # Bulk statements count too
+    session.execute(update(Substation).values(coverage_status="Not Covered"))
+    session.commit()
+    assert cache.versions([INVENTORY])[0] == before[0] + 2
+
+
+def test_rolled_back_writes_do_not_bump(session):
+    before = cache.versions([INVENTORY])
+    session.add(Substation(name="Alpha", coverage_status="Fully Covered"))
+    session.flush()
+    session.rollback()
+    assert cache.versions([INVENTORY]) == before
+
+
+def test_metric_writes_mark_history_only_for_past_periods(session):
+    before = cache.versions([METRICS, METRIC_HISTORY])
+    upsert_metrics([metric_row(date.today(), "daily", {c: 1.0 for c in METRIC_COLUMNS})])
+    session.commit()
+    after_today = cache.versions([METRICS, METRIC_HISTORY])
+    assert after_today[1] == before[1]
+
+    upsert_metrics([metric_row(date(2020, 1, 1), "daily", {c: 1.0 for c in METRIC_COLUMNS})])
+    session.commit()
+    assert cache.versions([METRIC_HISTORY])[0] == before[1] + 1
+
+    mark_changed(session, METRICS)
+    session.commit()
+    assert cache.versions([METRICS])[0] > after_today[0]
+
+
+def test_dashboard_is_recomputed_after_a_write(app, session):
+    client = app.test_client()
+    client.post("/login", data={"username": "admin", "password": "admin123"})
+    client.get("/dashboard")
+    misses = cache.stats()["misses"]
+    client.get("/dashboard")
+    assert cache.stats()["misses"] == misses
+
+    session.add(Substation(name="Alpha", coverage_status="Fully Covered"))
+    session.commit()
+    client.get("/dashboard")
+    assert cache.stats()["misses"] == misses + 1
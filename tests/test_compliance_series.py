@@ -0,0 +1,61 @@
+# tests/test_compliance_series.py
+from datetime import date, datetime
+import pytest
+from src.models.substation import Substation, InspectionTest
+from src.utils.metric_calculator import MetricCalculator
+
+
+def _seed(session):
+    substations = [
+        Substation(name="Alpha", coverage_status="Fully Covered", created_at=datetime(2023, 6, 10)),
+        Substation(name="Bravo", coverage_status="Fully Covered", created_at=datetime(2023, 11, 30, 23, 59)),
+        Substation(name="Charlie", coverage_status="Not Covered", created_at=datetime(2024, 1, 15)),
+        Substation(name="Delta", coverage_status="Not Covered", created_at=datetime(2024, 3, 1)),
+    ]
+    session.add_all(substations)
+    session.flush()
+    alpha, bravo, charlie, _ = [substation.id for substation in substations]
+
+    def inspection(substation_id, day, status="Inspected", testing_date=None, testing_status="N/A"):
+        return InspectionTest(substation_id=substation_id, inspection_date=day, inspection_status=status,
+                              testing_date=testing_date, testing_status=testing_status)
+
+    session.add_all([
+        # Two inspections of one substation in a month count once
+        inspection(alpha, date(2023, 12, 1)),
+        inspection(alpha, date(2023, 12, 20), testing_date=date(2024, 1, 3), testing_status="Tested"),
+        inspection(bravo, date(2023, 12, 31), status="Pending"),
+        inspection(bravo, date(2024, 1, 31)),
+        inspection(charlie, date(2024, 1, 31), testing_date=date(2024, 1, 31), testing_status="Failed"),
+        inspection(charlie, date(2024, 2, 1), testing_date=date(2024, 2, 2), testing_status="Tested"),
+    ])
+    session.commit()
+
+
+def test_series_counts_distinct_substations_per_month(session):
+    _seed(session)
+    series = MetricCalculator.get_monthly_compliance_series(2023, 11, 2024, 3)
+
+    assert series["labels"] == ["2023-11", "2023-12", "2024-01", "2024-02", "2024-03"]
+    # Substations existing at the end of each month, including one created before the range
+    assert series["total_substations"] == [2, 2, 3, 3, 4]
+    assert series["inspection_compliance"] == pytest.approx([0, 50.0, 200 / 3, 100 / 3, 0])
+    assert series["testing_compliance"] == pytest.approx([0, 0, 100 / 3, 100 / 3, 0])
+
+
+def test_single_month_helpers_match_the_series(session):
+    _seed(session)
+    series = MetricCalculator.get_monthly_compliance_series(2024, 1, 2024, 1)
+    assert MetricCalculator.get_monthly_inspection_compliance(2024, 1) == series["inspection_compliance"][0]
+    assert MetricCalculator.get_monthly_testing_compliance(2024, 1) == series["testing_compliance"][0]
+
+
+def test_months_before_any_substation_are_zero(session):
+    _seed(session)
+    series = MetricCalculator.get_monthly_compliance_series(2023, 1, 2023, 3)
+    assert series == {
+        "labels": ["2023-01", "2023-02", "2023-03"],
+        "total_substations": [0, 0, 0],
+        "inspection_compliance": [0, 0, 0],
+        "testing_compliance": [0, 0, 0]
+    }
@@ -0,0 +1,78 @@
+# tests/test_db_engines.py
+import pytest
+from flask import g
+from sqlalchemy import select, text, update
+from src.extensions import db
+from src.models.substation import Substation
+from src.utils.db_engines import (REPLICA, database_config, engine_options, primary_reads, read_engine,
+                                  replica_reads)
+
+
+def test_engine_options_follow_the_environment():
+    environ = {"DB_POOL_SIZE": "20", "DB_MAX_OVERFLOW": "0", "DB_POOL_TIMEOUT": "5", "SQLITE_BUSY_TIMEOUT": "3"}
+    assert engine_options("sqlite:///app.db", environ) == {
+        "pool_size": 20, "max_overflow": 0, "pool_timeout": 5, "connect_args": {"timeout": 3}
+    }
+    assert engine_options("sqlite://", environ) == {}
+
+    options = engine_options("postgresql://db/app", {"DB_POOL_RECYCLE": "60"})
+    assert (options["pool_size"], options["max_overflow"]) == (5, 10)
+    assert (options["pool_pre_ping"], options["pool_recycle"]) == (True, 60)
+    assert "connect_args" not in options
+
+
+def test_database_config_adds_the_replica_bind():
+    config = database_config({"DATABASE_URL": "postgres://primary/app",
+                              "DATABASE_REPLICA_URL": "postgres://replica/app"})
+    assert config["SQLALCHEMY_DATABASE_URI"] == "postgresql://primary/app"
+    assert config["SQLALCHEMY_BINDS"][REPLICA]["url"] == "postgresql://replica/app"
+    assert config["SQLALCHEMY_BINDS"][REPLICA]["pool_pre_ping"] is True
+    assert database_config({})["SQLALCHEMY_BINDS"] == {}
+
+
+def test_sqlite_connections_use_wal(session):
+    with db.engine.connect() as connection:
+        assert connection.execute(text("PRAGMA journal_mode")).scalar() == "wal"
+        assert connection.execute(text("PRAGMA synchronous")).scalar() == 1  # NORMAL
+
+
+@pytest.fixture
+def replica(tmp_path, monkeypatch):
+    # Requested before `app`, so the app is built with a replica bind
+    monkeypatch.setenv("DATABASE_REPLICA_URL", f"sqlite:///{tmp_path / 'replica.db'}")
+    yield
+    # init_app registers a metadata per bind key on the shared db; later apps have no such bind
+    db.metadatas.pop(REPLICA, None)
+
+
+def _bind(clause):
+    return db.session.get_bind(clause=clause)
+
+
+def test_replica_reads_route_selects_until_the_session_writes(replica, app, session):
+    primary, replica_engine = db.engine, db.engines[REPLICA]
+    with app.test_request_context():
+        # Outside a replica_reads view everything goes to the primary
+        assert _bind(select(Substation.id)) is primary
+        assert read_engine() is primary
+
+        replica_reads(lambda: None)()
+        assert g.read_replica
+        assert _bind(select(Substation.id)) is replica_engine
+        assert read_engine() is replica_engine
+        with primary_reads():
+            assert _bind(select(Substation.id)) is primary
+            assert read_engine() is primary
+        assert _bind(select(Substation.id)) is replica_engine
+
+        # A write goes to the primary, and so does every later read of this session
+        assert _bind(update(Substation).values(coverage_status="Not Covered")) is primary
+        assert _bind(select(Substation.id)) is primary
+        db.session.remove()
+
+
+def test_without_a_replica_views_read_the_primary(app, session):
+    with app.test_request_context():
+        replica_reads(lambda: None)()
+        assert _bind(select(Substation.id)) is db.engine
+        assert read_engine() is db.engine
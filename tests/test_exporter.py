@@ -0,0 +1,89 @@
+# tests/test_exporter.py
+import csv
+import io
+from datetime import date, datetime
+from openpyxl import load_workbook
+from src.models.substation import Substation, InspectionTest
+from src.utils import exporter
+from src.utils.exporter import build_query, export_stream, iter_csv, iter_xlsx
+
+
+def _seed(session, count=12):
+    for i in range(count):
+        substation = Substation(name=f"Substation {i:02d}", coverage_status="Fully Covered")
+        session.add(substation)
+        session.flush()
+        session.add(InspectionTest(substation_id=substation.id, inspection_date=date(2024, 1, 1 + i),
+                                   inspection_status="Inspected", testing_status="Tested", notes=f"note <{i}> & more"))
+    session.commit()
+
+
+def test_xlsx_export_round_trips(session):
+    _seed(session)
+    workbook = load_workbook(io.BytesIO(b"".join(iter_xlsx(build_query("inspections", {}), "Inspections"))))
+    assert workbook.sheetnames == ["Inspections 1"]
+    rows = list(workbook.active.iter_rows(values_only=True))
+    assert rows[0] == ("id", "substation", "inspection_date", "inspection_status", "testing_date",
+                       "testing_status", "notes", "recorded_by", "created_at")
+    assert len(rows) == 13
+    # Dates come back from openpyxl as midnight datetimes
+    assert rows[1][1:4] == ("Substation 00", datetime(2024, 1, 1), "Inspected")
+    assert isinstance(rows[1][8], datetime)
+    assert rows[5][6] == "note <4> & more"
+    assert rows[5][4] is None
+
+
+def test_xlsx_export_rolls_over_to_new_sheets(session, monkeypatch):
+    _seed(session)
+    monkeypatch.setattr(exporter, "XLSX_SHEET_ROWS", 5)
+    workbook = load_workbook(io.BytesIO(b"".join(iter_xlsx(build_query("substations", {}), "Substations"))))
+    assert workbook.sheetnames == ["Substations 1", "Substations 2", "Substations 3"]
+    names = []
+    for sheet in workbook.worksheets:
+        rows = list(sheet.iter_rows(values_only=True))
+        assert rows[0][:2] == ("id", "name")
+        names += [row[1] for row in rows[1:]]
+    assert names == [f"Substation {i:02d}" for i in range(12)]
+
+
+def test_empty_xlsx_export_keeps_the_header(session):
+    workbook = load_workbook(io.BytesIO(b"".join(iter_xlsx(build_query("reliability_metrics", {}), "Metrics"))))
+    assert workbook.sheetnames == ["Metrics"]
+    assert list(workbook.active.iter_rows(values_only=True)) == [
+        ("date", "period_type", "reliability_score", "effective_reliability", "inspection_compliance",
+         "testing_compliance", "coverage_ratio")
+    ]
+
+
+def test_xlsx_chunks_are_yielded_while_rows_are_still_arriving(session, monkeypatch):
+    read = []
+
+    def rows(stmt):
+        yield ["n", "text"], None
+        for i in range(20000):
+            read.append(i)
+            yield ["n", "text"], (i, f"row {i} with some text to compress")
+
+    monkeypatch.setattr(exporter, "stream_rows", rows)
+    monkeypatch.setattr(exporter, "XLSX_FLUSH_BYTES", 4096)
+    chunks = iter_xlsx(None)
+    first = next(chunks)
+    assert first and len(read) < 20000
+    data = first + b"".join(chunks)
+    sheet = load_workbook(io.BytesIO(data), read_only=True).active
+    assert sum(1 for _ in sheet.iter_rows()) == 20001
+
+
+def test_csv_export(session):
+    _seed(session, 3)
+    text = "".join(iter_csv(build_query("inspections", {"start": date(2024, 1, 2)})))
+    rows = list(csv.reader(io.StringIO(text)))
+    assert rows[0][:3] == ["id", "substation", "inspection_date"]
+    assert [row[1] for row in rows[1:]] == ["Substation 01", "Substation 02"]
+
+
+def test_export_stream_names_the_file(session):
+    generator, mimetype, filename = export_stream("reliability_metrics", "xlsx", {})
+    assert filename == "reliability_metrics.xlsx"
+    assert mimetype == exporter.MIMETYPES["xlsx"]
+    assert load_workbook(io.BytesIO(b"".join(generator))).sheetnames == ["Reliability Metrics"]
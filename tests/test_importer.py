@@ -0,0 +1,127 @@
+# tests/test_importer.py
+import csv
+import io
+from datetime import date
+import pytest
+from openpyxl import Workbook
+from src.models.substation import Substation, InspectionTest, SubstationStatus
+from src.utils.importer import ErrorReport, ImportFileError, import_inspections, import_substations, report_path
+
+
+def _csv(header, rows):
+    lines = [",".join(header)] + [",".join(str(v) for v in row) for row in rows]
+    return io.BytesIO(("\n".join(lines) + "\n").encode())
+
+
+def _errors(report):
+    report.close()
+    if report.count == 0:
+        return []
+    with open(report.path, newline="") as f:
+        rows = list(csv.reader(f))
+    assert rows[0] == ["row", "column", "value", "error"]
+    # Errors are grouped by check within a chunk; compare them in row order
+    return sorted((int(row), column, value, error) for row, column, value, error in rows[1:])
+
+
+@pytest.fixture
+def report(tmp_path):
+    return ErrorReport(str(tmp_path))
+
+
+def test_substation_rows_are_validated_across_chunks(session, report):
+    session.add(Substation(name="Existing", coverage_status="Fully Covered"))
+    session.commit()
+    rows = [
+        ("Alpha", "Fully Covered"),      # row 2
+        ("", "Fully Covered"),           # row 3: blank name
+        ("Beta", "Mostly Covered"),      # row 4: bad coverage
+        ("Existing", "Not Covered"),     # row 5: already in the database
+        ("Alpha", "Not Covered"),        # row 6: duplicate, but in the next chunk
+        ("Gamma", "Partially Covered"),  # row 7
+        ("Gamma", "Partially Covered"),  # row 8: duplicate within the chunk
+    ]
+    assert import_substations(_csv(["Name", "Coverage Status"], rows), "s.csv", report, chunk_size=4) == 2
+
+    assert sorted(s.name for s in Substation.query.all()) == ["Alpha", "Existing", "Gamma"]
+    errors = _errors(report)
+    assert [(row, column) for row, column, _, _ in errors] == [
+        (3, "name"), (4, "coverage_status"), (5, "name"), (6, "name"), (8, "name")
+    ]
+    assert errors[1][2] == "Mostly Covered"
+    assert errors[2][3] == "Substation already exists and was skipped"
+    assert errors[4][3] == "Duplicate name in file"
+
+
+def test_inspection_rows_are_validated_and_reported(session, report):
+    session.add_all([Substation(name="North", coverage_status="Fully Covered"),
+                     Substation(name="South", coverage_status="Not Covered")])
+    session.commit()
+    header = ["substation", "inspection_date", "inspection_status", "testing_date", "testing_status", "notes"]
+    rows = [
+        ("North", "2024-01-05", "Inspected", "2024-01-06", "Tested", "ok"),     # row 2
+        ("Nowhere", "2024-01-05", "Inspected", "", "", ""),                     # row 3: unknown substation
+        ("South", "not a date", "Inspected", "", "", ""),                       # row 4: bad date
+        ("South", "2024-02-01", "Done", "", "", ""),                            # row 5: bad status
+        ("South", "2024-02-01", "Pending", "someday", "Tested", ""),            # row 6: bad testing date
+        ("South", "03/15/2024", "Pending", "", "Bogus", ""),                    # row 7: bad testing status
+        ("South", "03/15/2024", "Failed", "", "", "pump failure"),              # row 8
+    ]
+    assert import_inspections(_csv(header, rows), "i.csv", report, chunk_size=3) == 2
+
+    assert [(row, column, value) for row, column, value, _ in _errors(report)] == [
+        (3, "substation", "Nowhere"), (4, "inspection_date", "not a date"), (5, "inspection_status", "Done"),
+        (6, "testing_date", "someday"), (7, "testing_status", "Bogus")
+    ]
+    south = InspectionTest.query.join(Substation).filter(Substation.name == "South").one()
+    assert (south.inspection_date, south.testing_date, south.testing_status, south.notes) == \
+        (date(2024, 3, 15), None, "N/A", "pump failure")
+    # Both chunks refreshed the latest-status rows
+    assert SubstationStatus.query.count() == 2
+
+
+def test_mixed_date_formats_in_one_column(session, report):
+    session.add(Substation(name="Mixed", coverage_status="Not Covered"))
+    session.commit()
+    dates = ["2024-01-05", "2024-01-06 08:30", "02/07/2024", "March 8 2024", "2024-02-30"]
+    rows = [("Mixed", day, "Inspected") for day in dates]
+    assert import_inspections(_csv(["substation", "inspection_date", "inspection_status"], rows),
+                              "i.csv", report) == 4
+    assert sorted(i.inspection_date for i in InspectionTest.query.all()) == [
+        date(2024, 1, 5), date(2024, 1, 6), date(2024, 2, 7), date(2024, 3, 8)
+    ]
+    assert [(row, value) for row, _, value, _ in _errors(report)] == [(6, "2024-02-30")]
+
+
+def test_xlsx_upload(session, report):
+    session.add(Substation(name="Sheet", coverage_status="Not Covered"))
+    session.commit()
+    workbook = Workbook()
+    sheet = workbook.active
+    sheet.append(["Substation Name", "Inspection Date", "Inspection Status", "Testing Date"])
+    sheet.append(["Sheet", date(2024, 4, 1), "Inspected", date(2024, 4, 2)])
+    sheet.append(["Sheet", "2024-04-03", "Pending", None])
+    data = io.BytesIO()
+    workbook.save(data)
+    data.seek(0)
+
+    assert import_inspections(data, "upload.xlsx", report, chunk_size=1) == 2
+    assert _errors(report) == []
+    assert sorted((i.inspection_date, i.testing_date) for i in InspectionTest.query.all()) == [
+        (date(2024, 4, 1), date(2024, 4, 2)), (date(2024, 4, 3), None)
+    ]
+
+
+def test_rejected_files(session, report):
+    with pytest.raises(ImportFileError, match="Missing required column"):
+        import_inspections(_csv(["substation", "inspection_date"], [("x", "2024-01-01")]), "i.csv", report)
+    with pytest.raises(ImportFileError, match="xls"):
+        import_substations(io.BytesIO(b""), "old.xls", report)
+    with pytest.raises(ImportFileError):
+        import_substations(io.BytesIO(b""), "notes.txt", report)
+
+
+def test_report_path_rejects_malformed_tokens(tmp_path):
+    assert report_path(str(tmp_path), "../etc/passwd") is None
+    assert report_path(str(tmp_path), "") is None
+    assert report_path(str(tmp_path), "a" * 32).endswith("a" * 32 + ".csv")
@@ -0,0 +1,97 @@
+# tests/test_inspection_archive.py
+from datetime import date
+from src.models.substation import Substation, InspectionTest, SubstationStatus
+from src.utils.inspection_archive import archive_closed_years, purge_archived
+from src.utils.inspection_search import InspectionSearch
+from src.utils.metric_counters import verify_counters
+from src.utils.metric_snapshot import take_snapshot
+from src.utils.substation_status import rebuild_substation_status
+
+
+def _substations_with_history(session, count=3):
+    """Substations with an old Inspected/Tested record and a recent Pending one each"""
+    ids = []
+    for i in range(count):
+        substation = Substation(name=f"Substation {i}", coverage_status="Fully Covered")
+        session.add(substation)
+        session.flush()
+        session.add_all([
+            InspectionTest(substation_id=substation.id, inspection_date=date(2019, 5, 1),
+                           testing_date=date(2019, 5, 2), inspection_status="Inspected",
+                           testing_status="Tested", notes="pump failure at the main valve"),
+            InspectionTest(substation_id=substation.id, inspection_date=date.today(),
+                           inspection_status="Pending", testing_status="N/A", notes="follow-up visit")
+        ])
+        ids.append(substation.id)
+    session.commit()
+    return ids
+
+
+def test_archive_keeps_latest_inspection_hot(session):
+    ids = _substations_with_history(session)
+    assert archive_closed_years()[2019] == len(ids)
+    for substation_id in ids:
+        status = session.get(SubstationStatus, substation_id)
+        assert status.latest_inspection_id is not None
+        assert status.inspection_status == "Pending"
+        assert status.ever_inspected and status.ever_tested
+
+
+def test_deleting_last_hot_inspection_keeps_archived_flags(session):
+    ids = _substations_with_history(session)
+    archive_closed_years()
+    before = take_snapshot()
+    assert before.inspected_substations == len(ids)
+
+    session.delete(InspectionTest.query.filter_by(substation_id=ids[0]).one())
+    session.commit()
+
+    status = session.get(SubstationStatus, ids[0])
+    assert status is not None
+    assert status.latest_inspection_id is None
+    assert status.latest_inspection_date == date(2019, 5, 1)
+    assert status.ever_inspected and status.ever_tested
+    after = take_snapshot()
+    assert after.inspected_substations == len(ids)
+    assert after.tested_substations == len(ids)
+    assert verify_counters(fix=False) == {}
+
+    rebuild_substation_status()
+    assert take_snapshot() == after
+
+
+def _search(query, **filters):
+    return InspectionSearch(query, **filters).fetch()["items"]
+
+
+def test_archived_inspections_stay_searchable(session):
+    ids = _substations_with_history(session)
+    assert len(_search("pump failure")) == len(ids)
+    archive_closed_years()
+
+    items = _search("pump failure")
+    assert len(items) == len(ids)
+    assert all(item["archived"] for item in items)
+    assert {item["substation_id"] for item in items} == set(ids)
+    assert all(item["inspection_date"] == date(2019, 5, 1) for item in items)
+    assert len(_search("pump", inspection_status="Inspected")) == len(ids)
+    assert not any(item["archived"] for item in _search("follow"))
+
+
+def test_archive_then_delete_keeps_search_in_step(session):
+    ids = _substations_with_history(session)
+    archive_closed_years()
+
+    session.delete(InspectionTest.query.filter_by(substation_id=ids[0]).one())
+    session.commit()
+    assert len(_search("follow")) == len(ids) - 1
+    assert len(_search("pump failure")) == len(ids)
+
+    substation = session.get(Substation, ids[1])
+    substation.name = "Renamed Ridge"
+    session.commit()
+    assert [item["substation_id"] for item in _search("ridge")] == [ids[1], ids[1]]
+
+    purge_archived(substation_id=ids[1])
+    session.commit()
+    assert {item["substation_id"] for item in _search("pump failure")} == {ids[0], ids[2]}
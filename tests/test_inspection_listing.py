@@ -0,0 +1,91 @@
+# tests/test_inspection_listing.py
+from datetime import date
+import pytest
+from src.models.substation import Substation, InspectionTest
+from src.utils.inspection_listing import InspectionListing, ListingError, decode_cursor, encode_cursor
+
+
+@pytest.mark.parametrize("sort,value", [
+    ("name", "Substation 7"),
+    ("name", "Ünïcode / with \"quotes\" and = signs"),
+    ("coverage_status", "Partially Covered"),
+    ("latest_inspection_date", date(2024, 2, 29)),
+    ("latest_inspection_date", None)
+])
+def test_cursor_round_trip(sort, value):
+    cursor = encode_cursor(value, 12345)
+    assert "=" not in cursor
+    assert decode_cursor(cursor, sort) == (value, 12345)
+
+
+@pytest.mark.parametrize("cursor", ["not base64!", "e30", encode_cursor("name", "x")[:-2] + "!!",
+                                    encode_cursor(None, 3)])
+def test_malformed_cursor(cursor):
+    with pytest.raises(ListingError):
+        decode_cursor(cursor, "name")
+
+
+def _seed(session):
+    for i in range(23):
+        substation = Substation(name=f"Substation {i:02d}",
+                                coverage_status=("Fully Covered", "Partially Covered")[i % 2])
+        session.add(substation)
+        session.flush()
+        if i % 3:
+            session.add(InspectionTest(substation_id=substation.id, inspection_date=date(2024, 1, 1 + i % 4),
+                                       inspection_status="Inspected", testing_status="Tested"))
+    session.commit()
+
+
+def _walk(**params):
+    seen, cursor = [], None
+    while True:
+        page = InspectionListing(cursor=cursor, **params).fetch()
+        seen += page["items"]
+        cursor = page["next_cursor"]
+        if not page["has_more"]:
+            return seen
+
+
+def test_pages_cover_every_substation_once(session):
+    # Coverage statuses and inspection dates repeat, so pages also break ties on id
+    _seed(session)
+    for sort in ("name", "coverage_status", "latest_inspection_date"):
+        for direction in ("asc", "desc"):
+            seen = [item["id"] for item in _walk(sort=sort, direction=direction, limit=4)]
+            assert sorted(seen) == list(range(1, 24)), (sort, direction)
+
+
+@pytest.mark.parametrize("direction", ["asc", "desc"])
+@pytest.mark.parametrize("limit", [1, 4, 7, 15, 16, 100])
+def test_never_inspected_substations_come_last(session, direction, limit):
+    _seed(session)
+    items = _walk(sort="latest_inspection_date", direction=direction, limit=limit)
+    keys = [(item["latest_inspection_date"], item["id"]) for item in items]
+    dated = [key for key in keys if key[0] != "N/A"]
+    undated = [key for key in keys if key[0] == "N/A"]
+    assert keys == dated + undated
+    assert dated == sorted(dated, reverse=direction == "desc")
+    assert [key[1] for key in undated] == sorted((key[1] for key in undated), reverse=direction == "desc")
+    assert len(undated) == 8
+
+
+def test_date_filters_leave_out_undated_rows(session):
+    _seed(session)
+    items = _walk(sort="latest_inspection_date", limit=3, date_from=date(2024, 1, 2))
+    assert items and all(item["latest_inspection_date"] >= "2024-01-02" for item in items)
+
+
+def test_substations_page_is_paginated(app, session):
+    _seed(session)
+    client = app.test_client()
+    client.post("/login", data={"username": "admin", "password": "admin123"})
+    first = client.get("/substations?limit=10")
+    assert first.status_code == 200
+    assert first.data.count(b'class="substation-checkbox"') == 10
+    assert b"Next Page" in first.data
+    cursor = InspectionListing(limit=10).fetch()["next_cursor"]
+    last = client.get(f"/substations?limit=10&cursor={cursor}")
+    assert b"Next Page" not in client.get(
+        f"/substations?limit=10&cursor={InspectionListing(limit=10, cursor=cursor).fetch()['next_cursor']}").data
+    assert last.data.count(b'class="substation-checkbox"') == 10
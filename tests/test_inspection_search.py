@@ -0,0 +1,119 @@
+# tests/test_inspection_search.py
+from datetime import date
+import pytest
+from src.models.substation import Substation, InspectionTest
+from src.utils.inspection_search import (InspectionSearch, SearchError, fts5_query, highlight,
+                                         rebuild_search_index, ts_query)
+
+
+@pytest.mark.parametrize("terms,fts5,ts", [
+    ("pump failure", '"pump" "failure"*', "pump & failure:*"),
+    ("valv* leak", '"valv"* "leak"*', "valv:* & leak:*"),
+    ('pump" OR 1=1 --', '"pump" "OR" "1" "1"*', "pump & OR & 1 & 1:*"),
+    ("  ", "", ""),
+])
+def test_user_input_becomes_a_safe_query(terms, fts5, ts):
+    # Words are quoted or joined with operators; no user punctuation reaches the query syntax
+    assert fts5_query(terms) == fts5
+    assert ts_query(terms) == ts
+
+
+def test_highlight_escapes_stored_text():
+    assert str(highlight("<b>pump</b> \x02failure\x03")) == "&lt;b&gt;pump&lt;/b&gt; <mark>failure</mark>"
+    assert str(highlight(None)) == ""
+
+
+@pytest.fixture
+def inspections(session):
+    north = Substation(name="North Yard", coverage_status="Fully Covered")
+    pumping = Substation(name="Pumping Station", coverage_status="Not Covered")
+    session.add_all([north, pumping])
+    session.flush()
+    rows = [
+        InspectionTest(substation_id=north.id, inspection_date=date(2024, 1, 5), inspection_status="Inspected",
+                       testing_status="Tested", notes="Pump failure at the main valve"),
+        InspectionTest(substation_id=north.id, inspection_date=date(2024, 3, 1), inspection_status="Failed",
+                       testing_status="Failed", notes="Valves leaking, pumps replaced"),
+        InspectionTest(substation_id=pumping.id, inspection_date=date(2024, 2, 1), inspection_status="Pending",
+                       testing_status="N/A", notes="Routine visit"),
+    ]
+    session.add_all(rows)
+    session.commit()
+    return north, pumping, rows
+
+
+def _ids(search):
+    return [item["id"] for item in search.fetch()["items"]]
+
+
+def test_matches_notes_and_names_with_stemming(inspections):
+    north, pumping, (failure, leaking, routine) = inspections
+    ids = _ids(InspectionSearch("pump"))
+    # Stemming matches "pumps" and "Pumping"; the substation name outranks notes
+    assert set(ids) == {failure.id, leaking.id, routine.id}
+    assert ids[0] == routine.id
+
+    results = InspectionSearch("failure").fetch()["items"]
+    assert [item["id"] for item in results] == [failure.id]
+    assert "<mark>failure</mark>" in str(results[0]["snippet"])
+    assert results[0]["inspection_date"] == date(2024, 1, 5)
+    assert not results[0]["archived"]
+
+
+def test_last_word_matches_as_a_prefix(inspections):
+    _, _, (failure, _, _) = inspections
+    assert _ids(InspectionSearch("main val")) == [failure.id]
+    assert _ids(InspectionSearch("val main")) == []
+
+
+def test_filters_and_paging(inspections):
+    _, _, (failure, leaking, routine) = inspections
+    assert _ids(InspectionSearch("pump", inspection_status="Failed")) == [leaking.id]
+    assert _ids(InspectionSearch("pump", date_from=date(2024, 1, 10), date_to=date(2024, 2, 28))) == [routine.id]
+
+    first = InspectionSearch("pump", per_page=2).fetch()
+    second = InspectionSearch("pump", per_page=2, page=2).fetch()
+    assert first["has_more"] and not second["has_more"]
+    assert len({item["id"] for item in first["items"] + second["items"]}) == 3
+
+    with pytest.raises(SearchError):
+        InspectionSearch("pump", inspection_status="Bogus")
+    with pytest.raises(SearchError):
+        InspectionSearch.from_args({"q": "pump", "page": "two"})
+    with pytest.raises(SearchError):
+        InspectionSearch.from_args({"q": "pump", "date_from": "01/02/2024"})
+
+
+def test_triggers_keep_the_index_current(inspections, session):
+    north, pumping, (failure, leaking, routine) = inspections
+    failure.notes = "Gasket replaced"
+    session.commit()
+    assert _ids(InspectionSearch("failure")) == []
+    assert _ids(InspectionSearch("gasket")) == [failure.id]
+
+    session.delete(leaking)
+    session.commit()
+    assert _ids(InspectionSearch("leaking")) == []
+
+    north.name = "Harbour"
+    session.commit()
+    assert set(_ids(InspectionSearch("harbour"))) == {failure.id}
+
+    assert rebuild_search_index() == 2
+    assert set(_ids(InspectionSearch("harbour"))) == {failure.id}
+
+
+def test_search_page_and_api(app, inspections):
+    _, _, (failure, _, _) = inspections
+    client = app.test_client()
+    client.post("/login", data={"username": "admin", "password": "admin123"})
+    page = client.get("/inspections/search?q=failure")
+    assert page.status_code == 200
+    assert b"<mark>failure</mark>" in page.data
+
+    api = client.get("/inspections/search?q=failure", headers={"Accept": "application/json"}).get_json()
+    assert [item["id"] for item in api["items"]] == [failure.id]
+    assert api["items"][0]["inspection_date"] == "2024-01-05"
+
+    bad = client.get("/inspections/search?q=x&testing_status=Bogus", headers={"Accept": "application/json"})
+    assert bad.status_code == 400
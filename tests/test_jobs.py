@@ -0,0 +1,119 @@
+# tests/test_jobs.py
+from datetime import datetime, timedelta
+import pytest
+from sqlalchemy import func, select
+from sqlalchemy.exc import OperationalError
+from src.extensions import db
+from src.models.job import Job, JobStatus
+from src.models.substation import ReliabilityMetric, Substation
+from src.utils.jobs import JobCancelled, JobContext, JobError, runner
+
+
+@pytest.fixture
+def submitted(app, monkeypatch):
+    """Job ids handed to the pool; the tests run them with runner._execute instead"""
+    ids = []
+    monkeypatch.setattr(runner, "_submit", ids.append)
+    return ids
+
+
+def _job(session, **values):
+    job = Job(kind="recalculate_metrics", params={"years": 1}, heartbeat_at=datetime.utcnow(), **values)
+    session.add(job)
+    session.commit()
+    return job
+
+
+def _metric_count(session):
+    return session.scalar(select(func.count()).select_from(ReliabilityMetric))
+
+
+def test_recalculation_runs_to_completion(session, submitted):
+    session.add(Substation(name="Alpha", coverage_status="Fully Covered"))
+    session.commit()
+    job = runner.enqueue("recalculate_metrics", {"years": 1})
+    assert submitted == [job.id]
+
+    runner._execute(job.id)
+    session.refresh(job)
+    assert job.status == JobStatus.SUCCEEDED
+    assert job.progress == 1.0
+    assert _metric_count(session) > 0
+
+
+def test_cancelled_recalculation_writes_nothing(session, submitted):
+    # Cancellation requested before the worker reaches the first write
+    session.add(Substation(name="Alpha", coverage_status="Fully Covered"))
+    session.commit()
+    job = _job(session, cancel_requested=True)
+
+    runner._execute(job.id)
+    session.refresh(job)
+    assert job.status == JobStatus.CANCELLED
+    assert _metric_count(session) == 0
+
+
+def test_busy_progress_write_still_notices_cancellation(session, monkeypatch):
+    job = _job(session, status=JobStatus.RUNNING, cancel_requested=True)
+
+    def busy():
+        raise OperationalError("UPDATE job", {}, Exception("database is locked"))
+    monkeypatch.setattr(db.engine, "begin", busy)
+    with pytest.raises(JobCancelled):
+        JobContext(job.id).progress(0.5, "Halfway")
+
+
+def test_cancel_queued_and_running_jobs(session, submitted):
+    queued = _job(session)
+    assert runner.cancel(queued.id).status == JobStatus.CANCELLED
+
+    running = _job(session, status=JobStatus.RUNNING)
+    job = runner.cancel(running.id)
+    assert job.status == JobStatus.RUNNING
+    assert job.cancel_requested
+
+    with pytest.raises(JobError):
+        runner.cancel(queued.id)
+    with pytest.raises(JobError):
+        runner.cancel(12345)
+
+
+def test_retry_only_after_the_job_stops(session, submitted):
+    job = _job(session, status=JobStatus.RUNNING)
+    with pytest.raises(JobError):
+        runner.retry(job.id)
+
+    job.status = JobStatus.FAILED
+    job.error = "boom"
+    session.commit()
+    retried = runner.retry(job.id)
+    assert retried.status == JobStatus.QUEUED
+    assert retried.error is None
+    assert submitted == [job.id]
+
+
+def test_stale_jobs_are_failed_cancelled_or_retried(session, submitted):
+    old = datetime.utcnow() - timedelta(seconds=runner.stale_after + 60)
+    lost = _job(session, status=JobStatus.RUNNING)
+    lost.heartbeat_at = old
+    fresh = _job(session, status=JobStatus.RUNNING)
+    session.commit()
+
+    assert runner.is_stale(lost)
+    assert not runner.is_stale(fresh)
+    assert runner.fail_stale() == 1
+    session.refresh(lost)
+    session.refresh(fresh)
+    assert lost.status == JobStatus.FAILED
+    assert fresh.status == JobStatus.RUNNING
+
+    # A running job with no worker left is cancelled outright rather than flagged
+    orphan = _job(session, status=JobStatus.RUNNING)
+    orphan.heartbeat_at = old
+    session.commit()
+    assert runner.cancel(orphan.id).status == JobStatus.CANCELLED
+
+    orphan_retry = _job(session, status=JobStatus.RUNNING)
+    orphan_retry.heartbeat_at = old
+    session.commit()
+    assert runner.retry(orphan_retry.id).status == JobStatus.QUEUED
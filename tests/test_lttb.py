@@ -0,0 +1,43 @@
+# tests/test_lttb.py
+import numpy as np
+import pytest
+from src.utils.metric_store import lttb
+
+
+def _series(n, columns=3, seed=7):
+    rng = np.random.default_rng(seed)
+    days = np.arange(738000, 738000 + n, dtype=np.int64)
+    return days, rng.normal(50, 10, size=(n, columns))
+
+
+@pytest.mark.parametrize("n,budget", [(1000, 3), (1000, 100), (1001, 250), (5000, 999), (10, 9)])
+def test_keeps_first_and_last_within_budget(n, budget):
+    days, values = _series(n)
+    keep = lttb(days, values, budget)
+    assert len(keep) == budget
+    assert keep[0] == 0 and keep[-1] == n - 1
+    assert np.all(np.diff(keep) > 0)
+
+
+@pytest.mark.parametrize("n,budget", [(0, 10), (1, 10), (2, 10), (50, 50), (50, 80)])
+def test_short_series_are_returned_whole(n, budget):
+    days, values = _series(n)
+    assert lttb(days, values, budget).tolist() == list(range(n))
+
+
+def test_keeps_spikes():
+    days, values = _series(2000, columns=1)
+    values[:] = 50.0
+    values[777, 0] = 95.0
+    values[1500, 0] = 5.0
+    keep = lttb(days, values, 40)
+    assert 777 in keep and 1500 in keep
+
+
+def test_ignores_missing_values():
+    days, values = _series(1000)
+    values[::3, 1] = np.nan
+    values[:, 2] = np.nan
+    keep = lttb(days, values, 60)
+    assert len(keep) == 60
+    assert keep[0] == 0 and keep[-1] == 999
@@ -0,0 +1,92 @@
+# tests/test_metric_counters.py
+import io
+from datetime import date
+from src.models.substation import Substation, InspectionTest
+from src.utils.bulk_inspections import bulk_update_coverage, bulk_update_latest_inspections
+from src.utils.importer import ErrorReport, import_inspections, import_substations
+from src.utils.metric_counters import read_counters, verify_counters
+
+
+def _no_drift():
+    drift = verify_counters(fix=False)
+    assert drift == {}, drift
+    return read_counters()
+
+
+def _substations(session, *coverage):
+    substations = [Substation(name=f"Substation {i}", coverage_status=status) for i, status in enumerate(coverage)]
+    session.add_all(substations)
+    session.commit()
+    return [substation.id for substation in substations]
+
+
+def _inspection(session, substation_id, day, inspection_status="Inspected", testing_status="Tested"):
+    inspection = InspectionTest(substation_id=substation_id, inspection_date=day,
+                                inspection_status=inspection_status, testing_status=testing_status)
+    session.add(inspection)
+    session.commit()
+    return inspection
+
+
+def test_orm_writes_keep_counters_exact(session):
+    first, second, third = _substations(session, "Fully Covered", "Partially Covered", "Not Covered")
+    assert _no_drift().total_substations == 3
+
+    old = _inspection(session, first, date(2024, 1, 1))
+    _inspection(session, first, date(2024, 6, 1), "Pending", "N/A")
+    moved = _inspection(session, second, date(2024, 3, 1))
+    counters = _no_drift()
+    assert (counters.inspected_substations, counters.inspected_records) == (2, 1)
+
+    old.testing_status = "Failed"
+    session.commit()
+    _no_drift()
+
+    # Moving a record between substations refreshes both of them
+    moved.substation_id = third
+    session.commit()
+    counters = _no_drift()
+    assert counters.total_inspection_records == 2
+
+    session.delete(old)
+    session.commit()
+    assert _no_drift().inspected_substations == 1
+
+    substation = session.get(Substation, second)
+    substation.coverage_status = "Fully Covered"
+    session.commit()
+    assert _no_drift().fully_covered == 2
+
+    session.delete(substation)
+    session.commit()
+    assert _no_drift().total_substations == 2
+
+
+def test_bulk_updates_keep_counters_exact(session):
+    ids = _substations(session, "Fully Covered", "Partially Covered", "Not Covered", "Not Covered")
+    _inspection(session, ids[0], date(2024, 1, 1), "Pending", "N/A")
+
+    assert bulk_update_coverage(ids[1:], "Fully Covered") == 3
+    session.commit()
+    assert _no_drift().fully_covered == 4
+
+    assert bulk_update_latest_inspections(ids, "Inspected", "Tested", user_id=None) == (1, 3)
+    session.commit()
+    counters = _no_drift()
+    assert (counters.inspected_substations, counters.tested_records) == (4, 4)
+
+
+def test_imports_keep_counters_exact(session, tmp_path):
+    substations = "name,coverage_status\n" + "".join(
+        f"Imported {i},{('Fully Covered', 'Partially Covered', 'Not Covered')[i % 3]}\n" for i in range(12))
+    report = ErrorReport(str(tmp_path))
+    assert import_substations(io.BytesIO(substations.encode()), "substations.csv", report, chunk_size=5) == 12
+    assert _no_drift().total_substations == 12
+
+    inspections = "substation,inspection_date,inspection_status,testing_status\n" + "".join(
+        f"Imported {i % 12},2024-01-{i % 28 + 1:02d},{('Inspected', 'Pending')[i % 2]},Tested\n" for i in range(40))
+    assert import_inspections(io.BytesIO(inspections.encode()), "inspections.csv", report, chunk_size=7) == 40
+    report.close()
+    counters = _no_drift()
+    assert counters.total_inspection_records == 12
+    assert counters.inspected_substations == 6
@@ -0,0 +1,73 @@
+# tests/test_metric_scheduler.py
+from datetime import date, datetime, timedelta
+from sqlalchemy import select
+from src.models.substation import ReliabilityMetric, Substation
+from src.utils.metric_scheduler import (
+    DAILY_SNAPSHOT_LEASE, MetricSnapshotScheduler, claim_lease, run_daily_snapshot, start_metric_scheduler
+)
+
+
+def test_lease_is_claimed_once_per_interval(session):
+    now = datetime(2024, 5, 1, 12, 0)
+    assert claim_lease("test_lease", 3600, now)
+    session.commit()
+    assert not claim_lease("test_lease", 3600, now + timedelta(minutes=30))
+    session.rollback()
+    assert claim_lease("test_lease", 3600, now + timedelta(hours=1))
+    session.commit()
+
+
+def test_lease_is_released_at_midnight(session):
+    evening = datetime(2024, 5, 1, 23, 50)
+    assert claim_lease("test_lease", 86400, evening)
+    session.commit()
+    assert claim_lease("test_lease", 86400, evening + timedelta(minutes=15))
+    session.commit()
+
+
+def test_rolled_back_claim_can_be_retaken(session):
+    now = datetime(2024, 5, 1, 12, 0)
+    assert claim_lease("test_lease", 3600, now)
+    session.rollback()
+    assert claim_lease("test_lease", 3600, now)
+    session.commit()
+
+
+def test_daily_snapshot_stores_todays_metric_once(session):
+    session.add(Substation(name="Alpha", coverage_status="Fully Covered"))
+    session.commit()
+
+    assert run_daily_snapshot(3600)
+    assert not run_daily_snapshot(3600)
+    rows = session.execute(select(ReliabilityMetric).where(ReliabilityMetric.period_type == "daily")).scalars().all()
+    assert [row.date for row in rows] == [date.today()]
+    assert rows[0].coverage_ratio == 100.0
+
+
+def test_empty_database_still_takes_the_lease(session):
+    assert run_daily_snapshot(3600)
+    assert not run_daily_snapshot(3600)
+    assert session.scalar(select(ReliabilityMetric)) is None
+
+
+def test_next_run_wakes_at_midnight_or_interval(app):
+    scheduler = MetricSnapshotScheduler(app, interval=3600)
+    assert scheduler.seconds_until_next_run(datetime(2024, 5, 1, 12, 0)) == 3600
+    assert scheduler.seconds_until_next_run(datetime(2024, 5, 1, 23, 30)) == 1800
+    assert MetricSnapshotScheduler(app, 3600, sweep_interval=300).seconds_until_next_run(
+        datetime(2024, 5, 1, 12, 0)) == 300
+
+
+def test_scheduler_is_off_unless_enabled(app):
+    # conftest disables it; the dashboard must never depend on the thread running
+    assert start_metric_scheduler(app) is None
+    assert "metric_scheduler" not in app.extensions
+
+
+def test_dashboard_get_does_not_write_metrics(app, session):
+    session.add(Substation(name="Alpha", coverage_status="Fully Covered"))
+    session.commit()
+    client = app.test_client()
+    client.post("/login", data={"username": "admin", "password": "admin123"})
+    assert client.get("/dashboard").status_code == 200
+    assert session.scalar(select(ReliabilityMetric)) is None
@@ -0,0 +1,86 @@
+# tests/test_metric_series.py
+from datetime import date, timedelta
+import pytest
+from src.utils.metric_store import MetricStore
+from src.utils.metric_trends import (DEFAULT_LAG, DEFAULT_WINDOW, MAX_POINTS, MIN_POINTS, MetricSeriesRequest,
+                                     SeriesError)
+from src.utils.metric_writer import METRIC_COLUMNS, metric_row, upsert_metrics
+
+
+@pytest.mark.parametrize("args,message", [
+    ({"period": "hourly"}, "period must be one of"),
+    ({"start": "2024-02-01", "end": "2024-01-01"}, "start must not be after end"),
+    ({"start": "01/02/2024"}, "start must be YYYY-MM-DD"),
+    ({"metrics": "reliability_score,uptime"}, "metrics must be among"),
+    ({"points": str(MIN_POINTS - 1)}, f"points must be between {MIN_POINTS} and {MAX_POINTS}"),
+    ({"points": str(MAX_POINTS + 1)}, f"points must be between {MIN_POINTS} and {MAX_POINTS}"),
+    ({"points": "many"}, "points must be a whole number"),
+    ({"window": "0"}, "window must be between"),
+    ({"lag": "1.5"}, "lag must be a whole number"),
+])
+def test_malformed_requests_are_rejected(args, message):
+    with pytest.raises(SeriesError, match=message):
+        MetricSeriesRequest.from_args(args)
+
+
+def test_defaults_follow_the_period():
+    for period in ("daily", "monthly", "yearly"):
+        request = MetricSeriesRequest.from_args({"period": period})
+        assert (request.window, request.lag) == (DEFAULT_WINDOW[period], DEFAULT_LAG[period])
+        assert request.points is None
+        assert len(request.metrics) == len(METRIC_COLUMNS)
+    request = MetricSeriesRequest.from_args({"points": str(MIN_POINTS), "metrics": "coverage_ratio",
+                                             "start": "2024-01-01", "end": "2024-01-01"})
+    assert (request.points, request.metrics, request.start) == (MIN_POINTS, ["coverage_ratio"], date(2024, 1, 1))
+
+
+def _store(session, days):
+    upsert_metrics([metric_row(day, "daily", {c: float(i) for c in METRIC_COLUMNS}) for i, day in days])
+    session.commit()
+    return MetricStore()
+
+
+def test_windows_and_lags_count_calendar_days(session):
+    start = date(2024, 1, 1)
+    # Day 2 is missing
+    store = _store(session, [(0, start), (1, start + timedelta(days=1)), (3, start + timedelta(days=3))])
+    result = MetricSeriesRequest(window=2, lag=2, metrics=["coverage_ratio"]).fetch(store)
+
+    assert result["dates"] == ["2024-01-01", "2024-01-02", "2024-01-04"]
+    assert (result["rows"], result["points"]) == (3, 3)
+    coverage = result["metrics"]["coverage_ratio"]
+    assert coverage["values"] == [0.0, 1.0, 3.0]
+    assert coverage["rolling_mean"] == [0.0, 0.5, 3.0]
+    # Two calendar days back from the 4th is the 2nd, not the row before it
+    assert coverage["delta"] == [None, None, 2.0]
+    assert coverage["trend"]["slope_per_day"] == pytest.approx(1.0)
+    assert coverage["percentiles"]["p50"] == 1.0
+
+
+def test_points_budget_downsamples_after_the_analytics(session):
+    start = date(2023, 1, 1)
+    store = _store(session, [(i, start + timedelta(days=i)) for i in range(400)])
+    result = MetricSeriesRequest(metrics=["coverage_ratio"], points=50).fetch(store)
+
+    assert (result["rows"], result["points"]) == (400, 50)
+    assert (result["start"], result["end"]) == ("2023-01-01", (start + timedelta(days=399)).isoformat())
+    coverage = result["metrics"]["coverage_ratio"]
+    assert len(coverage["values"]) == len(coverage["rolling_mean"]) == 50
+    # Percentiles still cover every stored row
+    assert coverage["percentiles"]["p50"] == pytest.approx(199.5)
+
+
+def test_empty_range(session):
+    result = MetricSeriesRequest(start=date(2020, 1, 1), end=date(2020, 2, 1)).fetch(MetricStore())
+    assert (result["rows"], result["dates"], result["start"]) == (0, [], None)
+    assert result["metrics"]["reliability_score"]["trend"]["start"] is None
+
+
+def test_series_api(app, session):
+    _store(session, [(1, date(2024, 1, 1))])
+    client = app.test_client()
+    client.post("/login", data={"username": "admin", "password": "admin123"})
+    assert client.get("/api/metrics/series?period=hourly").status_code == 400
+    response = client.get("/api/metrics/series?metrics=coverage_ratio")
+    assert response.status_code == 200
+    assert response.get_json()["metrics"]["coverage_ratio"]["values"] == [1.0]
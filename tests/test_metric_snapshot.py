@@ -0,0 +1,64 @@
+# tests/test_metric_snapshot.py
+from datetime import date
+import pytest
+from src.models.substation import Substation, InspectionTest
+from src.utils.metric_calculator import MetricCalculator
+from src.utils.metric_snapshot import MetricsSnapshot, take_snapshot
+
+
+def _seed(session):
+    coverage = ["Fully Covered", "Fully Covered", "Partially Covered", "Not Covered", "Not Covered"]
+    substations = [Substation(name=f"Substation {i}", coverage_status=status) for i, status in enumerate(coverage)]
+    session.add_all(substations)
+    session.flush()
+    first, second, third, fourth, _ = [substation.id for substation in substations]
+    session.add_all([
+        # Only the latest record of each substation counts towards the pies
+        InspectionTest(substation_id=first, inspection_date=date(2024, 1, 1),
+                       inspection_status="Inspected", testing_status="Tested"),
+        InspectionTest(substation_id=first, inspection_date=date(2024, 5, 1),
+                       inspection_status="Pending", testing_status="Not Tested"),
+        InspectionTest(substation_id=second, inspection_date=date(2024, 2, 1),
+                       inspection_status="Inspected", testing_status="Not Tested"),
+        InspectionTest(substation_id=third, inspection_date=date(2024, 3, 1),
+                       inspection_status="Inspected", testing_status="Tested"),
+        InspectionTest(substation_id=fourth, inspection_date=date(2024, 4, 1),
+                       inspection_status="Not Inspected", testing_status=None),
+    ])
+    session.commit()
+
+
+def test_empty_database_gives_zeroes(session):
+    snapshot = take_snapshot()
+    assert snapshot == MetricsSnapshot()
+    assert snapshot.to_metrics() == {
+        "total_substations": 0, "coverage_ratio": 0, "inspection_compliance": 0,
+        "testing_compliance": 0, "effective_reliability": 0
+    }
+    assert snapshot.inspection_chart() == ([], [])
+
+
+def test_snapshot_counts_in_one_pass(session):
+    _seed(session)
+    snapshot = take_snapshot()
+
+    assert (snapshot.total_substations, snapshot.fully_covered, snapshot.partially_covered,
+            snapshot.not_covered) == (5, 2, 1, 2)
+    # ever_* flags: an earlier inspected/tested record still counts
+    assert (snapshot.inspected_substations, snapshot.tested_substations) == (3, 2)
+    assert (snapshot.total_inspection_records, snapshot.inspected_records, snapshot.tested_records) == (4, 2, 1)
+    assert snapshot.testing_status_records == 3
+
+    assert snapshot.coverage_ratio == pytest.approx((2 + 0.5) / 5 * 100)
+    assert snapshot.inspection_compliance == pytest.approx(60.0)
+    assert snapshot.testing_compliance == pytest.approx(40.0)
+    assert snapshot.effective_reliability == pytest.approx((50.0 + 60.0 + 40.0) / 3)
+
+    assert snapshot.coverage_chart()["data"] == [2, 1, 2]
+    assert snapshot.inspection_chart() == (["Inspected", "Not Inspected"], [2, 2])
+    assert snapshot.testing_chart() == (["Tested", "Not Tested"], [1, 3])
+
+
+def test_calculator_matches_a_fresh_snapshot(session):
+    _seed(session)
+    assert MetricCalculator.calculate_current_metrics() == take_snapshot().to_metrics()
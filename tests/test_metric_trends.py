@@ -0,0 +1,89 @@
+# tests/test_metric_trends.py
+from datetime import date, timedelta
+import pytest
+from src.utils.metric_store import MetricStore
+from src.utils.metric_trends import monthly_trend, weekly_trend, yearly_trend
+from src.utils.metric_writer import METRIC_COLUMNS, metric_row, upsert_metrics
+
+
+def _store(session, rows):
+    upsert_metrics([metric_row(day, period_type, {c: value for c in METRIC_COLUMNS})
+                    for day, period_type, value in rows])
+    session.commit()
+    return MetricStore()
+
+
+def _daily(start, end, value=lambda day: day.toordinal() % 100):
+    days = (end - start).days + 1
+    return [(start + timedelta(days=i), "daily", float(value(start + timedelta(days=i)))) for i in range(days)]
+
+
+def test_weekly_trend_buckets_by_iso_week(session):
+    # Sunday 2025-01-05 ends ISO week 2025-W01, which starts in December 2024
+    today = date(2025, 1, 5)
+    store = _store(session, _daily(date(2024, 12, 10), today))
+    trend = weekly_trend(weeks=3, today=today, store=store)
+
+    assert [(week["week"], week["date"]) for week in trend] == [
+        ("2024-W51", "2024-12-16"), ("2024-W52", "2024-12-23"), ("2025-W01", "2024-12-30")
+    ]
+    for week in trend:
+        monday = date.fromisoformat(week["date"])
+        expected = sum((monday + timedelta(days=i)).toordinal() % 100 for i in range(7)) / 7
+        assert week["avg_reliability"] == pytest.approx(expected)
+        assert week["avg_coverage_ratio"] == pytest.approx(expected)
+
+
+def test_weekly_trend_averages_only_days_present(session):
+    today = date(2024, 5, 15)  # Wednesday
+    store = _store(session, [(date(2024, 5, 13), "daily", 10.0), (date(2024, 5, 15), "daily", 20.0),
+                             (date(2024, 5, 16), "daily", 99.0)])
+    assert weekly_trend(weeks=1, today=today, store=store) == [{
+        "week": "2024-W20", "date": "2024-05-13",
+        **{key: 15.0 for key in ("avg_reliability", "avg_testing_compliance", "avg_inspection_compliance",
+                                 "avg_coverage_ratio", "avg_effective_reliability")}
+    }]
+
+
+def test_monthly_trend_prefers_stored_rollups(session):
+    today = date(2024, 3, 10)
+    store = _store(session, _daily(date(2024, 1, 1), today, lambda day: day.day) + [
+        (date(2024, 2, 1), "monthly", 77.0)
+    ])
+    trend = monthly_trend(months=3, today=today, store=store)
+
+    assert [(month["month"], month["source"]) for month in trend] == [
+        ("2024-01", "daily"), ("2024-02", "monthly"), ("2024-03", "daily")
+    ]
+    assert trend[0]["avg_reliability"] == pytest.approx(16.0)
+    assert trend[1]["avg_reliability"] == 77.0
+    assert trend[2]["avg_reliability"] == pytest.approx(5.5)
+
+
+def test_yearly_trend_falls_back_to_finer_rows(session):
+    today = date(2024, 6, 30)
+    store = _store(session, [
+        (date(2022, 1, 1), "yearly", 60.0),
+        (date(2022, 5, 1), "monthly", 10.0),
+        (date(2023, 1, 1), "monthly", 70.0),
+        (date(2023, 2, 1), "monthly", 80.0),
+        (date(2024, 6, 1), "daily", 90.0),
+    ])
+    trend = yearly_trend(years=3, today=today, store=store)
+    assert [(year["year"], year["source"], year["avg_reliability"]) for year in trend] == [
+        ("2022", "yearly", 60.0), ("2023", "monthly", 75.0), ("2024", "daily", 90.0)
+    ]
+
+
+def test_trends_are_empty_without_rows(session):
+    store = MetricStore()
+    assert weekly_trend(store=store) == []
+    assert monthly_trend(store=store) == []
+    assert yearly_trend(store=store) == []
+
+
+def test_metrics_page_renders_stored_trends(app, session):
+    _store(session, _daily(date.today() - timedelta(days=40), date.today()))
+    client = app.test_client()
+    client.post("/login", data={"username": "admin", "password": "admin123"})
+    assert client.get("/metrics").status_code == 200
@@ -0,0 +1,48 @@
+# tests/test_metric_writer.py
+from datetime import date, timedelta
+from sqlalchemy import func, select
+from src.models.substation import ReliabilityMetric
+from src.utils import metric_writer
+from src.utils.metric_writer import METRIC_COLUMNS, metric_row, upsert_metrics
+
+
+def _rows(days, value, period_type="daily"):
+    start = date(2023, 1, 1)
+    return [metric_row(start + timedelta(days=i), period_type, {c: value + i for c in METRIC_COLUMNS})
+            for i in range(days)]
+
+
+def _stored(session):
+    rows = session.execute(select(ReliabilityMetric).order_by(ReliabilityMetric.date,
+                                                              ReliabilityMetric.period_type)).scalars()
+    return [(row.date, row.period_type, *[getattr(row, c) for c in METRIC_COLUMNS]) for row in rows]
+
+
+def test_upsert_is_idempotent(session):
+    rows = _rows(1200, 10.0) + _rows(3, 20.0, "monthly")
+    assert upsert_metrics(rows) == len(rows)
+    first = _stored(session)
+    assert len(first) == len(rows)
+
+    upsert_metrics(rows)
+    assert _stored(session) == first
+
+
+def test_upsert_updates_in_place(session):
+    upsert_metrics(_rows(10, 10.0))
+    upsert_metrics(_rows(5, 40.0) + _rows(10, 99.0, "monthly"))
+    assert session.execute(select(func.count()).select_from(ReliabilityMetric)).scalar() == 20
+    stored = {(row[0], row[1]): row[2] for row in _stored(session)}
+    assert stored[(date(2023, 1, 1), "daily")] == 40.0
+    assert stored[(date(2023, 1, 8), "daily")] == 17.0
+    assert stored[(date(2023, 1, 1), "monthly")] == 99.0
+
+
+def test_fallback_upsert_is_idempotent(session, monkeypatch):
+    monkeypatch.setattr(metric_writer, "_upsert_statement", lambda dialect, rows: None)
+    rows = _rows(30, 10.0)
+    upsert_metrics(rows)
+    first = _stored(session)
+    upsert_metrics(rows)
+    assert _stored(session) == first
+    assert len(first) == 30
@@ -0,0 +1,120 @@
+# tests/test_prometheus.py
+import json
+import os
+import pytest
+from src.extensions import prometheus
+from src.utils.prometheus import PrometheusMetrics, reliability_gauges
+from src.utils.metric_snapshot import MetricsSnapshot
+
+# Beyond any pid the kernel hands out, so its file belongs to a worker that has exited
+EXITED_PID = 2 ** 22 + 1
+
+
+@pytest.fixture
+def metrics(tmp_path):
+    metrics = PrometheusMetrics()
+    metrics.directory = str(tmp_path)
+    # As the first request of a worker does; values recorded before it are dropped
+    metrics._ensure_worker()
+    yield metrics
+    metrics._pid = None  # stops its flush thread
+
+
+def _other_worker(directory, pid, counters=(), histograms=(), gauges=()):
+    with open(os.path.join(directory, f"{pid}_test.json"), "w") as f:
+        json.dump({"pid": pid, "counters": list(counters), "histograms": list(histograms),
+                   "gauges": list(gauges)}, f)
+
+
+def test_render_merges_worker_files(metrics, tmp_path):
+    labels = {"endpoint": "main.dashboard", "method": "GET", "status": "200"}
+    metrics.inc("http_requests_total", labels, 2)
+    metrics.observe("http_request_duration_seconds", 0.02, {"endpoint": "main.dashboard", "method": "GET"})
+    metrics.set_gauge("http_requests_in_flight", 1)
+
+    # An exited worker's counters and histograms still count, its gauges do not
+    _other_worker(tmp_path, EXITED_PID,
+                  counters=[["http_requests_total", sorted(labels.items()), 3]],
+                  histograms=[["http_request_duration_seconds",
+                               [["endpoint", "main.dashboard"], ["method", "GET"]], [0, 0, 0, 0, 0, 0, 0, 1, 0, 0, 0, 0],
+                               0.9, 1]],
+                  gauges=[["http_requests_in_flight", [], 5]])
+    body = metrics.render()
+
+    assert "# TYPE http_requests_total counter" in body
+    assert 'http_requests_total{endpoint="main.dashboard",method="GET",status="200"} 5' in body
+    assert 'http_request_duration_seconds_bucket{endpoint="main.dashboard",method="GET",le="0.025"} 1' in body
+    assert 'http_request_duration_seconds_bucket{endpoint="main.dashboard",method="GET",le="+Inf"} 2' in body
+    assert 'http_request_duration_seconds_count{endpoint="main.dashboard",method="GET"} 2' in body
+    assert "http_requests_in_flight 1\n" in body
+
+
+def test_live_worker_gauges_are_summed_or_maxed(metrics, tmp_path):
+    metrics.set_gauge("db_pool_capacity", 15, {"bind": "primary"})
+    metrics.set_gauge("db_pool_saturation", 0.2, {"bind": "primary"})
+    _other_worker(tmp_path, os.getppid(), gauges=[
+        ["db_pool_capacity", [["bind", "primary"]], 15],
+        ["db_pool_saturation", [["bind", "primary"]], 0.6]
+    ])
+    body = metrics.render()
+    assert 'db_pool_capacity{bind="primary"} 30' in body
+    assert 'db_pool_saturation{bind="primary"} 0.6' in body
+
+
+def test_flush_writes_this_workers_file(metrics, tmp_path):
+    metrics.inc("view_cache_invalidations_total")
+    metrics.flush()
+    with open(metrics._path) as f:
+        state = json.load(f)
+    assert state["pid"] == os.getpid()
+    assert state["counters"] == [["view_cache_invalidations_total", [], 1.0]]
+
+
+def test_label_values_are_escaped(metrics):
+    metrics.inc("http_requests_total", {"endpoint": 'a"b\\c\nd', "method": "GET", "status": "200"})
+    assert 'endpoint="a\\"b\\\\c\\nd"' in metrics.render()
+
+
+def test_reliability_gauges_render_from_a_snapshot(metrics):
+    snapshot = MetricsSnapshot(total_substations=4, fully_covered=2, partially_covered=1,
+                               inspected_substations=3, tested_substations=1)
+    body = metrics.render(reliability_gauges(snapshot))
+    assert "# TYPE reliability_percent gauge" in body
+    assert 'reliability_percent{kind="coverage"} 62.5' in body
+    assert 'substations{coverage="not_covered"} 1' in body
+    assert "substations_inspected 3" in body
+
+
+@pytest.fixture
+def exposition(tmp_path, monkeypatch):
+    # Requested before `app`, so the app is built with the exporter on
+    monkeypatch.setenv("PROMETHEUS_ENABLED", "1")
+    monkeypatch.setenv("PROMETHEUS_MULTIPROC_DIR", str(tmp_path / "prometheus"))
+    monkeypatch.setenv("PROMETHEUS_TOKEN", "secret")
+
+
+def test_endpoint_needs_the_token(exposition, app):
+    client = app.test_client()
+    assert client.get("/metrics/prometheus").status_code == 401
+    assert client.get("/metrics/prometheus", headers={"Authorization": "Bearer wrong"}).status_code == 401
+
+    response = client.get("/metrics/prometheus", headers={"Authorization": "Bearer secret"})
+    assert response.status_code == 200
+    assert response.content_type.startswith("text/plain; version=0.0.4")
+    assert "# TYPE reliability_percent gauge" in response.get_data(as_text=True)
+    # The first two requests were counted by the time the third rendered
+    assert 'endpoint="main.prometheus_metrics",method="GET",status="401"' in response.get_data(as_text=True)
+
+
+def test_endpoint_is_hidden_without_a_token(app):
+    # conftest disables the exporter; enabled without a token or PROMETHEUS_PUBLIC it is still hidden
+    client = app.test_client()
+    assert client.get("/metrics/prometheus").status_code == 404
+    app.config["PROMETHEUS_TOKEN"] = None
+    prometheus.enabled = True
+    try:
+        assert client.get("/metrics/prometheus").status_code == 404
+        app.config["PROMETHEUS_PUBLIC"] = True
+        assert client.get("/metrics/prometheus").status_code == 200
+    finally:
+        prometheus.enabled = False
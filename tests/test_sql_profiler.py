@@ -0,0 +1,86 @@
+# tests/test_sql_profiler.py
+import pytest
+from sqlalchemy import select
+from src.extensions import db, profiler
+from src.models.substation import Substation
+from src.models.user import User
+from src.utils.sql_profiler import RequestProfile, statement_shape
+
+
+@pytest.fixture(autouse=True)
+def profile_everything(monkeypatch):
+    # Autouse fixtures run first, so the app below is built with every request sampled
+    monkeypatch.setenv("PROFILE_ENABLED", "1")
+    monkeypatch.setenv("PROFILE_SAMPLE_RATE", "1")
+    monkeypatch.setenv("PROFILE_N_PLUS_ONE", "5")
+    yield
+    profiler.reset()
+    profiler.enabled = False
+
+
+@pytest.fixture
+def client(app, session):
+    @app.route("/test/one-by-one")
+    def one_by_one():
+        ids = db.session.execute(select(Substation.id)).scalars().all()
+        names = [db.session.execute(select(Substation.name).where(Substation.id == i)).scalar() for i in ids]
+        return ",".join(names)
+
+    session.add_all([Substation(name=f"Substation {i}", coverage_status="Fully Covered") for i in range(6)])
+    session.commit()
+    profiler.reset()
+    client = app.test_client()
+    client.post("/login", data={"username": "admin", "password": "admin123"})
+    return client
+
+
+def test_statement_shape_collapses_placeholder_lists():
+    assert statement_shape("SELECT *\n  FROM t WHERE id IN (?, ?, ?)") == "SELECT * FROM t WHERE id IN (?, ...)"
+    assert statement_shape("SELECT * FROM t WHERE id IN (%(a)s, %(b)s)") == "SELECT * FROM t WHERE id IN (?, ...)"
+    assert statement_shape("SELECT * FROM t WHERE id = ?") == "SELECT * FROM t WHERE id = ?"
+
+
+def test_profile_keeps_the_slowest_and_flags_repeats():
+    profile = RequestProfile("GET", "/x", "x", keep=2)
+    for i, elapsed in enumerate([0.01, 0.05, 0.02, 0.04]):
+        profile.record("SELECT * FROM t WHERE id = ?", (i,), elapsed)
+    profile.record("SELECT 1", (), 0.001)
+    profile.finish(n_plus_one_threshold=4)
+
+    assert profile.queries == 5
+    assert profile.db_time == pytest.approx(0.121)
+    assert [round(seconds, 3) for seconds, _, _ in profile.slowest] == [0.05, 0.04]
+    assert profile.slowest[0][2] == "(1,)"
+    assert [(shape, count) for shape, count, _ in profile.n_plus_one] == [("SELECT * FROM t WHERE id = ?", 4)]
+
+
+def test_sampled_request_is_recorded(client):
+    response = client.get("/test/one-by-one")
+    assert response.headers["Server-Timing"].startswith("db;dur=")
+    assert 'desc="' in response.headers["Server-Timing"]
+
+    stats = profiler.stats()
+    profile = next(p for p in stats["recent"] if p["endpoint"] == "one_by_one")
+    assert profile["queries"] >= 7
+    assert profile["n_plus_one"][0]["count"] == 6
+    assert "WHERE substation.id = ?" in profile["n_plus_one"][0]["statement"]
+    assert stats["n_plus_one"] >= 1
+
+
+def test_perf_page_reports_endpoints(client):
+    client.get("/dashboard")
+    stats = client.get("/admin/perf", headers={"Accept": "application/json"}).get_json()
+    assert any(row["endpoint"] == "main.dashboard" for row in stats["endpoints"])
+
+    client.post("/admin/perf/reset")
+    assert profiler.stats()["sampled"] <= 1
+
+
+def test_perf_page_is_admin_only(app, session):
+    viewer = User(username="viewer", email="viewer@example.com")
+    viewer.set_password("viewer123")
+    session.add(viewer)
+    session.commit()
+    other = app.test_client()
+    other.post("/login", data={"username": "viewer", "password": "viewer123"})
+    assert other.get("/admin/perf", headers={"Accept": "application/json"}).status_code == 403
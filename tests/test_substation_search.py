@@ -0,0 +1,62 @@
+# tests/test_substation_search.py
+import pytest
+from sqlalchemy import text
+from src.models.substation import Substation
+from src.utils.substation_search import MAX_LIMIT, search_substations
+
+NAMES = ["North Yard", "northgate", "Northern Cross", "Nor_th", "Far North", "Southgate", "N%orth", "Zeta"]
+
+
+@pytest.fixture
+def names(session):
+    session.add_all([Substation(name=name, coverage_status="Fully Covered") for name in NAMES])
+    session.commit()
+
+
+def _names(rows):
+    return [name for _, name in rows]
+
+
+def test_prefix_matches_come_first_then_substrings(names):
+    assert _names(search_substations("NORTH")) == ["North Yard", "Northern Cross", "northgate", "Far North"]
+    assert _names(search_substations("gate")) == ["northgate", "Southgate"]
+
+
+def test_single_letters_only_match_prefixes(names):
+    assert _names(search_substations("z")) == ["Zeta"]
+    assert _names(search_substations("h")) == []
+
+
+def test_like_wildcards_are_literal(names):
+    assert _names(search_substations("nor_")) == ["Nor_th"]
+    assert _names(search_substations("n%")) == ["N%orth"]
+    # Substring path: LIKE with the wildcard escaped
+    assert _names(search_substations("%o")) == ["N%orth"]
+    assert _names(search_substations("r_t")) == ["Nor_th"]
+
+
+def test_limits_are_clamped(names):
+    assert len(search_substations("", limit=3)) == 3
+    assert _names(search_substations("north", limit=2)) == ["North Yard", "Northern Cross"]
+    assert len(search_substations("", limit=0)) == 1
+    assert len(search_substations("", limit=MAX_LIMIT * 10)) == len(NAMES)
+
+
+def test_prefix_search_uses_the_lower_name_index(names, session):
+    plan = session.execute(text(
+        "EXPLAIN QUERY PLAN SELECT id, name FROM substation "
+        "WHERE lower(name) >= 'nor' AND lower(name) < 'nor' || char(1114111) ORDER BY lower(name), id LIMIT 20"
+    )).all()
+    assert any("ix_substation_name_lower" in row[-1] for row in plan)
+
+
+def test_search_api(app, names):
+    client = app.test_client()
+    client.post("/login", data={"username": "admin", "password": "admin123"})
+    response = client.get("/api/substations/search?q=north&limit=2")
+    assert response.status_code == 200
+    assert [item["text"] for item in response.get_json()["results"]] == ["North Yard", "Northern Cross"]
+    assert response.headers["Cache-Control"] == "private, no-cache"
+
+    again = client.get("/api/substations/search?q=north&limit=2", headers={"If-None-Match": response.headers["ETag"]})
+    assert again.status_code == 304
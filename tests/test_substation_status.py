@@ -0,0 +1,21 @@
+# tests/test_substation_status.py
+from datetime import date
+from src.models.substation import Substation, InspectionTest, SubstationStatus
+
+
+def test_moving_an_inspection_refreshes_both_substations(session):
+    left, joined = Substation(name="Left", coverage_status="Not Covered"), Substation(name="Joined", coverage_status="Not Covered")
+    session.add_all([left, joined])
+    session.commit()
+    inspection = InspectionTest(substation_id=left.id, inspection_date=date(2024, 3, 1), inspection_status="Inspected")
+    session.add(inspection)
+    session.commit()
+
+    # After the commit the object is expired, so the old substation_id is not in memory
+    inspection.substation_id = joined.id
+    session.commit()
+
+    assert session.get(SubstationStatus, left.id) is None
+    status = session.get(SubstationStatus, joined.id)
+    assert status.latest_inspection_id == inspection.id
+    assert status.ever_inspected
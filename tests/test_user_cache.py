@@ -0,0 +1,68 @@
+# tests/test_user_cache.py
+import pytest
+from flask import g
+from src.extensions import cache
+from src.models.user import User, Role
+from src.utils.user_cache import Principal, load_principal
+
+
+@pytest.fixture(autouse=True)
+def cache_enabled(tmp_path, monkeypatch):
+    # Autouse fixtures run first, so the app below is built with the cache on
+    monkeypatch.setenv("CACHE_ENABLED", "1")
+    monkeypatch.setenv("CACHE_PATH", str(tmp_path / "cache.sqlite3"))
+    cache._lru.clear()
+    yield
+    cache._lru.clear()
+
+
+def _user(session, username="inspector", role=Role.INSPECTOR):
+    user = User(username=username, email=f"{username}@example.com", role=role)
+    user.set_password("secret123")
+    session.add(user)
+    session.commit()
+    return user
+
+
+def test_principal_is_served_from_the_cache(session):
+    user = _user(session)
+    principal = load_principal(user.id)
+    assert isinstance(principal, Principal)
+    assert (principal.username, principal.is_inspector(), principal.is_admin()) == ("inspector", True, False)
+    assert principal == user and principal.get_id() == str(user.id)
+
+    misses = cache.stats()["misses"]
+    assert load_principal(user.id) == principal
+    assert cache.stats()["misses"] == misses
+
+
+def test_user_writes_invalidate_the_principal(session):
+    user = _user(session)
+    load_principal(user.id)
+    user.role = Role.ADMIN
+    session.commit()
+    assert load_principal(user.id).is_admin()
+
+    user.is_active = False
+    session.commit()
+    assert not load_principal(user.id).is_active
+
+
+def test_unknown_user_is_none(session):
+    assert load_principal(12345) is None
+
+
+def test_requests_see_a_role_change_on_the_next_load(app, session):
+    user = _user(session, "viewer", Role.VIEWER)
+    client = app.test_client()
+    client.post("/login", data={"username": "viewer", "password": "secret123"})
+
+    def perf_status():
+        # The test's app context outlives requests; drop Flask-Login's per-request user as a new context would
+        g.pop("_login_user", None)
+        return client.get("/admin/perf", headers={"Accept": "application/json"}).status_code
+
+    assert perf_status() == 403
+    user.role = Role.ADMIN
+    session.commit()
+    assert perf_status() == 200
@@ -0,0 +1,107 @@
+# tests/test_xlsx_stream.py
+import io
+import zipfile
+from datetime import date, datetime, timezone
+from decimal import Decimal
+from openpyxl import load_workbook
+from src.utils.xlsx_stream import CELL_CHARS, XlsxStream
+
+
+class NonSeekable(io.RawIOBase):
+    """Collects written bytes and refuses to seek or tell, like a socket"""
+
+    def __init__(self):
+        self.data = bytearray()
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self.data += data
+        return len(data)
+
+
+def _build(*sheets):
+    """Workbook bytes from (title, header, rows) triples, drained after every row"""
+    stream = XlsxStream()
+    out = NonSeekable()
+    for title, header, rows in sheets:
+        stream.add_sheet(title, header)
+        for row in rows:
+            stream.append(row)
+            out.write(stream.drain())
+    out.write(stream.close())
+    return bytes(out.data)
+
+
+def _load(data):
+    return load_workbook(io.BytesIO(data))
+
+
+def test_values_round_trip_with_their_types():
+    rows = [
+        [1, 2.5, Decimal("3.25"), True, False],
+        [date(2024, 2, 29), datetime(2024, 2, 29, 13, 45, 30), datetime(1999, 12, 31, 23, 59, 59, tzinfo=timezone.utc),
+         None, "text"],
+        [-7, 1e-12, 12345678901234, "", "0042"]
+    ]
+    sheet = _load(_build(("Values", ["a", "b", "c", "d", "e"], rows))).active
+    values = [list(row) for row in sheet.iter_rows(values_only=True)]
+    assert values[0] == ["a", "b", "c", "d", "e"]
+    assert values[1] == [1, 2.5, 3.25, True, False]
+    assert values[2] == [datetime(2024, 2, 29), datetime(2024, 2, 29, 13, 45, 30),
+                         datetime(1999, 12, 31, 23, 59, 59), None, "text"]
+    # "0042" stays text rather than becoming a number
+    assert values[3][:3] == [-7, 1e-12, 12345678901234]
+    assert values[3][4] == "0042"
+    assert sheet["A3"].number_format == "yyyy-mm-dd"
+    assert sheet["B3"].number_format == "yyyy-mm-dd h:mm:ss"
+    assert sheet["A3"].is_date and sheet["B3"].is_date
+
+
+def test_text_is_escaped_and_cleaned():
+    text = ['<b>"quoted" & \'apostrophe\'</b>', "bell\x07 and nul\x00 dropped", "  padded  ", "line\nbreak",
+            "Ünïcödé ✓", "x" * (CELL_CHARS + 10)]
+    sheet = _load(_build(("Text", None, [text]))).active
+    values = [cell.value for cell in sheet[1]]
+    assert values[0] == '<b>"quoted" & \'apostrophe\'</b>'
+    assert values[1] == "bell and nul dropped"
+    assert values[2] == "  padded  "
+    assert values[3] == "line\nbreak"
+    assert values[4] == "Ünïcödé ✓"
+    assert len(values[5]) == CELL_CHARS
+
+
+def test_non_finite_numbers_are_left_blank():
+    sheet = _load(_build(("Numbers", None, [[float("nan"), float("inf"), 1.0]]))).active
+    assert [cell.value for cell in sheet[1]] == [None, None, 1.0]
+
+
+def test_several_sheets_keep_their_order_and_titles():
+    data = _build(
+        ("First & <one>", ["n"], [[i] for i in range(3)]),
+        ("A title longer than Excel's thirty-one characters", ["n"], [[i] for i in range(3, 5)]),
+        ("Empty", ["n"], [])
+    )
+    workbook = _load(data)
+    assert workbook.sheetnames == ["First & <one>", "A title longer than Excel's thirty-one"[:31], "Empty"]
+    assert [[row[0] for row in ws.iter_rows(min_row=2, values_only=True)] for ws in workbook.worksheets] == \
+        [[0, 1, 2], [3, 4], []]
+
+
+def test_package_parts():
+    names = zipfile.ZipFile(io.BytesIO(_build(("S", ["a"], [[1]])))).namelist()
+    assert set(names) == {"xl/worksheets/sheet1.xml", "xl/workbook.xml", "xl/_rels/workbook.xml.rels",
+                          "xl/styles.xml", "_rels/.rels", "[Content_Types].xml"}
+
+
+def test_drain_hands_out_bytes_before_close():
+    stream = XlsxStream()
+    stream.add_sheet("Rows", ["text"])
+    sent = 0
+    for i in range(5000):
+        stream.append([f"row {i} " * 10])
+        if stream.pending >= 16 * 1024:
+            sent += len(stream.drain())
+    assert sent > 0
+    assert stream.pending < 16 * 1024